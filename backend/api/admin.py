@@ -8,11 +8,17 @@ from django.contrib import messages
 from django.urls import path
 from django.http import HttpResponseRedirect
 from django.urls import reverse
-from .models import CustomUser, Translation, UserTranslationHistory
+from .models import CustomUser, GlossaryTerm, Translation, UsageRollup, UserTranslationHistory
+from .utils.search import IndexedSearchMixin
+from .utils.changelist import EstimatedCountPaginator, CachedAllValuesFieldListFilter, month_hierarchy_filter
+from .utils import maintenance
+from .utils.csv_import import TranslationImportBatch
+from .authentication import invalidate_cached_user
+from .db_router import ReplicaReadsAdminMixin
+from django.conf import settings
 import csv
 import io
 import logging
-from django.db import models
 
 logger = logging.getLogger(__name__)
 
@@ -40,18 +46,40 @@ class CustomUserAdmin(UserAdmin):
         (None, {'fields': ('username', 'password')}),
         ('Personal info', {'fields': ('first_name', 'last_name', 'email')}),
         ('Permissions', {'fields': ('is_active', 'is_approved', 'is_staff', 'is_superuser', 'groups', 'user_permissions')}),
+        ('Quotas', {'fields': ('daily_character_quota', 'daily_request_quota')}),
         ('Important dates', {'fields': ('last_login', 'date_joined')}),
     )
 
+    def save_model(self, request, obj, form, change):
+        # Revoke cached authentication and outstanding tokens when access changes
+        access_changed = change and {'is_active', 'is_approved'} & set(form.changed_data)
+        if access_changed:
+            obj.token_version += 1
+        # Quotas are read from the cached user, so drop it for them too
+        quota_changed = change and {'daily_character_quota', 'daily_request_quota'} & set(form.changed_data)
+        super().save_model(request, obj, form, change)
+        if access_changed or quota_changed:
+            invalidate_cached_user(obj.pk)
+
 @admin.register(Translation)
-class TranslationAdmin(admin.ModelAdmin):
+class TranslationAdmin(ReplicaReadsAdminMixin, IndexedSearchMixin, admin.ModelAdmin):
     list_display = ('source_language', 'target_language', 'truncated_source_text', 'truncated_translated_text', 
                    'usage_count', 'last_accessed', 'created_at')
     search_fields = ('source_text', 'translated_text')
-    list_filter = ('source_language', 'target_language', 'created_at', 'last_accessed')
+    exact_search_fields = ('source_text', 'translated_text')
+    list_filter = (
+        ('source_language', CachedAllValuesFieldListFilter),
+        ('target_language', CachedAllValuesFieldListFilter),
+        month_hierarchy_filter('created_at'),
+        'created_at',
+        'last_accessed',
+    )
     readonly_fields = ('created_at', 'last_accessed', 'usage_count')
     ordering = ('-last_accessed',)
-    date_hierarchy = 'created_at'
+    # Large table: planner-estimated counts and no second full-table COUNT(*)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ['evict_cold_rows', 'merge_duplicate_synonyms', 'recompute_usage_counts']
     
     def get_urls(self):
         urls = super().get_urls()
@@ -135,8 +163,7 @@ class TranslationAdmin(admin.ModelAdmin):
             source_language = validation_result['source_language']
             target_languages = validation_result['target_languages']
             
-            added_count = 0
-            skipped_count = 0
+            batch = TranslationImportBatch(source_language)
             errors = []
             
             # Process each row (skip header)
@@ -159,34 +186,20 @@ class TranslationAdmin(admin.ModelAdmin):
                             errors.append(f"Row {row_num}: Empty translation for {target_lang}")
                             continue
                         
-                        # Check if translation already exists
-                        existing_translation = Translation.objects.filter(
-                            source_text=source_text,
-                            source_language=source_language,
-                            target_language=target_lang,
-                            translated_text=target_text
-                        ).first()
-                        
-                        if existing_translation:
-                            skipped_count += 1
-                            logger.info(f"Skipped duplicate: {source_language}->{target_lang}: {source_text[:50]}...")
-                        else:
-                            # Create new translation
-                            Translation.objects.create(
-                                source_text=source_text,
-                                translated_text=target_text,
-                                source_language=source_language,
-                                target_language=target_lang
-                            )
-                            added_count += 1
-                            logger.info(f"Added translation: {source_language}->{target_lang}: {source_text[:50]}...")
+                        # Duplicates are detected and skipped when the batch is flushed
+                        batch.add(source_text, target_lang, target_text)
                             
                 except Exception as e:
                     errors.append(f"Row {row_num}: {str(e)}")
-                    logger.error(f"Error processing row {row_num}: {str(e)}")
+                    logger.error("Error processing row %s: %s", row_num, e)
+            
+            batch.flush()
+            errors.extend(batch.errors)
+            added_count = batch.added
+            skipped_count = batch.skipped
             
             # Log summary
-            logger.info(f"CSV upload completed: {added_count} added, {skipped_count} skipped, {len(errors)} errors")
+            logger.info("CSV upload completed: %s added, %s skipped, %s errors", added_count, skipped_count, len(errors))
             
             return {
                 'success': True,
@@ -201,7 +214,7 @@ class TranslationAdmin(admin.ModelAdmin):
         except UnicodeDecodeError:
             return {'success': False, 'error': 'CSV file must be UTF-8 encoded'}
         except Exception as e:
-            logger.error(f"CSV upload error: {str(e)}")
+            logger.error("CSV upload error: %s", e)
             return {'success': False, 'error': f'Failed to process CSV file: {str(e)}'}
     
     def validate_csv_structure(self, csv_reader, source_language=None):
@@ -308,8 +321,8 @@ class TranslationAdmin(admin.ModelAdmin):
                 return {'valid': False, 'error': f'Too many empty source texts: {empty_source_count} out of {total_rows} rows have empty source text'}
             
             # Log validation summary
-            logger.info(f"CSV validation completed: {total_rows} rows, {malformed_rows} malformed, "
-                       f"{empty_source_count} empty source, {empty_target_count} empty targets")
+            logger.info("CSV validation completed: %s rows, %s malformed, %s empty source, %s empty targets",
+                        total_rows, malformed_rows, empty_source_count, empty_target_count)
             
             return {
                 'valid': True,
@@ -320,7 +333,7 @@ class TranslationAdmin(admin.ModelAdmin):
             }
             
         except Exception as e:
-            logger.error(f"CSV validation error: {str(e)}")
+            logger.error("CSV validation error: %s", e)
             return {'valid': False, 'error': f'Validation failed: {str(e)}'}
     
     def is_valid_language_code(self, lang_code):
@@ -371,36 +384,46 @@ class TranslationAdmin(admin.ModelAdmin):
     def get_queryset(self, request):
         return super().get_queryset(request).select_related()
 
-    def get_search_results(self, request, queryset, search_term):
-        """Enable exact-match search when the term starts with '='.
-
-        Example:
-            =el empleo   → matches rows where translated_text or source_text equals "el empleo" (case-insensitive)
+    @admin.action(description='Evict cold rows among selected translations')
+    def evict_cold_rows(self, request, queryset):
+        evicted = maintenance.evict_cold_translations(
+            queryset,
+            older_than_days=settings.MAINTENANCE_EVICT_AFTER_DAYS,
+            max_usage_count=settings.MAINTENANCE_EVICT_MAX_USAGE_COUNT,
+        )
+        messages.success(
+            request,
+            f"Evicted {evicted} translations not accessed in {settings.MAINTENANCE_EVICT_AFTER_DAYS} days "
+            f"with usage count <= {settings.MAINTENANCE_EVICT_MAX_USAGE_COUNT}"
+        )
 
-        All other searches fall back to Django's default icontains behaviour
-        provided by `search_fields`.
-        """
-        if search_term.startswith('=') and len(search_term) > 1:
-            exact_term = search_term[1:].strip()
-            queryset = queryset.filter(
-                models.Q(source_text__iexact=exact_term) |
-                models.Q(translated_text__iexact=exact_term)
-            )
-            # `False` because we didn't alter joins that could cause duplicates
-            return queryset, False
+    @admin.action(description='Merge near-duplicate synonyms among selected translations')
+    def merge_duplicate_synonyms(self, request, queryset):
+        groups, removed = maintenance.merge_duplicate_synonyms(queryset)
+        messages.success(request, f"Merged {groups} duplicate groups, removed {removed} rows")
 
-        # Fallback to default behaviour (icontains search on both fields)
-        return super().get_search_results(request, queryset, search_term)
+    @admin.action(description='Recompute usage count from history for selected translations')
+    def recompute_usage_counts(self, request, queryset):
+        updated = maintenance.recompute_usage_counts(queryset)
+        messages.success(request, f"Recomputed usage count for {updated} translations")
 
 @admin.register(UserTranslationHistory)
-class UserTranslationHistoryAdmin(admin.ModelAdmin):
+class UserTranslationHistoryAdmin(ReplicaReadsAdminMixin, IndexedSearchMixin, admin.ModelAdmin):
     list_display = ('user', 'source_language', 'target_language', 'truncated_input', 
                    'truncated_output', 'timestamp', 'was_cached', 'time_ago')
-    list_filter = ('was_cached', 'timestamp', 'source_language', 'target_language')
+    list_filter = (
+        'was_cached',
+        month_hierarchy_filter('timestamp'),
+        'timestamp',
+        ('source_language', CachedAllValuesFieldListFilter),
+        ('target_language', CachedAllValuesFieldListFilter),
+    )
     search_fields = ('user__username', 'input_text', 'output_text')
+    exact_search_fields = ('input_text', 'output_text')
     readonly_fields = ('timestamp', 'was_cached')
     ordering = ('-timestamp',)
-    date_hierarchy = 'timestamp'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     
     def truncated_input(self, obj):
         return obj.input_text[:50] + '...' if len(obj.input_text) > 50 else obj.input_text
@@ -424,3 +447,28 @@ class UserTranslationHistoryAdmin(admin.ModelAdmin):
     
     def get_queryset(self, request):
         return super().get_queryset(request).select_related('user')
+
+
+@admin.register(GlossaryTerm)
+class GlossaryTermAdmin(admin.ModelAdmin):
+    list_display = ('source_language', 'target_language', 'term', 'translation', 'case_sensitive', 'updated_at')
+    list_filter = ('source_language', 'target_language', 'case_sensitive')
+    search_fields = ('term', 'translation')
+    readonly_fields = ('updated_at',)
+    ordering = ('source_language', 'target_language', 'term')
+
+
+@admin.register(UsageRollup)
+class UsageRollupAdmin(admin.ModelAdmin):
+    list_display = ('day', 'user', 'upstream_characters', 'upstream_requests', 'cached_characters', 'cached_requests')
+    list_filter = ('day',)
+    search_fields = ('user__username',)
+    ordering = ('-day', '-upstream_characters')
+    list_select_related = ('user',)
+    date_hierarchy = 'day'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -4,3 +4,16 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from django.db.models.signals import post_delete, post_save
+        from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+        from .models import GlossaryTerm
+        from .utils.glossary import invalidate_glossary
+        from .utils.search import register_lookups
+        from .utils.revocation import on_token_blacklisted
+
+        register_lookups()
+        post_save.connect(on_token_blacklisted, sender=BlacklistedToken, dispatch_uid='api_token_blacklisted')
+        post_save.connect(invalidate_glossary, sender=GlossaryTerm, dispatch_uid='api_glossary_saved')
+        post_delete.connect(invalidate_glossary, sender=GlossaryTerm, dispatch_uid='api_glossary_deleted')
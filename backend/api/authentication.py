@@ -0,0 +1,85 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils.translation import gettext_lazy as _
+from rest_framework.authentication import BaseAuthentication
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from .models.user import hash_api_key
+from .utils.ttlcache import TTLCache
+import copy
+import logging
+
+logger = logging.getLogger(__name__)
+
+TOKEN_VERSION_CLAIM = 'ver'
+
+# Resolved users per worker, keyed on (user_id, token_version)
+_user_cache = TTLCache(settings.JWT_USER_CACHE_TTL, settings.JWT_USER_CACHE_MAX_ENTRIES)
+
+# Verified API keys per worker, keyed on the key digest
+_api_key_cache = TTLCache(settings.API_KEY_CACHE_TTL, settings.API_KEY_CACHE_MAX_ENTRIES)
+
+
+def invalidate_cached_user(user_id):
+    """Drop every cached entry (JWT and API key) for ``user_id`` in this worker."""
+    _user_cache.delete_where(lambda key, user: key[0] == str(user_id))
+    _api_key_cache.delete_where(lambda key, user: user.pk == user_id)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that keeps resolved users in a short-lived per-worker
+    cache so authenticated requests skip the user SELECT.
+
+    Tokens carry the user's ``token_version`` in the ``ver`` claim. Changing
+    is_active/is_approved in the admin bumps the version, which immediately
+    invalidates this worker's entry and makes older tokens fail on their next
+    database lookup (at most ``JWT_USER_CACHE_TTL`` seconds later in other
+    workers).
+    """
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        version = validated_token.get(TOKEN_VERSION_CLAIM, 0)
+        cache_key = (str(user_id), version)
+
+        user = _user_cache.get(cache_key)
+        if user is None:
+            user = super().get_user(validated_token)
+            if user.token_version != version:
+                raise AuthenticationFailed(_('Token has been revoked'), code='token_revoked')
+            if not user.is_approved:
+                raise AuthenticationFailed(_('User is not approved'), code='user_not_approved')
+            _user_cache.set(cache_key, user)
+
+        # Hand each request its own instance so per-request mutations don't leak
+        return copy.copy(user)
+
+
+class APIKeyAuthentication(BaseAuthentication):
+    """
+    Stateless authentication for machine clients via the ``API_KEY_HEADER``
+    header (``X-API-Key`` by default). The key is matched through its SHA-256
+    digest on the indexed ``api_key_hash`` column, and verified keys are kept
+    in a per-worker TTL cache, so server-to-server calls need neither JWT
+    issuance nor a user query per request.
+    """
+
+    def authenticate(self, request):
+        api_key = request.headers.get(settings.API_KEY_HEADER)
+        if not api_key:
+            return None
+
+        digest = hash_api_key(api_key)
+        user = _api_key_cache.get(digest)
+        if user is None:
+            user = get_user_model().objects.filter(api_key_hash=digest).first()
+            if user is None or not user.is_active or not user.is_approved:
+                raise AuthenticationFailed(_('Invalid API key'), code='invalid_api_key')
+            _api_key_cache.set(digest, user)
+
+        return copy.copy(user), None
+
+    def authenticate_header(self, request):
+        return settings.API_KEY_HEADER
@@ -0,0 +1,187 @@
+"""
+Read-replica routing.
+
+Reads go to a replica only where it was asked for: views marked with
+``@replica_reads`` (or a ``replica_reads = True`` class attribute), admin
+changelists using ``ReplicaReadsAdminMixin``, and blocks wrapped in
+``read_from_replica()``. Everything else, and every write, uses ``default``.
+
+Read-your-writes: once a request writes, its remaining reads go to the
+primary, and ``ReplicaRoutingMiddleware`` pins the user to the primary for
+``DB_REPLICA_STICKY_SECONDS``. The pin is held per worker and mirrored in a
+short-lived cookie so it also holds when the next request lands on another
+worker (for clients that keep cookies).
+
+Replicas lagging more than ``DB_REPLICA_MAX_LAG_SECONDS`` are skipped. Lag is
+measured at most every ``DB_REPLICA_LAG_CHECK_SECONDS`` per worker and exported
+as the ``db_replica_lag_seconds`` gauge.
+"""
+from contextlib import contextmanager
+import contextvars
+import logging
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+from .utils.metrics import registry
+from .utils.ttlcache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+PIN_COOKIE = 'db_pin'
+
+_pinned_users = TTLCache(settings.DB_REPLICA_STICKY_SECONDS)
+
+
+class RoutingState:
+    def __init__(self, request=None):
+        self.request = request
+        self.allow_replica = False
+        self.wrote = False
+        self.pinned = bool(request is not None and request.COOKIES.get(PIN_COOKIE))
+
+    def user_id(self):
+        user = getattr(self.request, 'user', None)
+        return user.pk if user is not None and user.is_authenticated else None
+
+    def use_primary(self):
+        if not self.allow_replica or self.wrote or self.pinned:
+            return True
+        user_id = self.user_id()
+        return user_id is not None and _pinned_users.get(user_id) is not None
+
+
+_state = contextvars.ContextVar('db_routing_state', default=None)
+
+
+@contextmanager
+def read_from_replica():
+    """Send reads in this block to a replica unless read-your-writes requires the primary."""
+    state = _state.get()
+    token = None
+    if state is None:
+        state = RoutingState()
+        token = _state.set(state)
+    previous = state.allow_replica
+    state.allow_replica = True
+    try:
+        yield
+    finally:
+        state.allow_replica = previous
+        if token is not None:
+            _state.reset(token)
+
+
+def replica_reads(view_func):
+    """Mark a read-only view as safe to serve from a replica."""
+    view_func.replica_reads = True
+    return view_func
+
+
+class ReplicaLagMonitor:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._lag = {}
+        self._checked_at = 0.0
+
+    def healthy(self, aliases):
+        now = time.monotonic()
+        if now - self._checked_at >= settings.DB_REPLICA_LAG_CHECK_SECONDS:
+            with self._lock:
+                if now - self._checked_at >= settings.DB_REPLICA_LAG_CHECK_SECONDS:
+                    self._checked_at = now
+                    for alias in aliases:
+                        self._lag[alias] = self.measure(alias)
+                        if self._lag[alias] is not None:
+                            registry.set_gauge('db_replica_lag_seconds', self._lag[alias], replica=alias)
+        max_lag = settings.DB_REPLICA_MAX_LAG_SECONDS
+        return [alias for alias in aliases if self._lag.get(alias) is not None and self._lag[alias] <= max_lag]
+
+    def measure(self, alias):
+        """Seconds behind the primary, 0 for non-PostgreSQL replicas, None if unreachable."""
+        connection = connections[alias]
+        try:
+            if connection.vendor != 'postgresql':
+                return 0.0
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+                    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+                )
+                return float(cursor.fetchone()[0])
+        except DatabaseError as exc:
+            logger.warning("Replica %s lag check failed: %s", alias, exc)
+            return None
+
+
+lag_monitor = ReplicaLagMonitor()
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or not settings.DATABASE_REPLICAS or state.use_primary():
+            return 'default'
+        # Authentication reads users; approvals and token revocations must not lag
+        if model._meta.label == settings.AUTH_USER_MODEL:
+            return 'default'
+        replicas = lag_monitor.healthy(settings.DATABASE_REPLICAS)
+        return random.choice(replicas) if replicas else 'default'
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {'default', *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
+
+
+def start_request(request):
+    return _state.set(RoutingState(request))
+
+
+def finish_request(token, response):
+    """Pin the user to the primary if the request wrote anything."""
+    state = _state.get()
+    _state.reset(token)
+    if state is None or not state.wrote:
+        return
+    user_id = state.user_id()
+    if user_id is not None:
+        _pinned_users.set(user_id, True)
+    if response is not None:
+        response.set_cookie(PIN_COOKIE, '1', max_age=settings.DB_REPLICA_STICKY_SECONDS, httponly=True, samesite='Lax')
+
+
+def allow_replica_for_view(view_func):
+    state = _state.get()
+    if state is not None:
+        state.allow_replica = bool(
+            getattr(view_func, 'replica_reads', False)
+            or getattr(getattr(view_func, 'view_class', None), 'replica_reads', False)
+        )
+
+
+class ReplicaReadsAdminMixin:
+    """Serve admin changelist pages (GET only) from a replica."""
+
+    def changelist_view(self, request, extra_context=None):
+        if request.method != 'GET':
+            return super().changelist_view(request, extra_context)
+        with read_from_replica():
+            response = super().changelist_view(request, extra_context)
+            # The result list is evaluated while rendering, so render inside the block
+            if hasattr(response, 'render'):
+                response.render()
+            return response
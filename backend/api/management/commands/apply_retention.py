@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+from api.utils.retention import POLICIES, run_retention
+import json
+
+
+class Command(BaseCommand):
+    help = ('Apply the Translation retention policies from settings.TRANSLATION_RETENTION. '
+            'Intended to run on a schedule (e.g. nightly cron).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be evicted without deleting')
+        parser.add_argument('--policy', action='append', choices=POLICIES, dest='policies',
+                            help='Only run the given policy (repeatable); defaults to all enabled policies')
+        parser.add_argument('--ttl-days', type=int, help='Override TTL_DAYS')
+        parser.add_argument('--min-usage-count', type=int, help='Override MIN_USAGE_COUNT')
+        parser.add_argument('--max-rows-per-pair', type=int, help='Override MAX_ROWS_PER_LANGUAGE_PAIR')
+        parser.add_argument('--min-score', type=float, help='Override MIN_SCORE')
+        parser.add_argument('--batch-size', type=int, help='Override BATCH_SIZE')
+        parser.add_argument('--json', action='store_true', help='Print metrics as JSON')
+
+    def handle(self, *args, **options):
+        overrides = {
+            key: options[option]
+            for option, key in [
+                ('ttl_days', 'TTL_DAYS'),
+                ('min_usage_count', 'MIN_USAGE_COUNT'),
+                ('max_rows_per_pair', 'MAX_ROWS_PER_LANGUAGE_PAIR'),
+                ('min_score', 'MIN_SCORE'),
+                ('batch_size', 'BATCH_SIZE'),
+            ]
+            if options[option] is not None
+        }
+
+        metrics = run_retention(overrides, options['policies'] or POLICIES, options['dry_run'])
+
+        if options['json']:
+            self.stdout.write(json.dumps({'dry_run': options['dry_run'], 'policies': metrics}))
+            return
+
+        if not metrics:
+            self.stdout.write("No retention policies enabled")
+            return
+
+        verb = 'would evict' if options['dry_run'] else 'evicted'
+        for policy, result in metrics.items():
+            self.stdout.write(f"{policy:<10} {verb} {result['rows']} rows, "
+                              f"{result['bytes']} bytes ({result['seconds']}s)")
+        total_rows = sum(result['rows'] for result in metrics.values())
+        total_bytes = sum(result['bytes'] for result in metrics.values())
+        self.stdout.write(self.style.SUCCESS(f"Total: {verb} {total_rows} rows, {total_bytes} bytes"))
@@ -0,0 +1,90 @@
+from django.core.management.base import BaseCommand
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.test import RequestFactory
+from api.models import Translation, UserTranslationHistory
+import random
+import statistics
+import string
+import time
+
+WORDS = ['house', 'casa', 'order', 'shipped', 'employment', 'el empleo', 'thank you', 'gracias',
+         'water', 'agua', 'computer', 'ordenador', 'morning', 'mañana', 'letter', 'carta']
+
+
+def random_phrase(rng):
+    words = rng.sample(WORDS, rng.randint(1, 4))
+    suffix = ''.join(rng.choices(string.ascii_lowercase, k=6))
+    return f"{' '.join(words)} {suffix}"
+
+
+class Command(BaseCommand):
+    help = 'Benchmark admin changelist search latency for Translation and UserTranslationHistory'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Insert this many synthetic Translation/history rows before benchmarking')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--runs', type=int, default=20, help='Timed runs per search term')
+        parser.add_argument('--explain', action='store_true', help='Print the query plan for each search')
+
+    def handle(self, *args, **options):
+        if options['seed']:
+            self.seed(options['seed'], options['batch_size'])
+
+        factory = RequestFactory()
+        request = factory.get('/')
+        request.user = get_user_model()(is_superuser=True, is_staff=True)
+
+        cases = [
+            (Translation, 'empleo'),
+            (Translation, 'thank you'),
+            (Translation, '=el empleo'),
+            (UserTranslationHistory, 'gracias'),
+            (UserTranslationHistory, '=agua'),
+        ]
+
+        self.stdout.write(f"Translation rows: {Translation.objects.count()}, "
+                          f"history rows: {UserTranslationHistory.objects.count()}")
+
+        for model, term in cases:
+            model_admin = admin.site._registry[model]
+            timings = []
+            for _ in range(options['runs']):
+                start = time.perf_counter()
+                queryset, _dupes = model_admin.get_search_results(
+                    request, model_admin.get_queryset(request), term
+                )
+                list(queryset[:100])
+                timings.append((time.perf_counter() - start) * 1000)
+
+            timings.sort()
+            p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+            self.stdout.write(
+                f"{model.__name__:<24} {term!r:<16} "
+                f"p50={statistics.median(timings):8.2f}ms p95={p95:8.2f}ms max={timings[-1]:8.2f}ms"
+            )
+            if options['explain']:
+                self.stdout.write(queryset[:100].explain())
+
+    def seed(self, count, batch_size):
+        rng = random.Random(42)
+        User = get_user_model()
+        user, _ = User.objects.get_or_create(username='bench_admin_search', defaults={'email': 'bench@example.com'})
+
+        created = 0
+        while created < count:
+            size = min(batch_size, count - created)
+            phrases = [(random_phrase(rng), random_phrase(rng)) for _ in range(size)]
+            Translation.objects.bulk_create(
+                [Translation(source_text=src, translated_text=dst, source_language='en', target_language='es')
+                 for src, dst in phrases],
+                ignore_conflicts=True,
+            )
+            UserTranslationHistory.objects.bulk_create(
+                [UserTranslationHistory(user=user, source_language='en', target_language='es',
+                                        input_text=src, output_text=dst)
+                 for src, dst in phrases]
+            )
+            created += size
+            self.stdout.write(f"Seeded {created}/{count} rows")
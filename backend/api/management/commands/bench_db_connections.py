@@ -0,0 +1,121 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+from django.db.backends.signals import connection_created
+from django.test import Client
+from django.test.utils import override_settings
+from api.utils.benchmark import BENCH_USER_PREFIX, summarize
+from api.views.auth import CustomTokenObtainPairSerializer
+import copy
+import json
+import time
+
+MODES = ('per-request', 'persistent', 'pool')
+
+
+class Command(BaseCommand):
+    help = ('Compare request latency with a new database connection per request, persistent '
+            'connections (CONN_MAX_AGE) and the psycopg pool (PostgreSQL with psycopg[pool] only)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help='Timed requests per mode')
+        parser.add_argument('--warmup', type=int, default=20)
+        parser.add_argument('--path', default='/api/translations/history?limit=20',
+                            help='Authenticated GET endpoint to request')
+        parser.add_argument('--mode', action='append', choices=MODES, dest='modes',
+                            help='Mode to run (repeatable); default: every mode available here')
+        parser.add_argument('--health-checks', action='store_true', help='Enable CONN_HEALTH_CHECKS in every mode')
+        parser.add_argument('--output', help='Write results as JSON to this file')
+
+    def handle(self, *args, **options):
+        user = get_user_model().objects.filter(username__startswith=BENCH_USER_PREFIX).order_by('pk').first()
+        if user is None:
+            raise CommandError('No bench users found; run "manage.py seed_bench_data" first')
+        token = str(CustomTokenObtainPairSerializer.get_token(user).access_token)
+
+        modes = options['modes'] or [mode for mode in MODES if mode != 'pool' or self.pool_available()]
+        if 'pool' in modes and not self.pool_available():
+            raise CommandError('The pool mode needs PostgreSQL with psycopg 3 and psycopg[pool] installed')
+
+        original = copy.deepcopy(connection.settings_dict)
+        results = {}
+        try:
+            # The benchmark itself should not be flagged or slowed by the budget counter
+            with override_settings(QUERY_BUDGET_MODE='off'):
+                for mode in modes:
+                    self.configure(mode, original, options['health_checks'])
+                    results[mode] = self.run(token, options)
+                    latency = results[mode]['latency_ms']
+                    self.stdout.write(
+                        f"{mode:<12} connections={results[mode]['connections_opened']:<5} "
+                        f"p50={latency['p50']}ms p95={latency['p95']}ms p99={latency['p99']}ms "
+                        f"rps={results[mode]['throughput_rps']}"
+                    )
+        finally:
+            connection.close()
+            if connection.settings_dict['OPTIONS'].get('pool'):
+                connection.close_pool()
+            connection.settings_dict.clear()
+            connection.settings_dict.update(original)
+
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                json.dump({'vendor': connection.vendor, 'path': options['path'], 'modes': results}, handle, indent=2)
+
+    def pool_available(self):
+        if connection.vendor != 'postgresql':
+            return False
+        try:
+            import psycopg_pool  # noqa: F401
+            from django.db.backends.postgresql.psycopg_any import is_psycopg3
+        except ImportError:
+            return False
+        return is_psycopg3
+
+    def configure(self, mode, original, health_checks):
+        connection.close()
+        if original['OPTIONS'].get('pool') or connection.settings_dict['OPTIONS'].get('pool'):
+            connection.close_pool()
+        settings_dict = copy.deepcopy(original)
+        settings_dict['CONN_HEALTH_CHECKS'] = health_checks
+        settings_dict['OPTIONS'].pop('pool', None)
+        if mode == 'per-request':
+            settings_dict['CONN_MAX_AGE'] = 0
+        elif mode == 'persistent':
+            settings_dict['CONN_MAX_AGE'] = original['CONN_MAX_AGE'] or 600
+        else:
+            settings_dict['CONN_MAX_AGE'] = 0
+            settings_dict['OPTIONS']['pool'] = original['OPTIONS'].get('pool') or {'min_size': 2, 'max_size': 4}
+        connection.settings_dict.clear()
+        connection.settings_dict.update(settings_dict)
+
+    def run(self, token, options):
+        client = Client()
+        auth = {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+        opened = []
+
+        def count(sender, connection, **kwargs):
+            opened.append(connection.alias)
+
+        def request():
+            response = client.get(options['path'], **auth)
+            # The test client skips the request_finished cleanup a WSGI server runs
+            close_old_connections()
+            return response
+
+        for _ in range(options['warmup']):
+            request()
+
+        connection_created.connect(count)
+        samples = []
+        started = time.perf_counter()
+        try:
+            for _ in range(options['requests']):
+                request_started = time.perf_counter()
+                response = request()
+                samples.append((time.perf_counter() - request_started, response.status_code < 400))
+        finally:
+            connection_created.disconnect(count)
+        result = summarize(samples, time.perf_counter() - started)
+        result['connections_opened'] = len(opened)
+        return result
@@ -0,0 +1,77 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from api.management.commands.train_language_model import labelled_texts
+from api.utils.benchmark import summarize
+from api.utils.langid import LanguageIdentifier, train
+import json
+import os
+import random
+import time
+
+
+class Command(BaseCommand):
+    help = ('Measure language identification throughput and accuracy. Trains on part of the cached texts '
+            'and scores the held-out rest, or scores a sample with an existing --model file.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', help='Existing model file to evaluate (default: train a fresh one)')
+        parser.add_argument('--texts', type=int, default=2000, help='Held-out texts to identify')
+        parser.add_argument('--max-texts', type=int, default=5000, help='Sample texts per language')
+        parser.add_argument('--max-ngrams', type=int, default=3000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Write results as JSON to this file')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        samples = labelled_texts(options['max_texts'], options['seed'])
+        labelled = [(text, language) for language, texts in samples.items() for text in texts]
+        if not labelled:
+            raise CommandError('The Translation cache is empty; seed it first (manage.py seed_bench_data)')
+        rng.shuffle(labelled)
+
+        if options['model']:
+            if not os.path.exists(options['model']):
+                raise CommandError(f"No model at {options['model']}")
+            started = time.perf_counter()
+            identifier = LanguageIdentifier.load(options['model'])
+            held_out = labelled[:options['texts']]
+        else:
+            held_out, training = labelled[:options['texts']], labelled[options['texts']:]
+            model = train(training, options['max_ngrams'])
+            started = time.perf_counter()
+            identifier = LanguageIdentifier(model)
+        load_ms = (time.perf_counter() - started) * 1000
+
+        samples, correct, confident, confident_correct = [], 0, 0, 0
+        wall_started = time.perf_counter()
+        for text, language in held_out:
+            call_started = time.perf_counter()
+            guess, confidence = identifier.identify(text)
+            samples.append((time.perf_counter() - call_started, True))
+            correct += guess == language
+            if confidence >= settings.LANGUAGE_ID_MIN_CONFIDENCE:
+                confident += 1
+                confident_correct += guess == language
+        result = summarize(samples, time.perf_counter() - wall_started)
+        total = len(held_out)
+        result.update({
+            'languages': len(identifier.languages),
+            'model_load_ms': round(load_ms, 1),
+            'accuracy': round(correct / total, 4),
+            'confident_share': round(confident / total, 4),
+            'confident_accuracy': round(confident_correct / confident, 4) if confident else None,
+            'chars_per_second': round(sum(len(text) for text, _ in held_out) / sum(s for s, _ in samples)),
+        })
+
+        self.stdout.write(
+            f"{total} texts, {result['languages']} languages: {result['throughput_rps']} texts/s "
+            f"({result['chars_per_second']} chars/s), p50={result['latency_ms']['p50']}ms "
+            f"p99={result['latency_ms']['p99']}ms, model load {result['model_load_ms']}ms"
+        )
+        self.stdout.write(
+            f"accuracy={result['accuracy']} confident (>= {settings.LANGUAGE_ID_MIN_CONFIDENCE}): "
+            f"{result['confident_share']} of texts, accuracy {result['confident_accuracy']}"
+        )
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                json.dump(result, handle, indent=2)
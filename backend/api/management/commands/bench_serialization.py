@@ -0,0 +1,135 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from api.renderers import ORJSONRenderer
+from api.utils.benchmark import VOCABULARY, summarize
+import gzip
+import json
+import random
+import time
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+
+def history_payload(rng, size):
+    # Same shape as get_translation_history; timestamps stay datetimes until rendering
+    now = timezone.now()
+    return {
+        'translations': [
+            {
+                'id': index,
+                'source_language': 'en',
+                'target_language': 'es',
+                'input_text': ' '.join(rng.sample(VOCABULARY, 3)),
+                'output_text': ' '.join(rng.sample(VOCABULARY, 3)),
+                'timestamp': now,
+                'was_cached': rng.random() < 0.5,
+            }
+            for index in range(size)
+        ],
+        'pagination': {'current_page': 1, 'total_pages': 20, 'total_items': size * 20, 'items_per_page': size},
+    }
+
+
+def flashcards_payload(rng, size):
+    return {
+        'flashcards': [
+            {
+                'id': index if index % 2 else f'history_{index}',
+                'source_text': ' '.join(rng.sample(VOCABULARY, 2)),
+                'translated_text': ' '.join(rng.sample(VOCABULARY, 2)),
+                'source_language': 'en',
+                'target_language': 'es',
+            }
+            for index in range(size)
+        ],
+        'count': size,
+        'source_language': 'en',
+        'target_language': 'es',
+        'requested_limit': size,
+    }
+
+
+def upload_errors_payload(rng, size):
+    return {
+        'message': 'CSV upload completed',
+        'added_count': 0,
+        'skipped_count': 0,
+        'total_processed': 0,
+        'errors': [f'Row {index}: Empty translation for {rng.choice(("es", "fr", "de"))}' for index in range(size)],
+        'source_language': 'en',
+        'target_languages': ['es', 'fr', 'de'],
+        'total_rows_processed': size,
+    }
+
+
+PAYLOADS = {
+    'history': history_payload,
+    'flashcards': flashcards_payload,
+    'upload_errors': upload_errors_payload,
+}
+
+
+class Command(BaseCommand):
+    help = ('Time JSON rendering of representative response payloads with DRF\'s JSONRenderer '
+            'and the orjson renderer, and report gzip/brotli compressed sizes')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200, help='Timed renders per payload and renderer')
+        parser.add_argument('--history-size', type=int, default=100, help='Items in the history page')
+        parser.add_argument('--flashcards-size', type=int, default=100)
+        parser.add_argument('--errors-size', type=int, default=5000, help='Entries in the CSV upload error list')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Write results as JSON to this file')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        sizes = {
+            'history': options['history_size'],
+            'flashcards': options['flashcards_size'],
+            'upload_errors': options['errors_size'],
+        }
+        renderers = {'drf': JSONRenderer(), 'orjson': ORJSONRenderer()}
+        results = {}
+        for name, build in PAYLOADS.items():
+            data = build(rng, sizes[name])
+            results[name] = result = {'items': sizes[name]}
+            bodies = {}
+            for label, renderer in renderers.items():
+                bodies[label] = renderer.render(data)
+                result[label] = self.time(lambda: renderer.render(data), options['iterations'])
+            if bodies['drf'] != bodies['orjson']:
+                self.stderr.write(f'{name}: orjson output differs from JSONRenderer')
+
+            body = bodies['orjson']
+            result['bytes'] = {'identity': len(body)}
+            compressors = {'gzip': lambda: gzip.compress(body, compresslevel=6, mtime=0)}
+            if brotli is not None:
+                compressors['br'] = lambda: brotli.compress(body, quality=4)
+            for encoding, compress in compressors.items():
+                result['bytes'][encoding] = len(compress())
+                result[encoding] = self.time(compress, options['iterations'])
+
+            line = (f"{name:<14} items={sizes[name]:<6} drf p50={result['drf']['latency_ms']['p50']}ms "
+                    f"orjson p50={result['orjson']['latency_ms']['p50']}ms bytes={result['bytes']['identity']}")
+            for encoding in compressors:
+                line += f" {encoding}={result['bytes'][encoding]}B/{result[encoding]['latency_ms']['p50']}ms"
+            self.stdout.write(line)
+
+        if brotli is None:
+            self.stdout.write('brotli is not installed; only gzip was measured')
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                json.dump(results, handle, indent=2)
+
+    def time(self, func, iterations):
+        samples = []
+        started = time.perf_counter()
+        for _ in range(iterations):
+            call_started = time.perf_counter()
+            func()
+            samples.append((time.perf_counter() - call_started, True))
+        return summarize(samples, time.perf_counter() - started)
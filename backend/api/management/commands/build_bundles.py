@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from api.utils.bundles import DEFAULT_CHUNK_SIZE, build_bundle, language_pairs, prune_bundles, valid_language
+
+
+class Command(BaseCommand):
+    help = ('Build offline dictionary bundles (gzip-compressed SQLite) of the Translation cache for the '
+            'desktop client. Pairs whose newest bundle is current are skipped; intended to run on a schedule.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pair', action='append', dest='pairs', metavar='SOURCE:TARGET',
+                            help='Language pair to build (repeatable); default: every pair in the cache')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+        parser.add_argument('--force', action='store_true', help='Rebuild even if the newest bundle is current')
+        parser.add_argument('--keep', type=int, default=settings.BUNDLE_KEEP_VERSIONS,
+                            help='Bundle versions to keep per pair; older ones are deleted')
+
+    def handle(self, *args, **options):
+        if options['pairs']:
+            pairs = []
+            for value in options['pairs']:
+                source, _, target = value.partition(':')
+                if not (valid_language(source) and valid_language(target)):
+                    raise CommandError(f'Invalid language pair: {value} (expected e.g. en:es)')
+                pairs.append((source, target))
+        else:
+            pairs = sorted(pair for pair in language_pairs() if all(map(valid_language, pair)))
+
+        for source, target in pairs:
+            version, path, rows = build_bundle(source, target, options['chunk_size'], force=options['force'])
+            if rows is None:
+                self.stdout.write(f"{source}-{target}: version {version} is current")
+            else:
+                self.stdout.write(f"{source}-{target}: built version {version} with {rows} rows -> {path}")
+            prune_bundles(source, target, keep=max(1, options['keep']))
+        self.stdout.write(self.style.SUCCESS(f"Processed {len(pairs)} language pairs"))
@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from api.utils.maintenance import evict_cold_translations
+
+
+class Command(BaseCommand):
+    help = 'Delete Translation rows that are cold (not accessed recently and rarely used), in chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.MAINTENANCE_EVICT_AFTER_DAYS,
+                            help='Evict rows whose last_accessed is older than this many days')
+        parser.add_argument('--max-usage', type=int, default=settings.MAINTENANCE_EVICT_MAX_USAGE_COUNT,
+                            help='Only evict rows with usage_count at or below this value')
+        parser.add_argument('--chunk-size', type=int, default=5000)
+        parser.add_argument('--dry-run', action='store_true', help='Only report how many rows would be evicted')
+
+    def handle(self, *args, **options):
+        def progress(done, total):
+            self.stdout.write(f"Evicted {done}/{total} rows")
+
+        count = evict_cold_translations(
+            older_than_days=options['days'],
+            max_usage_count=options['max_usage'],
+            chunk_size=options['chunk_size'],
+            progress=progress,
+            dry_run=options['dry_run'],
+        )
+        if options['dry_run']:
+            self.stdout.write(f"Dry run: {count} rows would be evicted")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Evicted {count} cold translations"))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from api.utils.benchmark import FakeTranslateServer
+
+
+class Command(BaseCommand):
+    help = 'Serve a local stub of the Google Translate v2 API for benchmarks (set GOOGLE_TRANSLATE_URL to its URL)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--latency-ms', type=float, default=50.0, help='Base latency added to every response')
+        parser.add_argument('--jitter-ms', type=float, default=0.0, help='Extra uniform random latency (0..jitter)')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered with HTTP 500')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        server = FakeTranslateServer(
+            options['host'], options['port'], options['latency_ms'], options['jitter_ms'],
+            options['error_rate'], options['seed'],
+        )
+        self.stdout.write(f"Fake Translate API listening on {server.url}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.stop()
+            self.stdout.write(f"Served {server.requests} requests ({server.errors} injected errors)")
@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand, CommandError
+from api.models import GlossaryTerm
+from api.utils.bundles import valid_language
+from api.utils.glossary import glossaries
+import csv
+
+
+class Command(BaseCommand):
+    help = ('Import glossary terms for a language pair from a CSV file with a header row: term, translation '
+            '(blank keeps the term untranslated) and optionally case_sensitive. Existing terms are updated.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_file')
+        parser.add_argument('--source', required=True, help='Source language code, e.g. en')
+        parser.add_argument('--target', required=True, help='Target language code, e.g. es')
+        parser.add_argument('--replace', action='store_true', help="Delete the pair's terms missing from the file")
+
+    def handle(self, *args, **options):
+        source, target = options['source'], options['target']
+        if not (valid_language(source) and valid_language(target)):
+            raise CommandError(f'Invalid language pair: {source}:{target}')
+
+        terms = {}
+        with open(options['csv_file'], newline='', encoding='utf-8-sig') as handle:
+            reader = csv.DictReader(handle)
+            if not reader.fieldnames or 'term' not in reader.fieldnames:
+                raise CommandError('The CSV header must contain a "term" column')
+            for line, row in enumerate(reader, start=2):
+                term = (row.get('term') or '').strip()
+                if not term:
+                    self.stderr.write(f"Line {line}: empty term, skipped")
+                    continue
+                terms[term] = GlossaryTerm(
+                    source_language=source,
+                    target_language=target,
+                    term=term,
+                    translation=(row.get('translation') or '').strip(),
+                    case_sensitive=(row.get('case_sensitive') or '').strip().lower() in ('true', '1', 'yes'),
+                )
+
+        GlossaryTerm.objects.bulk_create(
+            terms.values(), batch_size=1000, update_conflicts=True,
+            unique_fields=['source_language', 'target_language', 'term'],
+            update_fields=['translation', 'case_sensitive', 'updated_at'],
+        )
+        deleted = 0
+        if options['replace']:
+            deleted, _ = GlossaryTerm.objects.filter(source_language=source, target_language=target).exclude(
+                term__in=list(terms)
+            ).delete()
+        glossaries.invalidate(source, target)
+        self.stdout.write(self.style.SUCCESS(f"Imported {len(terms)} terms for {source}-{target}, deleted {deleted}"))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from api.utils.maintenance import merge_duplicate_synonyms
+
+
+class Command(BaseCommand):
+    help = 'Merge Translation synonyms that differ only by case or surrounding whitespace'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help='Rows per source_text range merged with one UPDATE/DELETE pair')
+        parser.add_argument('--dry-run', action='store_true', help='Only report how many groups would be merged')
+
+    def handle(self, *args, **options):
+        def progress(done, total):
+            self.stdout.write(f"Merged {done} groups")
+
+        groups, removed = merge_duplicate_synonyms(
+            chunk_size=options['chunk_size'],
+            progress=progress,
+            dry_run=options['dry_run'],
+        )
+        if options['dry_run']:
+            self.stdout.write(f"Dry run: {groups} groups would be merged, removing {removed} rows")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Merged {groups} groups, removed {removed} rows"))
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken, BlacklistedToken
+from api.utils.maintenance import delete_in_chunks
+
+
+class Command(BaseCommand):
+    help = ('Delete expired outstanding and blacklisted JWT refresh tokens in batches. '
+            'Batched replacement for flushexpiredtokens; intended to run on a schedule.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000)
+        parser.add_argument('--dry-run', action='store_true', help='Only report how many tokens would be removed')
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        blacklisted = BlacklistedToken.objects.filter(token__expires_at__lte=now)
+        outstanding = OutstandingToken.objects.filter(expires_at__lte=now)
+
+        if options['dry_run']:
+            self.stdout.write(f"Dry run: {blacklisted.count()} blacklisted and "
+                              f"{outstanding.count()} outstanding tokens would be removed")
+            return
+
+        def progress(label):
+            return lambda done, total: self.stdout.write(f"Deleted {done} {label} tokens")
+
+        # Expired tokens have the lowest ids, so walking the pk index finds them first.
+        # Blacklist entries go first so the outstanding deletes need no cascade.
+        removed_blacklisted = delete_in_chunks(blacklisted, options['chunk_size'], progress('blacklisted'),
+                                               order_by=('pk',))
+        removed_outstanding = delete_in_chunks(outstanding, options['chunk_size'], progress('outstanding'),
+                                               order_by=('pk',))
+        self.stdout.write(self.style.SUCCESS(
+            f"Removed {removed_blacklisted} blacklisted and {removed_outstanding} outstanding expired tokens"
+        ))
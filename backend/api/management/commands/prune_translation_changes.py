@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from api.utils.changes import prune_changes
+
+
+class Command(BaseCommand):
+    help = ('Delete translation change-feed entries older than the retention period, in chunks. '
+            'Clients that synced before the cutoff must resync from a bundle.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.CHANGE_LOG_RETENTION_DAYS,
+                            help='Delete changes older than this many days')
+        parser.add_argument('--chunk-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        def progress(done, total):
+            self.stdout.write(f"Deleted {done} changes")
+
+        count = prune_changes(options['days'], options['chunk_size'], progress=progress)
+        self.stdout.write(self.style.SUCCESS(f"Pruned {count} translation changes"))
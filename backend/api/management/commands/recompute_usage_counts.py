@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from api.utils.maintenance import recompute_usage_counts
+
+
+class Command(BaseCommand):
+    help = 'Recompute Translation.usage_count from UserTranslationHistory, one id range at a time'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Primary-key range updated per statement')
+
+    def handle(self, *args, **options):
+        def progress(done, total):
+            self.stdout.write(f"Processed {done}/{total} ids")
+
+        updated = recompute_usage_counts(chunk_size=options['chunk_size'], progress=progress)
+        self.stdout.write(self.style.SUCCESS(f"Recomputed usage_count for {updated} translations"))
@@ -0,0 +1,143 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from api.models import Translation
+from api.utils.benchmark import (
+    BENCH_USER_PREFIX, FakeTranslateServer, HTTPTarget, InProcessTarget, Workload,
+    parse_mix, run_workload, summarize,
+)
+from api.views.auth import CustomTokenObtainPairSerializer
+from datetime import datetime, timezone
+import django
+import json
+import os
+import platform
+import subprocess
+
+
+class Command(BaseCommand):
+    help = ('Run scripted translate/history/flashcards/CSV workloads and report throughput and '
+            'p50/p95/p99 latency as JSON. Seed data with seed_bench_data first.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', help='Benchmark a running server (e.g. http://localhost:8000/api). '
+                                               'Default: in-process through the test client')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per worker')
+        parser.add_argument('--warmup', type=int, default=20, help='Untimed requests per worker before measuring')
+        parser.add_argument('--concurrency', type=int, default=1)
+        parser.add_argument('--mix', default='translate=70,history=15,flashcards=10,csv=5',
+                            help='Workload weights, e.g. "translate=1" for translate only')
+        parser.add_argument('--hot-ratio', type=float, default=0.8, help='Fraction of translate calls that hit the cache')
+        parser.add_argument('--hot-set', type=int, default=1000, help='Number of cached phrases hot calls draw from')
+        parser.add_argument('--csv-rows', type=int, default=50)
+        parser.add_argument('--stub-latency-ms', type=float, default=50.0, help='In-process mode: fake upstream latency')
+        parser.add_argument('--stub-jitter-ms', type=float, default=0.0)
+        parser.add_argument('--stub-error-rate', type=float, default=0.0)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--output', help='Write the JSON report to this file')
+        parser.add_argument('--compare', help='Print changes against a previous JSON report')
+
+    def handle(self, *args, **options):
+        try:
+            mix = parse_mix(options['mix'])
+        except ValueError as exc:
+            raise CommandError(exc)
+
+        users = list(get_user_model().objects.filter(username__startswith=BENCH_USER_PREFIX).order_by('pk'))
+        if not users:
+            raise CommandError('No bench users found; run "manage.py seed_bench_data" first')
+        tokens = [str(CustomTokenObtainPairSerializer.get_token(user).access_token) for user in users]
+        hot_phrases = list(
+            Translation.objects.filter(source_text__startswith='bench ')
+            .order_by('-usage_count', 'pk')
+            .values_list('source_language', 'target_language', 'source_text')[:options['hot_set']]
+        )
+        workload = Workload(hot_phrases, options['hot_ratio'], options['csv_rows'])
+
+        if options['base_url']:
+            def make_target(index):
+                return HTTPTarget(options['base_url'], tokens[index % len(tokens)])
+            results = self.run(make_target, workload, mix, options)
+        else:
+            stub = FakeTranslateServer(
+                latency_ms=options['stub_latency_ms'], jitter_ms=options['stub_jitter_ms'],
+                error_rate=options['stub_error_rate'], seed=options['seed'],
+            ).start()
+            os.environ.setdefault('GOOGLE_TRANSLATE_API_KEY', 'benchmark')
+            try:
+                with override_settings(GOOGLE_TRANSLATE_URL=stub.url, QUERY_BUDGET_MODE='off'):
+                    def make_target(index):
+                        return InProcessTarget(tokens[index % len(tokens)])
+                    results = self.run(make_target, workload, mix, options)
+            finally:
+                stub.stop()
+
+        report = {'meta': self.meta(options, len(users), len(hot_phrases)), 'workloads': results}
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                handle.write(output + '\n')
+            self.stdout.write(f"Report written to {options['output']}")
+        self.print_table(results)
+        if options['compare']:
+            with open(options['compare']) as handle:
+                self.print_comparison(json.load(handle)['workloads'], results)
+
+    def run(self, make_target, workload, mix, options):
+        if options['warmup']:
+            run_workload(make_target, workload, mix, options['warmup'], options['concurrency'], options['seed'] + 1)
+        samples, wall = run_workload(
+            make_target, workload, mix, options['requests'], options['concurrency'], options['seed']
+        )
+        results = {name: summarize(values, wall) for name, values in sorted(samples.items())}
+        results['all'] = summarize([sample for values in samples.values() for sample in values], wall)
+        return results
+
+    def meta(self, options, user_count, hot_count):
+        try:
+            commit = subprocess.run(
+                ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, cwd=settings.BASE_DIR, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            commit = None
+        return {
+            'commit': commit,
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'mode': 'http' if options['base_url'] else 'in-process',
+            'database': connection.vendor,
+            'translation_rows': Translation.objects.count(),
+            'bench_users': user_count,
+            'hot_phrases': hot_count,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'options': {key: options[key] for key in (
+                'base_url', 'requests', 'warmup', 'concurrency', 'mix', 'hot_ratio', 'hot_set', 'csv_rows',
+                'stub_latency_ms', 'stub_jitter_ms', 'stub_error_rate', 'seed',
+            )},
+        }
+
+    def print_table(self, results):
+        for name, summary in results.items():
+            latency = summary['latency_ms']
+            self.stdout.write(
+                f"{name:<16} n={summary['requests']:<6} err={summary['errors']:<4} "
+                f"rps={summary['throughput_rps']:>9} p50={latency['p50']}ms p95={latency['p95']}ms p99={latency['p99']}ms"
+            )
+
+    def print_comparison(self, baseline, results):
+        self.stdout.write('Change vs baseline:')
+        for name, summary in results.items():
+            before = baseline.get(name)
+            if not before:
+                continue
+            changes = []
+            for key in ('p50', 'p95', 'p99'):
+                old, new = before['latency_ms'][key], summary['latency_ms'][key]
+                if old and new is not None:
+                    changes.append(f"{key} {(new - old) / old * 100:+.1f}%")
+            old, new = before['throughput_rps'], summary['throughput_rps']
+            if old and new is not None:
+                changes.append(f"rps {(new - old) / old * 100:+.1f}%")
+            self.stdout.write(f"  {name:<16} " + ', '.join(changes))
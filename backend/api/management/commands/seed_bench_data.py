@@ -0,0 +1,70 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from api.models import Translation, UserTranslationHistory
+from api.utils.benchmark import BENCH_USER_PREFIX, LANGUAGE_PAIRS, fake_translation, phrase
+import random
+
+
+class Command(BaseCommand):
+    help = 'Generate benchmark fixtures: Translation rows, bench users and their translation history'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--translations', type=int, default=100000)
+        parser.add_argument('--history', type=int, default=100000, help='History rows, spread over the bench users')
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=42, help='Same seed, same rows: keeps runs comparable')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        users = self.ensure_users(options['users'])
+        batch_size = options['batch_size']
+
+        # Rows continue from the current count so repeated runs add data instead of colliding
+        offset = Translation.objects.filter(source_text__startswith='bench ').count()
+        created = 0
+        total = options['translations']
+        while created < total:
+            size = min(batch_size, total - created)
+            rows = []
+            for index in range(offset + created, offset + created + size):
+                source, target = LANGUAGE_PAIRS[index % len(LANGUAGE_PAIRS)]
+                text = f'bench {phrase(rng, index)}'
+                rows.append(Translation(
+                    source_text=text, translated_text=fake_translation(text, target),
+                    source_language=source, target_language=target,
+                    usage_count=int(rng.paretovariate(1.2)),
+                ))
+            Translation.objects.bulk_create(rows, ignore_conflicts=True)
+            created += size
+            self.stdout.write(f"Translations: {created}/{total}")
+
+        created = 0
+        total = options['history']
+        while created < total:
+            size = min(batch_size, total - created)
+            rows = []
+            for index in range(created, created + size):
+                source, target = LANGUAGE_PAIRS[index % len(LANGUAGE_PAIRS)]
+                text = f'bench {phrase(rng, index)}'
+                rows.append(UserTranslationHistory(
+                    user=users[index % len(users)], source_language=source, target_language=target,
+                    input_text=text, output_text=fake_translation(text, target), was_cached=rng.random() < 0.8,
+                ))
+            UserTranslationHistory.objects.bulk_create(rows)
+            created += size
+            self.stdout.write(f"History: {created}/{total}")
+
+    def ensure_users(self, count):
+        User = get_user_model()
+        users = []
+        for index in range(count):
+            user, created = User.objects.get_or_create(
+                username=f'{BENCH_USER_PREFIX}{index}',
+                defaults={'email': f'{BENCH_USER_PREFIX}{index}@example.com', 'is_approved': True},
+            )
+            if created:
+                user.set_unusable_password()
+                user.save(update_fields=['password'])
+            users.append(user)
+        return users
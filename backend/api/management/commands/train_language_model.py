@@ -0,0 +1,66 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from api.models import Translation
+from api.utils.langid import train
+import gzip
+import json
+import os
+import random
+import tempfile
+
+
+def labelled_texts(max_per_language, seed):
+    """``(text, language)`` samples from both sides of every Translation row, capped per language."""
+    rng = random.Random(seed)
+    samples = {}
+    rows = Translation.objects.order_by().values_list('source_text', 'source_language', 'translated_text', 'target_language')
+    for source_text, source_language, translated_text, target_language in rows.iterator(chunk_size=5000):
+        for text, language in ((source_text, source_language), (translated_text, target_language)):
+            bucket = samples.setdefault(language, [])
+            if len(bucket) < max_per_language:
+                bucket.append(text)
+            else:
+                # Reservoir sampling keeps an even sample of large languages
+                index = rng.randrange(len(bucket) * 2)
+                if index < max_per_language:
+                    bucket[index] = text
+    return samples
+
+
+class Command(BaseCommand):
+    help = ('Train the character n-gram language identification model from the Translation cache '
+            'and write it to LANGUAGE_MODEL_PATH. Workers load it on their next start.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=settings.LANGUAGE_MODEL_PATH)
+        parser.add_argument('--max-ngrams', type=int, default=3000, help='N-grams kept per language')
+        parser.add_argument('--max-texts', type=int, default=20000, help='Sample texts per language')
+        parser.add_argument('--min-texts', type=int, default=50, help='Skip languages with fewer texts')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        samples = labelled_texts(options['max_texts'], options['seed'])
+        skipped = sorted(language for language, texts in samples.items() if len(texts) < options['min_texts'])
+        samples = {language: texts for language, texts in samples.items() if language not in skipped}
+        if not samples:
+            raise CommandError('No language has enough cached texts to train on')
+
+        model = train(
+            ((text, language) for language, texts in samples.items() for text in texts), options['max_ngrams']
+        )
+        output = options['output']
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(output)), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as raw, gzip.open(raw, 'wt', encoding='utf-8') as handle:
+                json.dump(model, handle, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp_path, output)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        if skipped:
+            self.stdout.write(f"Skipped languages with fewer than {options['min_texts']} texts: {', '.join(skipped)}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {len(model['languages'])} languages ({sum(len(t) for t in samples.values())} texts) to {output}"
+        ))
@@ -0,0 +1,60 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Sum
+from django.utils import timezone
+from api.models import UsageRollup
+import json
+
+
+class Command(BaseCommand):
+    help = ('Report characters sent to Google Translate versus served from the cache, per user and in total, '
+            'with the estimated cost and the savings from caching. Reads the UsageRollup table, which '
+            'lags the workers by up to METERING_FLUSH_SECONDS.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30, help='Days to include, ending today')
+        parser.add_argument('--user', help='Only this username')
+        parser.add_argument('--top', type=int, default=20, help='Users listed, by upstream characters')
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+
+    def handle(self, *args, **options):
+        since = timezone.localdate() - timedelta(days=options['days'] - 1)
+        rollups = UsageRollup.objects.filter(day__gte=since)
+        if options['user']:
+            rollups = rollups.filter(user__username=options['user'])
+        sums = {field: Sum(field) for field in ('upstream_characters', 'upstream_requests', 'cached_characters', 'cached_requests')}
+
+        users = [
+            self.summarize(row) for row in
+            rollups.values('user__username').annotate(**sums).order_by('-upstream_characters')[:options['top']]
+        ]
+        totals = self.summarize(rollups.aggregate(**sums))
+        report = {'since': since.isoformat(), 'days': options['days'], 'totals': totals, 'users': users}
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        self.stdout.write(f"Usage since {report['since']} ({options['days']} days)")
+        for row in users:
+            self.stdout.write(
+                f"  {row['user__username']:<24} upstream {row['upstream_characters']:>12} chars "
+                f"({row['upstream_requests']} calls, ${row['cost']:.2f})  cached {row['cached_characters']:>12} chars "
+                f"(saved ${row['savings']:.2f}, {row['cache_share']:.1%})"
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"Total: {totals['upstream_characters']} characters upstream (${totals['cost']:.2f}), "
+            f"{totals['cached_characters']} from cache (saved ${totals['savings']:.2f}, {totals['cache_share']:.1%} of characters)"
+        ))
+
+    @staticmethod
+    def summarize(row):
+        row = {key: value or 0 for key, value in row.items()}
+        price = settings.METERING_PRICE_PER_MILLION_CHARACTERS / 1_000_000
+        characters = row['upstream_characters'] + row['cached_characters']
+        row.update(
+            cost=round(row['upstream_characters'] * price, 2),
+            savings=round(row['cached_characters'] * price, 2),
+            cache_share=round(row['cached_characters'] / characters, 4) if characters else 0.0,
+        )
+        return row
@@ -0,0 +1,167 @@
+from contextlib import ExitStack
+import gzip
+import logging
+import re
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils.cache import patch_vary_headers
+
+from . import db_router
+from .utils import metrics
+from .utils.querybudget import QueryBudgetExceeded, budget_for, count_queries
+
+logger = logging.getLogger(__name__)
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+_ACCEPT_ENCODING_ITEM = re.compile(r'\s*([^\s;,]+)\s*(?:;\s*q=([0-9.]+))?')
+
+
+class RequestMetricsMiddleware:
+    """
+    Times every request, counts its database queries, adds a ``Server-Timing``
+    header and records per-route histograms (see ``api.utils.metrics``).
+    Should be first in ``MIDDLEWARE`` so the total covers the whole stack.
+    """
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timer, token = metrics.start_request()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timer))
+                response = self.get_response(request)
+        finally:
+            metrics.finish_request(token)
+
+        duration = timer.elapsed()
+        match = getattr(request, 'resolver_match', None)
+        # The route pattern (not the path) keeps label cardinality bounded
+        route = match.route if match and match.route else 'unmatched'
+        metrics.record_request(route, request.method, response.status_code, timer, duration)
+        if settings.SERVER_TIMING_ENABLED:
+            response['Server-Timing'] = timer.server_timing(duration)
+        return response
+
+
+class QueryBudgetMiddleware:
+    """
+    Flags requests that run more queries than their view's budget (see
+    ``api.utils.querybudget``). Logs by default; raises when
+    ``QUERY_BUDGET_MODE`` is ``raise``.
+    """
+
+    def __init__(self, get_response):
+        if settings.QUERY_BUDGET_MODE not in ('log', 'raise'):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request._query_budget = settings.QUERY_BUDGET_DEFAULT or None
+        with count_queries() as counter:
+            response = self.get_response(request)
+
+        budget = request._query_budget
+        if budget is not None and counter.count > budget:
+            message = "%s %s exceeded its query budget of %d: %s"
+            args = (request.method, request.path, budget, counter.report(settings.QUERY_BUDGET_REPEAT_THRESHOLD))
+            if settings.QUERY_BUDGET_MODE == 'raise':
+                raise QueryBudgetExceeded(message % args)
+            logger.warning(message, *args)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._query_budget = budget_for(view_func, request._query_budget)
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Tracks each request for ``api.db_router.ReplicaRouter``: which view runs
+    (replica reads are opt-in per view) and whether it wrote, for
+    read-your-writes pinning. Unused when no replicas are configured.
+    """
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = db_router.start_request(request)
+        response = None
+        try:
+            response = self.get_response(request)
+        finally:
+            db_router.finish_request(token, response)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        db_router.allow_replica_for_view(view_func)
+
+
+class CompressionMiddleware:
+    """
+    Compresses API responses of at least ``RESPONSE_COMPRESSION_MIN_BYTES``
+    with brotli (if installed) or gzip, whichever the client prefers. Only
+    ``RESPONSE_COMPRESSION_TYPES`` are compressed: HTML pages carry CSRF
+    tokens and are left alone (BREACH).
+    """
+
+    def __init__(self, get_response):
+        if not settings.RESPONSE_COMPRESSION_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (
+            response.streaming
+            or response.has_header('Content-Encoding')
+            or len(response.content) < settings.RESPONSE_COMPRESSION_MIN_BYTES
+            or response.get('Content-Type', '').split(';')[0].strip() not in settings.RESPONSE_COMPRESSION_TYPES
+        ):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = self.negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding == 'br':
+            compressed = brotli.compress(response.content, quality=settings.RESPONSE_COMPRESSION_BROTLI_QUALITY)
+        elif encoding == 'gzip':
+            compressed = gzip.compress(response.content, compresslevel=settings.RESPONSE_COMPRESSION_GZIP_LEVEL, mtime=0)
+        else:
+            return response
+
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encoding
+        # The body differs per encoding, so a strong ETag would be wrong
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
+
+    @staticmethod
+    def negotiate(accept_encoding):
+        weights = {}
+        for match in _ACCEPT_ENCODING_ITEM.finditer(accept_encoding.lower()):
+            try:
+                weights[match.group(1)] = float(match.group(2) or 1)
+            except ValueError:
+                continue
+        wildcard = weights.get('*', 0)
+        candidates = [('br', weights.get('br', wildcard)), ('gzip', weights.get('gzip', wildcard))]
+        if brotli is None:
+            candidates = candidates[1:]
+        # Ties go to brotli: smaller output at comparable speed on JSON
+        encoding, weight = max(candidates, key=lambda item: item[1])
+        return encoding if weight > 0 else None
@@ -0,0 +1,65 @@
+from django.db import migrations
+
+# (index name, table, column)
+TRIGRAM_INDEXES = [
+    ('api_translation_source_trgm', 'api_translation', 'source_text'),
+    ('api_translation_translated_trgm', 'api_translation', 'translated_text'),
+    ('api_usertrahist_input_trgm', 'api_usertranslationhistory', 'input_text'),
+    ('api_usertrahist_output_trgm', 'api_usertranslationhistory', 'output_text'),
+]
+
+LOWER_INDEXES = [
+    ('api_translation_source_lower', 'api_translation', 'source_text'),
+    ('api_translation_translated_lower', 'api_translation', 'translated_text'),
+    ('api_usertrahist_input_lower', 'api_usertranslationhistory', 'input_text'),
+    ('api_usertrahist_output_lower', 'api_usertranslationhistory', 'output_text'),
+]
+
+
+def create_search_indexes(apps, schema_editor):
+    """
+    PostgreSQL: pg_trgm GIN indexes for substring search plus hash indexes on
+    lower(col) for exact search (hash, because unbounded TextFields can exceed
+    the btree row size limit). Built CONCURRENTLY so existing tables stay
+    writable. Other backends only get plain lower(col) expression indexes.
+    """
+    connection = schema_editor.connection
+    qn = schema_editor.quote_name
+
+    if connection.vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for name, table, column in TRIGRAM_INDEXES:
+            schema_editor.execute(
+                f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {qn(name)} '
+                f'ON {qn(table)} USING gin ({qn(column)} gin_trgm_ops)'
+            )
+        for name, table, column in LOWER_INDEXES:
+            schema_editor.execute(
+                f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {qn(name)} '
+                f'ON {qn(table)} USING hash (lower({qn(column)}))'
+            )
+    else:
+        for name, table, column in LOWER_INDEXES:
+            schema_editor.execute(
+                f'CREATE INDEX IF NOT EXISTS {qn(name)} ON {qn(table)} (lower({qn(column)}))'
+            )
+
+
+def drop_search_indexes(apps, schema_editor):
+    concurrently = 'CONCURRENTLY ' if schema_editor.connection.vendor == 'postgresql' else ''
+    for name, _table, _column in TRIGRAM_INDEXES + LOWER_INDEXES:
+        schema_editor.execute(f'DROP INDEX {concurrently}IF EXISTS {schema_editor.quote_name(name)}')
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('api', '0006_alter_translation_unique_together'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
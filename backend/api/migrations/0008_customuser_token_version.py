@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='token_version',
+            field=models.PositiveIntegerField(default=0, help_text='Bumped to invalidate cached authentication and previously issued tokens.'),
+        ),
+    ]
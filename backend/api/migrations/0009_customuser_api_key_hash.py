@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:40
+
+from django.db import migrations, models
+import hashlib
+
+
+def populate_api_key_hashes(apps, schema_editor):
+    CustomUser = apps.get_model('api', 'CustomUser')
+    seen = set()
+    users = CustomUser.objects.exclude(api_key__isnull=True).exclude(api_key='').order_by('pk')
+    for pk, api_key in users.values_list('pk', 'api_key').iterator():
+        digest = hashlib.sha256(api_key.encode()).hexdigest()
+        # A key shared by several accounts stays unusable for API-key auth
+        if digest in seen:
+            continue
+        seen.add(digest)
+        CustomUser.objects.filter(pk=pk).update(api_key_hash=digest)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_customuser_token_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='api_key_hash',
+            field=models.CharField(blank=True, editable=False, help_text='SHA-256 of api_key, used for API-key authentication.', max_length=64, null=True, unique=True),
+        ),
+        migrations.RunPython(populate_api_key_hashes, migrations.RunPython.noop),
+    ]
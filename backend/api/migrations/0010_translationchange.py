@@ -0,0 +1,132 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:59
+
+import django.db.models.functions.datetime
+from django.db import migrations, models
+
+COLUMNS = 'translation_id, operation, source_text, translated_text, source_language, target_language'
+
+POSTGRESQL_TRIGGERS = [
+    f"""CREATE OR REPLACE FUNCTION api_translation_log_insert() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO api_translationchange ({COLUMNS})
+    SELECT id, 'I', source_text, translated_text, source_language, target_language FROM new_rows ORDER BY id;
+    RETURN NULL;
+END $$""",
+    f"""CREATE OR REPLACE FUNCTION api_translation_log_update() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO api_translationchange ({COLUMNS})
+    SELECT * FROM (
+        SELECT o.id, 'D', o.source_text, o.translated_text, o.source_language, o.target_language
+        FROM old_rows o JOIN new_rows n ON n.id = o.id
+        WHERE (o.source_language, o.target_language) IS DISTINCT FROM (n.source_language, n.target_language)
+        UNION ALL
+        SELECT n.id,
+               CASE WHEN (o.source_language, o.target_language) IS DISTINCT FROM (n.source_language, n.target_language)
+                    THEN 'I' ELSE 'U' END,
+               n.source_text, n.translated_text, n.source_language, n.target_language
+        FROM old_rows o JOIN new_rows n ON n.id = o.id
+        WHERE (o.source_text, o.translated_text, o.source_language, o.target_language)
+              IS DISTINCT FROM (n.source_text, n.translated_text, n.source_language, n.target_language)
+    ) changes ORDER BY 1, 2;
+    RETURN NULL;
+END $$""",
+    f"""CREATE OR REPLACE FUNCTION api_translation_log_delete() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO api_translationchange ({COLUMNS})
+    SELECT id, 'D', source_text, translated_text, source_language, target_language FROM old_rows ORDER BY id;
+    RETURN NULL;
+END $$""",
+    """CREATE TRIGGER api_translation_log_insert AFTER INSERT ON api_translation
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION api_translation_log_insert()""",
+    """CREATE TRIGGER api_translation_log_update AFTER UPDATE ON api_translation
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION api_translation_log_update()""",
+    """CREATE TRIGGER api_translation_log_delete AFTER DELETE ON api_translation
+    REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION api_translation_log_delete()""",
+]
+
+SQLITE_TRIGGERS = [
+    f"""CREATE TRIGGER api_translation_log_insert AFTER INSERT ON api_translation BEGIN
+        INSERT INTO api_translationchange ({COLUMNS})
+        VALUES (NEW.id, 'I', NEW.source_text, NEW.translated_text, NEW.source_language, NEW.target_language);
+    END""",
+    f"""CREATE TRIGGER api_translation_log_move AFTER UPDATE ON api_translation
+    WHEN OLD.source_language IS NOT NEW.source_language OR OLD.target_language IS NOT NEW.target_language BEGIN
+        INSERT INTO api_translationchange ({COLUMNS})
+        VALUES (OLD.id, 'D', OLD.source_text, OLD.translated_text, OLD.source_language, OLD.target_language);
+        INSERT INTO api_translationchange ({COLUMNS})
+        VALUES (NEW.id, 'I', NEW.source_text, NEW.translated_text, NEW.source_language, NEW.target_language);
+    END""",
+    f"""CREATE TRIGGER api_translation_log_update AFTER UPDATE ON api_translation
+    WHEN OLD.source_language IS NEW.source_language AND OLD.target_language IS NEW.target_language
+         AND (OLD.source_text IS NOT NEW.source_text OR OLD.translated_text IS NOT NEW.translated_text) BEGIN
+        INSERT INTO api_translationchange ({COLUMNS})
+        VALUES (NEW.id, 'U', NEW.source_text, NEW.translated_text, NEW.source_language, NEW.target_language);
+    END""",
+    f"""CREATE TRIGGER api_translation_log_delete AFTER DELETE ON api_translation BEGIN
+        INSERT INTO api_translationchange ({COLUMNS})
+        VALUES (OLD.id, 'D', OLD.source_text, OLD.translated_text, OLD.source_language, OLD.target_language);
+    END""",
+]
+
+TRIGGER_NAMES = ['api_translation_log_insert', 'api_translation_log_move', 'api_translation_log_update',
+                 'api_translation_log_delete']
+
+
+def create_change_log_triggers(apps, schema_editor):
+    """
+    Record every Translation write in api_translationchange. PostgreSQL uses
+    statement-level triggers with transition tables, so a bulk insert or
+    chunked delete costs one extra INSERT ... SELECT per statement. Existing
+    rows are logged as inserts so the feed is complete from version 0. Other
+    backends get no triggers and an empty change log.
+    """
+    connection = schema_editor.connection
+    statements = {'postgresql': POSTGRESQL_TRIGGERS, 'sqlite': SQLITE_TRIGGERS}.get(connection.vendor)
+    if statements is None:
+        return
+    for statement in statements:
+        schema_editor.execute(statement)
+    schema_editor.execute(
+        f"INSERT INTO api_translationchange ({COLUMNS}) "
+        "SELECT id, 'I', source_text, translated_text, source_language, target_language "
+        "FROM api_translation ORDER BY id"
+    )
+
+
+def drop_change_log_triggers(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor not in ('postgresql', 'sqlite'):
+        return
+    for name in TRIGGER_NAMES:
+        on_table = ' ON api_translation' if connection.vendor == 'postgresql' else ''
+        schema_editor.execute(f'DROP TRIGGER IF EXISTS {name}{on_table}')
+    if connection.vendor == 'postgresql':
+        for name in ('api_translation_log_insert', 'api_translation_log_update', 'api_translation_log_delete'):
+            schema_editor.execute(f'DROP FUNCTION IF EXISTS {name}()')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_customuser_api_key_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TranslationChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('translation_id', models.BigIntegerField()),
+                ('operation', models.CharField(choices=[('I', 'insert'), ('U', 'update'), ('D', 'delete')], max_length=1)),
+                ('source_text', models.TextField()),
+                ('translated_text', models.TextField()),
+                ('source_language', models.CharField(max_length=10)),
+                ('target_language', models.CharField(max_length=10)),
+                ('changed_at', models.DateTimeField(db_default=django.db.models.functions.datetime.Now())),
+            ],
+            options={
+                'indexes': [models.Index(fields=['source_language', 'target_language', 'id'], name='api_transla_source__f2053e_idx'), models.Index(fields=['changed_at'], name='api_transla_changed_fa96fb_idx')],
+            },
+        ),
+        migrations.RunPython(create_change_log_triggers, drop_change_log_triggers),
+    ]
@@ -0,0 +1,40 @@
+from django.db import migrations
+
+INDEX_NAME = 'api_translation_prefix_pattern'
+
+
+def create_prefix_index(apps, schema_editor):
+    """
+    PostgreSQL: btree over the lower-cased first 64 characters of source_text
+    with text_pattern_ops, so ``LIKE 'prefix%'`` (the autocomplete database
+    fallback) is an index range scan under any collation. The column is
+    truncated because unbounded TextFields can exceed the btree row size
+    limit. Other backends rely on the in-memory index.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    qn = schema_editor.quote_name
+    schema_editor.execute(
+        f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {qn(INDEX_NAME)} ON {qn("api_translation")} '
+        f'({qn("target_language")}, {qn("source_language")}, (lower(left({qn("source_text")}, 64))) text_pattern_ops)'
+    )
+
+
+def drop_prefix_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {schema_editor.quote_name(INDEX_NAME)}')
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('api', '0010_translationchange'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_prefix_index, drop_prefix_index),
+    ]
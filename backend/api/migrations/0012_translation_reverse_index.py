@@ -0,0 +1,39 @@
+from django.db import migrations
+
+INDEX_NAME = 'api_translation_reverse_md5'
+
+
+def create_reverse_index(apps, schema_editor):
+    """
+    PostgreSQL: btree over (md5(translated_text), target_language,
+    source_language) for reverse lookups in translate_text. The digest keeps
+    index entries small whatever the text length (a plain btree on the
+    TextField can exceed the row size limit). Other backends do without.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    qn = schema_editor.quote_name
+    schema_editor.execute(
+        f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {qn(INDEX_NAME)} ON {qn("api_translation")} '
+        f'((md5({qn("translated_text")})), {qn("target_language")}, {qn("source_language")})'
+    )
+
+
+def drop_reverse_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {schema_editor.quote_name(INDEX_NAME)}')
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('api', '0011_translation_prefix_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_reverse_index, drop_reverse_index),
+    ]
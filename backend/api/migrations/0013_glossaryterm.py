@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_translation_reverse_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GlossaryTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_language', models.CharField(max_length=10)),
+                ('target_language', models.CharField(max_length=10)),
+                ('term', models.CharField(max_length=255)),
+                ('translation', models.CharField(blank=True, default='', max_length=255)),
+                ('case_sensitive', models.BooleanField(default=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'unique_together': {('source_language', 'target_language', 'term')},
+            },
+        ),
+    ]
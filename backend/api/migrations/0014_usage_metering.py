@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:19
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_glossaryterm'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='daily_character_quota',
+            field=models.PositiveIntegerField(blank=True, help_text='Characters per day sent to Google Translate. Empty uses METERING_DAILY_CHARACTER_QUOTA; 0 means unlimited.', null=True),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='daily_request_quota',
+            field=models.PositiveIntegerField(blank=True, help_text='Google Translate calls per day. Empty uses METERING_DAILY_REQUEST_QUOTA; 0 means unlimited.', null=True),
+        ),
+        migrations.CreateModel(
+            name='UsageRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('upstream_characters', models.BigIntegerField(default=0)),
+                ('upstream_requests', models.BigIntegerField(default=0)),
+                ('cached_characters', models.BigIntegerField(default=0)),
+                ('cached_requests', models.BigIntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='usage_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day'], name='api_usagero_day_ba82c7_idx')],
+                'unique_together': {('user', 'day')},
+            },
+        ),
+    ]
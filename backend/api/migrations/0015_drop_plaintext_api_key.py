@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:33
+
+from django.db import migrations, models
+import hashlib
+
+
+def hash_remaining_api_keys(apps, schema_editor):
+    # Keys saved without a digest since 0009 would otherwise be lost with the column
+    CustomUser = apps.get_model('api', 'CustomUser')
+    seen = set(CustomUser.objects.exclude(api_key_hash__isnull=True).values_list('api_key_hash', flat=True))
+    users = (
+        CustomUser.objects.filter(api_key_hash__isnull=True)
+        .exclude(api_key__isnull=True).exclude(api_key='').order_by('pk')
+    )
+    for pk, api_key in users.values_list('pk', 'api_key').iterator():
+        digest = hashlib.sha256(api_key.encode()).hexdigest()
+        # A key shared by several accounts stays unusable for API-key auth
+        if digest in seen:
+            continue
+        seen.add(digest)
+        CustomUser.objects.filter(pk=pk).update(api_key_hash=digest)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_usage_metering'),
+    ]
+
+    operations = [
+        migrations.RunPython(hash_remaining_api_keys, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='customuser',
+            name='api_key',
+        ),
+        migrations.AlterField(
+            model_name='customuser',
+            name='api_key_hash',
+            field=models.CharField(blank=True, editable=False, help_text='SHA-256 of the API key, used for API-key authentication.', max_length=64, null=True, unique=True),
+        ),
+    ]
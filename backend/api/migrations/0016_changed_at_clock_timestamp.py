@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:40
+
+import api.models.translation
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_drop_plaintext_api_key'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='translationchange',
+            name='changed_at',
+            field=models.DateTimeField(db_default=api.models.translation.ClockTimestamp()),
+        ),
+    ]
@@ -0,0 +1,88 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:59
+
+from importlib import import_module
+
+from django.db import migrations, models
+
+initial = import_module('api.migrations.0010_translationchange')
+COLUMNS = initial.COLUMNS
+
+# The UPDATE runs as its own statement, so its snapshot is taken after the
+# statement above assigned the change ids: any transaction that took a lower
+# id already had its xid, which is below this snapshot's xmax.
+SEAL = """
+    UPDATE api_translationchange SET horizon = pg_snapshot_xmax(pg_current_snapshot())::text::bigint
+    WHERE id >= first_id AND horizon IS NULL;"""
+
+
+def log_function(name, select):
+    return f"""CREATE OR REPLACE FUNCTION {name}() RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE
+    first_id bigint;
+BEGIN
+    WITH logged AS (
+        INSERT INTO api_translationchange ({COLUMNS})
+        {select}
+        RETURNING id
+    )
+    SELECT min(id) INTO first_id FROM logged;{SEAL}
+    RETURN NULL;
+END $$"""
+
+
+POSTGRESQL_FUNCTIONS = [
+    log_function('api_translation_log_insert', """SELECT id, 'I', source_text, translated_text, source_language, target_language
+        FROM new_rows ORDER BY id"""),
+    log_function('api_translation_log_update', """SELECT * FROM (
+            SELECT o.id, 'D', o.source_text, o.translated_text, o.source_language, o.target_language
+            FROM old_rows o JOIN new_rows n ON n.id = o.id
+            WHERE (o.source_language, o.target_language) IS DISTINCT FROM (n.source_language, n.target_language)
+            UNION ALL
+            SELECT n.id,
+                   CASE WHEN (o.source_language, o.target_language) IS DISTINCT FROM (n.source_language, n.target_language)
+                        THEN 'I' ELSE 'U' END,
+                   n.source_text, n.translated_text, n.source_language, n.target_language
+            FROM old_rows o JOIN new_rows n ON n.id = o.id
+            WHERE (o.source_text, o.translated_text, o.source_language, o.target_language)
+                  IS DISTINCT FROM (n.source_text, n.translated_text, n.source_language, n.target_language)
+        ) changes ORDER BY 1, 2"""),
+    log_function('api_translation_log_delete', """SELECT id, 'D', source_text, translated_text, source_language, target_language
+        FROM old_rows ORDER BY id"""),
+]
+
+
+def record_horizons(apps, schema_editor):
+    """
+    Have the PostgreSQL change-log triggers record each change's horizon
+    (see ``TranslationChange``). Changes logged so far are committed, so they
+    get horizon 0: settled. SQLite keeps its triggers and settles by time.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('UPDATE api_translationchange SET horizon = 0')
+    for statement in POSTGRESQL_FUNCTIONS:
+        schema_editor.execute(statement)
+
+
+def restore_functions(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for statement in initial.POSTGRESQL_TRIGGERS:
+        if statement.startswith('CREATE OR REPLACE FUNCTION'):
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_changed_at_clock_timestamp'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='translationchange',
+            name='horizon',
+            field=models.BigIntegerField(db_index=True, editable=False, null=True),
+        ),
+        migrations.RunPython(record_horizons, restore_functions),
+    ]
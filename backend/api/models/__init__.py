@@ -1,5 +1,7 @@
 from .user import CustomUser
-from .translation import Translation
+from .translation import Translation, TranslationChange
 from .history import UserTranslationHistory
+from .glossary import GlossaryTerm
+from .usage import UsageRollup
 
-__all__ = ['CustomUser', 'Translation', 'UserTranslationHistory'] 
\ No newline at end of file
+__all__ = ['CustomUser', 'Translation', 'TranslationChange', 'UserTranslationHistory', 'GlossaryTerm', 'UsageRollup'] 
\ No newline at end of file
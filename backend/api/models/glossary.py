@@ -0,0 +1,21 @@
+from django.db import models
+
+
+class GlossaryTerm(models.Model):
+    """
+    Required terminology for a language pair, enforced on upstream
+    translations (see ``api.utils.glossary``). A blank ``translation``
+    protects the term: it is kept as written (brand and product names).
+    """
+    source_language = models.CharField(max_length=10)
+    target_language = models.CharField(max_length=10)
+    term = models.CharField(max_length=255)
+    translation = models.CharField(max_length=255, blank=True, default='')
+    case_sensitive = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['source_language', 'target_language', 'term']
+
+    def __str__(self):
+        return f"{self.source_language} -> {self.target_language}: {self.term} => {self.translation or self.term}"
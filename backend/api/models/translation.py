@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Now
 
 class Translation(models.Model):
     source_text = models.TextField()
@@ -17,4 +18,55 @@ class Translation(models.Model):
         unique_together = ['source_text', 'source_language', 'target_language', 'translated_text']
         
     def __str__(self):
-        return f"{self.source_language} -> {self.target_language}: {self.source_text[:50]}..." 
\ No newline at end of file
+        return f"{self.source_language} -> {self.target_language}: {self.source_text[:50]}..." 
+
+
+class ClockTimestamp(Now):
+    """
+    The time the row is written. On PostgreSQL Now() is the start of the
+    statement, which for a trigger fired by a slow bulk write is already in
+    the past; clock_timestamp() is not.
+    """
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, template='CLOCK_TIMESTAMP()', **extra_context)
+
+
+class TranslationChange(models.Model):
+    """
+    Append-only log of Translation inserts, content updates and deletes,
+    written by database triggers (migration 0010) so bulk inserts, queryset
+    deletes and raw SQL are captured too. The id is the change-feed version.
+    Updates that only touch usage_count/last_accessed are not logged; moving
+    a row to another language pair is logged as a delete plus an insert.
+
+    An id is taken when the change is written but becomes visible when its
+    transaction commits, so the feed only hands out settled changes. On
+    PostgreSQL the triggers (migration 0017) record ``horizon``, the xmax of
+    a snapshot taken after the ids were assigned; every transaction that can
+    hold a lower id is below it, so a change is settled once ``horizon`` is
+    at most the reader's snapshot xmin. This holds for writers in READ
+    COMMITTED, Django's default. On SQLite, which has one writer at a time,
+    a change is settled CHANGE_FEED_SETTLE_SECONDS after ``changed_at``.
+    """
+    INSERT = 'I'
+    UPDATE = 'U'
+    DELETE = 'D'
+    OPERATIONS = [(INSERT, 'insert'), (UPDATE, 'update'), (DELETE, 'delete')]
+
+    translation_id = models.BigIntegerField()
+    operation = models.CharField(max_length=1, choices=OPERATIONS)
+    source_text = models.TextField()
+    translated_text = models.TextField()
+    source_language = models.CharField(max_length=10)
+    target_language = models.CharField(max_length=10)
+    changed_at = models.DateTimeField(db_default=ClockTimestamp())
+    horizon = models.BigIntegerField(null=True, editable=False, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['source_language', 'target_language', 'id']),
+            models.Index(fields=['changed_at']),
+        ]
+
+    def __str__(self):
+        return f"#{self.pk} {self.get_operation_display()} {self.translation_id}"
@@ -0,0 +1,25 @@
+from django.db import models
+from .user import CustomUser
+
+
+class UsageRollup(models.Model):
+    """
+    Per-user, per-day translation volume. Workers count in memory and add
+    their counts here in batches (``api.utils.metering``), so requests
+    never lock these rows.
+    """
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='usage_rollups')
+    day = models.DateField()
+    upstream_characters = models.BigIntegerField(default=0)
+    upstream_requests = models.BigIntegerField(default=0)
+    cached_characters = models.BigIntegerField(default=0)
+    cached_requests = models.BigIntegerField(default=0)
+
+    class Meta:
+        unique_together = ['user', 'day']
+        indexes = [
+            models.Index(fields=['day']),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.day}: {self.upstream_characters} upstream / {self.cached_characters} cached characters"
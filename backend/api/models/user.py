@@ -1,6 +1,29 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+import hashlib
+
+
+def hash_api_key(api_key):
+    """
+    Digest stored in ``CustomUser.api_key_hash``. Keys are long random tokens
+    generated by the set-api-key view, so an unsalted SHA-256 is sufficient
+    and keeps lookups a single index probe.
+    """
+    return hashlib.sha256(api_key.encode()).hexdigest()
+
 
 class CustomUser(AbstractUser):
-    api_key = models.CharField(max_length=255, blank=True, null=True)
-    is_approved = models.BooleanField(default=False, help_text='Designates whether this user has been approved to access the system.') 
\ No newline at end of file
+    # Only the digest is stored; the key itself is shown once, when it is set
+    api_key_hash = models.CharField(max_length=64, unique=True, blank=True, null=True, editable=False,
+                                    help_text='SHA-256 of the API key, used for API-key authentication.')
+    is_approved = models.BooleanField(default=False, help_text='Designates whether this user has been approved to access the system.')
+    token_version = models.PositiveIntegerField(default=0, help_text='Bumped to invalidate cached authentication and previously issued tokens.')
+    daily_character_quota = models.PositiveIntegerField(
+        blank=True, null=True,
+        help_text='Characters per day sent to Google Translate. Empty uses METERING_DAILY_CHARACTER_QUOTA; 0 means unlimited.')
+    daily_request_quota = models.PositiveIntegerField(
+        blank=True, null=True,
+        help_text='Google Translate calls per day. Empty uses METERING_DAILY_REQUEST_QUOTA; 0 means unlimited.')
+
+    def set_api_key(self, api_key):
+        self.api_key_hash = hash_api_key(api_key) if api_key else None
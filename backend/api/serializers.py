@@ -1,11 +1,41 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
-import secrets
+from django.db import IntegrityError, transaction
+from django.db.models import BigIntegerField, Count, Max, Q, Value
+from django.db.models.functions import Cast, NullIf, Substr
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from .tokens import FilteredRefreshToken
 import logging
+import re
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
 
+USERNAME_ALLOCATION_ATTEMPTS = 5
+
+
+def next_available_username(base_username):
+    """
+    Return ``base_username`` if no user has exactly that name, otherwise
+    ``base_username`` followed by one more than the highest numeric suffix in
+    use (john, john1, john2, ...).
+    One aggregate query regardless of how many suffixed names exist; the
+    startswith prefilter lets the username index narrow the scan.
+    """
+    taken = (
+        User.objects.filter(username__startswith=base_username)
+        .filter(username__regex=rf'^{re.escape(base_username)}([0-9]{{1,9}})?$')
+        .annotate(suffix=Cast(
+            NullIf(Substr('username', len(base_username) + 1), Value('')),
+            BigIntegerField(),
+        ))
+        .aggregate(base=Count('pk', filter=Q(username=base_username)), highest=Max('suffix'))
+    )
+    if not taken['base']:
+        return base_username
+    return f"{base_username}{(taken['highest'] or 0) + 1}"
+
+
 class UserRegistrationSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, required=True)
     
@@ -17,31 +47,34 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         logger.debug("=== Registration Process ===")
         # Generate a random username from the email
         email = validated_data['email']
-        username = email.split('@')[0]
-        
-        # Make username unique if necessary
-        base_username = username
-        counter = 1
-        while User.objects.filter(username=username).exists():
-            username = f"{base_username}{counter}"
-            counter += 1
-
-        # Generate API key
-        api_key = secrets.token_urlsafe(32)
-
-        logger.debug(f"Creating user with username: {username}")
-        logger.debug(f"Password provided: {validated_data['password']}")
-
-        # Create user with the provided password and set is_approved to False
-        user = User.objects.create_user(
-            username=username,
-            email=email,
-            api_key=api_key,
-            password=validated_data['password'],
-            is_approved=False  # Set user as unapproved by default
-        )
-
-        logger.debug(f"User created successfully: {user.username}")
-        logger.debug(f"User has_usable_password: {user.has_usable_password()}")
+        base_username = email.split('@')[0]
+
+        # Create user with the provided password and set is_approved to False.
+        # The username is allocated in one query; the unique constraint on
+        # username catches concurrent signups, which retry with a fresh suffix.
+        for attempt in range(USERNAME_ALLOCATION_ATTEMPTS):
+            username = next_available_username(base_username)
+            logger.debug("Creating user with username: %s", username)
+            try:
+                with transaction.atomic():
+                    user = User.objects.create_user(
+                        username=username,
+                        email=email,
+                        password=validated_data['password'],
+                        is_approved=False  # Set user as unapproved by default
+                    )
+                break
+            except IntegrityError:
+                if attempt == USERNAME_ALLOCATION_ATTEMPTS - 1:
+                    raise
+                logger.debug("Username %s taken concurrently, retrying", username)
+
+        logger.debug("User created successfully: %s", user.username)
+        logger.debug("User has_usable_password: %s", user.has_usable_password())
         logger.debug("=== End Registration Process ===")
-        return user 
\ No newline at end of file
+        return user
+
+
+class FilteredTokenRefreshSerializer(TokenRefreshSerializer):
+    """Token refresh that checks the per-worker revocation filter before the blacklist table."""
+    token_class = FilteredRefreshToken
@@ -1,3 +1,932 @@
-from django.test import TestCase
+import gzip
+import json
+import logging
+import sqlite3
+import tempfile
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.contrib.admin.sites import AdminSite
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from .admin import TranslationAdmin
+from .authentication import _api_key_cache, _user_cache
+from . import db_router
+from .middleware import CompressionMiddleware
+from .models import CustomUser, GlossaryTerm, Translation, TranslationChange, UsageRollup, UserTranslationHistory
+from .models.user import hash_api_key
+from .renderers import ORJSONRenderer
+from .serializers import next_available_username
+from .utils.autocomplete import AutocompleteIndex
+from .utils.bundles import build_bundle, bundle_path
+from .utils.changes import current_version, prune_changes, settled_version
+from .utils.csv_import import TranslationImportBatch
+from .utils.glossary import Glossary, glossaries
+from .utils.log import AsyncStreamHandler, JSONFormatter
+from .utils.langid import LanguageIdentifier, train
+from .utils import maintenance
+from .utils.metering import UsageMeter
+from .utils.memory import TranslationMemory
+from .utils.metrics import collect
+from .utils.querybudget import QueryBudgetExceeded, assert_max_queries, normalize_sql
+from .utils.retention import run_retention
+from .utils.revocation import BloomFilter, RevokedTokenFilter
+from .utils.search import exact_match_filter
+from .views.auth import CustomTokenObtainPairSerializer
+
+# No per-worker background threads or metered usage left over for the exit flush:
+# tests build and flush explicitly (MeteringTests turns metering back on)
+_test_settings = override_settings(BACKGROUND_TASKS_ENABLED=False, METERING_ENABLED=False)
+
+
+def setUpModule():
+    _test_settings.enable()
+
+
+def tearDownModule():
+    _test_settings.disable()
+
+
+class AdminSearchTests(TestCase):
+    def setUp(self):
+        self.admin = TranslationAdmin(Translation, AdminSite())
+        self.request = RequestFactory().get('/admin/api/translation/')
+        for source, translated in [('Hola', 'hello'), ('hola amigo', 'hello friend'), ('adios', 'goodbye')]:
+            Translation.objects.create(
+                source_text=source, translated_text=translated, source_language='es', target_language='en'
+            )
+
+    def search(self, term):
+        queryset, _ = self.admin.get_search_results(self.request, Translation.objects.all(), term)
+        return sorted(queryset.values_list('source_text', flat=True))
+
+    def test_plain_fields_use_trigram_lookup(self):
+        self.assertEqual(
+            self.admin.get_search_fields(self.request),
+            ['source_text__trgm_icontains', 'translated_text__trgm_icontains'],
+        )
+        self.assertEqual(self.search('HOLA'), ['Hola', 'hola amigo'])
+        self.assertEqual(list(Translation.objects.filter(translated_text__trgm_icontains='BYE').values_list(
+            'source_text', flat=True)), ['adios'])
+
+    def test_equals_prefix_matches_whole_value(self):
+        self.assertEqual(self.search('=HOLA'), ['Hola'])
+        self.assertEqual(self.search('= Hello Friend '), ['hola amigo'])
+        aliases, q = exact_match_filter('x', ('source_text', 'translated_text'))
+        self.assertEqual(sorted(aliases), ['_exact_source_text', '_exact_translated_text'])
+        self.assertEqual(len(q.children), 2)
+
+
+class MaintenanceTests(TestCase):
+    def translation(self, source, translated, usage_count=0, days_ago=0):
+        row = Translation.objects.create(
+            source_text=source, translated_text=translated, source_language='es', target_language='en',
+            usage_count=usage_count,
+        )
+        if days_ago:
+            Translation.objects.filter(pk=row.pk).update(last_accessed=timezone.now() - timedelta(days=days_ago))
+        return row
+
+    def test_evict_cold_translations(self):
+        self.translation('viejo', 'old', days_ago=400)
+        self.translation('usado', 'used', usage_count=3, days_ago=400)
+        self.translation('nuevo', 'new')
+        self.assertEqual(maintenance.evict_cold_translations(older_than_days=180, dry_run=True), 1)
+        self.assertEqual(maintenance.evict_cold_translations(older_than_days=180, chunk_size=1), 1)
+        self.assertEqual(sorted(Translation.objects.values_list('source_text', flat=True)), ['nuevo', 'usado'])
+
+    def test_merge_duplicate_synonyms_across_ranges(self):
+        keep = self.translation('casa', 'house', usage_count=2, days_ago=10)
+        self.translation('casa', ' House', usage_count=3)
+        self.translation('casa', 'HOUSE ', usage_count=1)
+        self.translation('casa', 'home')
+        other = self.translation('perro', 'dog', usage_count=1)
+        self.translation('perro', 'Dog', usage_count=1)
+        self.translation('gato', 'cat')
+
+        self.assertEqual(maintenance.merge_duplicate_synonyms(dry_run=True), (2, 3))
+        # One-row ranges: each source text is still merged as a whole
+        self.assertEqual(maintenance.merge_duplicate_synonyms(chunk_size=1), (2, 3))
+        self.assertEqual(Translation.objects.count(), 4)
+        keep.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((keep.usage_count, other.usage_count), (6, 2))
+        self.assertGreater(keep.last_accessed, timezone.now() - timedelta(days=1))
+        self.assertEqual(maintenance.merge_duplicate_synonyms(), (0, 0))
+
+    def test_recompute_usage_counts(self):
+        user = CustomUser.objects.create_user('maintainer', 'maintainer@example.com', 'pw12345!')
+        counted = self.translation('hola', 'hello', usage_count=40)
+        unused = self.translation('adios', 'goodbye', usage_count=7)
+        for _ in range(2):
+            UserTranslationHistory.objects.create(
+                user=user, source_language='es', target_language='en', input_text='hola', output_text='hello'
+            )
+        self.assertEqual(maintenance.recompute_usage_counts(chunk_size=1), 2)
+        counted.refresh_from_db()
+        unused.refresh_from_db()
+        self.assertEqual((counted.usage_count, unused.usage_count), (2, 0))
+
+
+class RetentionTests(TestCase):
+    def setUp(self):
+        now = timezone.now()
+        # (source, usage_count, idle days, pair)
+        for source, usage_count, idle, pair in [
+            ('fresh', 0, 0, ('es', 'en')), ('popular', 50, 60, ('es', 'en')), ('stale', 0, 60, ('es', 'en')),
+            ('idle', 2, 30, ('es', 'en')), ('other', 0, 90, ('fr', 'en')),
+        ]:
+            row = Translation.objects.create(
+                source_text=source, translated_text=source.upper(), source_language=pair[0], target_language=pair[1],
+                usage_count=usage_count,
+            )
+            Translation.objects.filter(pk=row.pk).update(last_accessed=now - timedelta(days=idle))
+
+    def remaining(self):
+        return sorted(Translation.objects.values_list('source_text', flat=True))
+
+    def config(self, **overrides):
+        return {'TTL_DAYS': 0, 'MIN_USAGE_COUNT': 0, 'MIN_SCORE': 0, 'MAX_ROWS_PER_LANGUAGE_PAIR': 0,
+                'BATCH_SIZE': 1, 'BATCH_PAUSE_SECONDS': 0, **overrides}
+
+    def test_ttl_in_batches(self):
+        metrics = run_retention(self.config(TTL_DAYS=45), dry_run=True)
+        self.assertEqual(metrics['ttl']['rows'], 3)
+        self.assertEqual(metrics['ttl']['bytes'], len('popularPOPULARstaleSTALEotherOTHER'))
+        self.assertEqual(self.remaining(), ['fresh', 'idle', 'other', 'popular', 'stale'])
+
+        metrics = run_retention(self.config(TTL_DAYS=45))
+        self.assertEqual(metrics['ttl']['rows'], 3)
+        self.assertEqual(self.remaining(), ['fresh', 'idle'])
+
+    def test_max_rows_evicts_lowest_scores_per_pair(self):
+        # Scores (half-life 30 days): stale 0.25, idle 1.5, fresh 1, popular 12.75
+        self.assertEqual(run_retention(self.config(MAX_ROWS_PER_LANGUAGE_PAIR=2), dry_run=True)['max_rows']['rows'], 2)
+        self.assertEqual(run_retention(self.config(MAX_ROWS_PER_LANGUAGE_PAIR=2))['max_rows']['rows'], 2)
+        self.assertEqual(self.remaining(), ['idle', 'other', 'popular'])
+
+
+@override_settings(TOKEN_REVOCATION_SYNC_SECONDS=0)
+class RevocationFilterTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user('revoker', 'revoker@example.com', 'pw12345!', is_approved=True)
+        self.filter = RevokedTokenFilter()
+        patcher = mock.patch('api.tokens.revoked_tokens', self.filter)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_bloom_filter(self):
+        bloom = BloomFilter(1000, 0.01)
+        for i in range(1000):
+            bloom.add(f'jti-{i}')
+        self.assertTrue(all(f'jti-{i}' in bloom for i in range(1000)))
+        false_positives = sum(f'other-{i}' in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+    def test_unbuilt_filter_defers_to_blacklist(self):
+        refresh = CustomTokenObtainPairSerializer.get_token(self.user)
+        self.assertTrue(self.filter.might_be_revoked(refresh['jti']))
+        refresh.blacklist()
+        response = self.client.post('/api/token/refresh', {'refresh': str(refresh)})
+        self.assertEqual(response.status_code, 401)
+
+    def test_rebuild_and_incremental_sync(self):
+        revoked = CustomTokenObtainPairSerializer.get_token(self.user)
+        revoked.blacklist()
+        self.filter.rebuild()
+        kept = CustomTokenObtainPairSerializer.get_token(self.user)
+        self.assertTrue(self.filter.might_be_revoked(revoked['jti']))
+        self.assertFalse(self.filter.might_be_revoked(kept['jti']))
+
+        # A revocation by another worker (no signal here) is picked up by the next sync
+        later = CustomTokenObtainPairSerializer.get_token(self.user)
+        BlacklistedToken.objects.bulk_create([BlacklistedToken(token=OutstandingToken.objects.get(jti=later['jti']))])
+        self.assertTrue(self.filter.might_be_revoked(later['jti']))
+        # Re-reading the overlap window does not count the same JTIs again
+        for _ in range(3):
+            self.filter.sync()
+        self.assertEqual(self.filter._bloom.count, 2)
+
+        response = self.client.post('/api/token/refresh', {'refresh': str(kept)})
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(TOKEN_REVOCATION_CAPACITY=2)
+    def test_rebuild_sizes_filter_from_entries(self):
+        for _ in range(3):
+            CustomTokenObtainPairSerializer.get_token(self.user).blacklist()
+        self.filter.rebuild()
+        self.assertEqual((self.filter._bloom.capacity, self.filter._bloom.count), (6, 3))
+
+
+class UsernameAllocationTests(TestCase):
+    def test_next_available_username(self):
+        self.assertEqual(next_available_username('john'), 'john')
+        for username in ('john5', 'johnny', 'john2x'):
+            CustomUser.objects.create_user(username, f'{username}@example.com', 'pw12345!')
+        self.assertEqual(next_available_username('john'), 'john')
+        CustomUser.objects.create_user('john', 'john@example.com', 'pw12345!')
+        self.assertEqual(next_available_username('john'), 'john6')
+
+
+class APIKeyAuthenticationTests(TestCase):
+    def setUp(self):
+        _api_key_cache.clear()
+        self.addCleanup(_api_key_cache.clear)
+        self.user = CustomUser.objects.create_user('machine', 'machine@example.com', 'pw12345!', is_approved=True)
+        token = CustomTokenObtainPairSerializer.get_token(self.user)
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {token.access_token}'}
+
+    def history(self, api_key):
+        return self.client.get('/api/translations/history', HTTP_X_API_KEY=api_key)
+
+    def test_generated_key_is_shown_once_and_stored_hashed(self):
+        response = self.client.post('/api/set-api-key', **self.auth)
+        self.assertEqual(response.status_code, 201)
+        api_key = response.json()['api_key']
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.api_key_hash, hash_api_key(api_key))
+        self.assertFalse(hasattr(self.user, 'api_key'))
+
+        self.assertEqual(self.history(api_key).status_code, 200)
+        # Served from the per-worker cache afterwards
+        with assert_max_queries(2):
+            self.assertEqual(self.history(api_key).status_code, 200)
+        self.assertEqual(self.history('wrong').status_code, 401)
+
+    def test_chosen_key_is_rejected(self):
+        response = self.client.post('/api/set-api-key', {'api_key': 'my-key'}, **self.auth)
+        self.assertEqual(response.status_code, 400)
+        self.user.refresh_from_db()
+        self.assertIsNone(self.user.api_key_hash)
+
+    def test_unapproved_user_is_rejected(self):
+        api_key = self.client.post('/api/set-api-key', **self.auth).json()['api_key']
+        CustomUser.objects.filter(pk=self.user.pk).update(is_approved=False)
+        self.assertEqual(self.history(api_key).status_code, 401)
+
+
+class LoginTests(TestCase):
+    def test_unapproved_user_gets_no_token(self):
+        user = CustomUser.objects.create_user('pending', 'pending@example.com', 'pw12345!')
+        response = self.client.post('/api/token', {'username': 'pending', 'password': 'pw12345!'})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(OutstandingToken.objects.filter(user=user).exists())
+        user.refresh_from_db()
+        self.assertIsNone(user.last_login)
+
+        self.assertEqual(self.client.post('/api/token', {'username': 'pending', 'password': 'wrong'}).status_code, 401)
+
+
+class AsyncLogHandlerTests(SimpleTestCase):
+    def test_record_is_rendered_in_calling_thread(self):
+        class Live:
+            value = 'before'
+
+            def __str__(self):
+                return self.value
+
+        live = Live()
+        handler = AsyncStreamHandler()
+        handler.setFormatter(JSONFormatter())
+        record = logging.LogRecord('api.test', logging.INFO, __file__, 1, 'value is %s', (live,), None)
+        record.request = live
+        prepared = handler.prepare(record)
+        live.value = 'after'
+
+        payload = json.loads(handler.format(prepared))
+        self.assertEqual((payload['message'], payload['request']), ('value is before', 'before'))
+        self.assertIsNone(prepared.args)
+
+
+class MetricsEndpointTests(TestCase):
+    def test_requires_configured_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        with override_settings(METRICS_TOKEN='scrape'):
+            self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, 401)
+            response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape')
+            self.assertEqual(response.status_code, 200)
+            self.assertIn(b'http_request_duration_seconds_count', response.content)
+
+    @override_settings(SERVER_TIMING_ENABLED=False)
+    def test_server_timing_setting(self):
+        self.assertFalse(self.client.get('/metrics').has_header('Server-Timing'))
+        with override_settings(SERVER_TIMING_ENABLED=True):
+            self.assertIn('db;dur=', self.client.get('/metrics')['Server-Timing'])
+
+    def test_exited_workers_keep_counters_but_not_gauges(self):
+        directory = tempfile.mkdtemp()
+        snapshot = {'db_replica_lag_seconds': {'[["alias", "replica_0"]]': [120.0, 1.0]},
+                    'translation_reverse_ambiguous_total': {'[]': [3]}}
+        with open(f'{directory}/metrics-999999.json', 'w') as handle:
+            json.dump(snapshot, handle)
+        with override_settings(METRICS_DIR=directory), \
+                mock.patch('api.utils.metrics._alive', side_effect=lambda pid: pid != 999999):
+            total = collect()
+        self.assertEqual(total['db_replica_lag_seconds'], {})
+        self.assertEqual(total['translation_reverse_ambiguous_total']['[]'][0], 3)
+
+
+@override_settings(DATABASE_REPLICAS=['replica_0'], DB_REPLICA_MAX_LAG_SECONDS=30, DB_REPLICA_LAG_CHECK_SECONDS=0)
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = db_router.ReplicaRouter()
+        patcher = mock.patch.object(db_router, 'lag_monitor', db_router.ReplicaLagMonitor())
+        self.monitor = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.monitor.measure = mock.Mock(return_value=0.0)
+        pins = mock.patch.object(db_router, '_pinned_users', db_router.TTLCache(5))
+        pins.start()
+        self.addCleanup(pins.stop)
+
+    def request(self, user_id=7, **cookies):
+        request = RequestFactory().get('/api/translations/history')
+        request.COOKIES.update(cookies)
+        request.user = mock.Mock(pk=user_id, is_authenticated=True)
+        return request
+
+    def test_replica_reads_only_where_allowed(self):
+        self.assertEqual(self.router.db_for_read(Translation), 'default')
+        with db_router.read_from_replica():
+            self.assertEqual(self.router.db_for_read(Translation), 'replica_0')
+            # Authentication must see approvals and revocations at once
+            self.assertEqual(self.router.db_for_read(CustomUser), 'default')
+            self.monitor.measure.return_value = 60.0
+            self.monitor._checked_at = 0.0
+            self.assertEqual(self.router.db_for_read(Translation), 'default')
+
+    def test_read_your_writes(self):
+        token = db_router.start_request(self.request())
+        with db_router.read_from_replica():
+            self.assertEqual(self.router.db_for_read(Translation), 'replica_0')
+            self.router.db_for_write(Translation)
+            self.assertEqual(self.router.db_for_read(Translation), 'default')
+        response = mock.Mock()
+        db_router.finish_request(token, response)
+        response.set_cookie.assert_called_once()
+
+        # The writer stays on the primary, by user on this worker and by cookie on any other
+        for request in (self.request(), self.request(user_id=8, **{db_router.PIN_COOKIE: '1'})):
+            token = db_router.start_request(request)
+            with db_router.read_from_replica():
+                self.assertEqual(self.router.db_for_read(Translation), 'default')
+            db_router.finish_request(token, None)
+
+        token = db_router.start_request(self.request(user_id=8))
+        with db_router.read_from_replica():
+            self.assertEqual(self.router.db_for_read(Translation), 'replica_0')
+        db_router.finish_request(token, None)
+
+
+class APITestCase(TestCase):
+    """An approved user with a bearer token, and one cached translation."""
+
+    def setUp(self):
+        # Cold per-worker auth caches: ids are reused across tests
+        _user_cache.clear()
+        _api_key_cache.clear()
+        self.user = CustomUser.objects.create_user('budget', 'budget@example.com', 'pw12345!', is_approved=True)
+        token = CustomTokenObtainPairSerializer.get_token(self.user)
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {token.access_token}'}
+        self.translation = Translation.objects.create(
+            source_text='hola', translated_text='hello', source_language='es', target_language='en'
+        )
+
+    def post_json(self, path, data, **extra):
+        return self.client.post(path, data, content_type='application/json', **extra)
+
+    def upstream_response(self, text):
+        response = mock.Mock()
+        response.json.return_value = {'data': {'translations': [{'translatedText': text, 'detectedSourceLanguage': 'es'}]}}
+        return response
+
+
+class QueryBudgetTestCase(APITestCase):
+    """
+    Maximum query counts per endpoint. Each request is made with a cold
+    per-worker auth cache, so budgets include the user lookup.
+    """
+
+
+@override_settings(TRANSLATION_MEMORY_ENABLED=False)
+@mock.patch.dict('os.environ', {'GOOGLE_TRANSLATE_API_KEY': 'test-key'})
+class TranslateQueryBudgetTests(QueryBudgetTestCase):
+    def test_cache_hit(self):
+        with assert_max_queries(5):
+            response = self.post_json('/api/translate', {'text': 'hola', 'target_language': 'en'}, **self.auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['from_cache'])
+
+    def test_cache_miss(self):
+        # Includes the reverse lookup
+        with mock.patch('api.views.translation.requests.post', return_value=self.upstream_response('goodbye')):
+            with assert_max_queries(6):
+                response = self.post_json('/api/translate', {'text': 'adios', 'target_language': 'en'}, **self.auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.json()['from_cache'])
+
+    def test_reverse_hit(self):
+        # hola (es) -> hello (en) answers en -> es "hello" without an upstream call
+        with mock.patch('api.views.translation.requests.post') as upstream:
+            with assert_max_queries(5):
+                response = self.post_json(
+                    '/api/translate', {'text': 'hello', 'source_language': 'en', 'target_language': 'es'}, **self.auth
+                )
+        upstream.assert_not_called()
+        self.assertEqual((response.json()['translated_text'], response.json()['reverse']), ('hola', True))
+
+    def test_ambiguous_reverse_goes_upstream(self):
+        Translation.objects.create(source_text='ola', translated_text='hello', source_language='es', target_language='en')
+        with mock.patch('api.views.translation.requests.post', return_value=self.upstream_response('hola')) as upstream, \
+                mock.patch('api.views.translation.registry.inc') as inc:
+            response = self.post_json('/api/translate', {'text': 'hello', 'target_language': 'es'}, **self.auth)
+        upstream.assert_called_once()
+        self.assertFalse(response.json()['from_cache'])
+        # the lookup is counted once, as a miss; the ambiguity has its own counter
+        lookups = [c.kwargs['result'] for c in inc.call_args_list if c.args[0] == 'translation_cache_lookups_total']
+        self.assertEqual(lookups, ['miss'])
+        inc.assert_any_call('translation_reverse_ambiguous_total')
+
+
+    def test_multi_target(self):
+        # en is a cache hit (two synonyms), fr and de go upstream; the savepoint is counted in tests
+        Translation.objects.create(source_text='hola', translated_text='hi', source_language='es', target_language='en')
+        texts = {'fr': 'salut', 'de': 'hallo'}
+        upstream = lambda url, params: self.upstream_response(texts[params['target']])
+        with mock.patch('api.views.translation.requests.post', side_effect=upstream) as post:
+            with assert_max_queries(8):
+                response = self.post_json(
+                    '/api/translate/multi', {'text': 'hola', 'target_languages': ['fr', 'en', 'de', 'fr']}, **self.auth
+                )
+        self.assertEqual(post.call_count, 2)
+        translations = response.json()['translations']
+        self.assertEqual([t['target_language'] for t in translations], ['fr', 'en', 'de'])
+        self.assertEqual([t['translated_text'] for t in translations], ['salut', 'hello', 'hallo'])
+        self.assertEqual(sorted(translations[1]['translated_texts']), ['hello', 'hi'])
+        self.assertEqual(Translation.objects.filter(source_text='hola', target_language__in=['fr', 'de']).count(), 2)
+        self.assertEqual(UserTranslationHistory.objects.filter(user=self.user).count(), 3)
+        self.translation.refresh_from_db()
+        self.assertEqual(self.translation.usage_count, 1)
+
+    def test_masked_template_is_cached_once(self):
+        with mock.patch('api.views.translation.requests.post', return_value=self.upstream_response('Pedido {0} enviado')):
+            first = self.post_json('/api/translate', {'text': 'Order 1234 shipped', 'target_language': 'es'}, **self.auth)
+        self.assertEqual(first.json()['translated_text'], 'Pedido 1234 enviado')
+        self.assertTrue(Translation.objects.filter(source_text='Order {0} shipped').exists())
+
+        with mock.patch('api.views.translation.requests.post') as upstream:
+            with assert_max_queries(5):
+                second = self.post_json('/api/translate', {'text': 'Order 5678 shipped', 'target_language': 'es'}, **self.auth)
+        upstream.assert_not_called()
+        self.assertEqual(second.json()['translated_text'], 'Pedido 5678 enviado')
+        self.assertEqual(
+            UserTranslationHistory.objects.filter(input_text='Order 5678 shipped', output_text='Pedido 5678 enviado').count(), 1
+        )
+
+    def test_lost_placeholder_falls_back_to_literal_text(self):
+        responses = [self.upstream_response('Pedido enviado'), self.upstream_response('Pedido 1234 enviado')]
+        with mock.patch('api.views.translation.requests.post', side_effect=responses):
+            response = self.post_json('/api/translate', {'text': 'Order 1234 shipped', 'target_language': 'es'}, **self.auth)
+        self.assertEqual(response.json()['translated_text'], 'Pedido 1234 enviado')
+        self.assertTrue(Translation.objects.filter(source_text='Order 1234 shipped').exists())
+
+
+class TranslationEndpointQueryBudgetTests(QueryBudgetTestCase):
+    def setUp(self):
+        super().setUp()
+        self.history = [
+            UserTranslationHistory.objects.create(
+                user=self.user, source_language='es', target_language='en',
+                input_text=f'palabra {i}', output_text=f'word {i}',
+            )
+            for i in range(20)
+        ]
+
+    def test_history_page_does_not_scale_with_page_size(self):
+        with assert_max_queries(3):
+            response = self.client.get('/api/translations/history?limit=20', **self.auth)
+        self.assertEqual(len(response.json()['translations']), 20)
+
+    def test_flashcards(self):
+        with assert_max_queries(3):
+            response = self.post_json(
+                '/api/translations/flashcards', {'source_lang': 'es', 'target_lang': 'en', 'limit': 50}, **self.auth
+            )
+        self.assertEqual(response.status_code, 200)
+
+    def test_edit(self):
+        entry = self.history[0]
+        with assert_max_queries(4):
+            response = self.client.patch(
+                f'/api/translations/{entry.id}', {'output_text': 'term 0'}, content_type='application/json', **self.auth
+            )
+        self.assertEqual(response.status_code, 200)
+
+    def test_delete(self):
+        entry = self.history[0]
+        with assert_max_queries(4):
+            response = self.client.delete(f'/api/translations/{entry.id}/delete?delete_from_cache=true', **self.auth)
+        self.assertEqual(response.status_code, 200)
+
+    def upload_csv(self, rows):
+        upload = SimpleUploadedFile('words.csv', f'en,es,fr\n{rows}\n'.encode(), content_type='text/csv')
+        return self.client.post('/api/translations/upload-csv', {'file': upload, 'source_language': 'en'}, **self.auth)
+
+    def test_csv_upload_is_batched(self):
+        # 400 cells: one duplicate check and one bulk insert (split into 3 statements on SQLite) in a savepoint
+        rows = '\n'.join(f'word {i},palabra {i},mot {i}' for i in range(200))
+        with assert_max_queries(7):
+            response = self.upload_csv(rows)
+        self.assertEqual(response.json()['added_count'], 400)
+
+    def test_csv_upload_counts_rows_inserted_concurrently_as_skipped(self):
+        Translation.objects.create(source_text='word 1', translated_text='palabra 1', source_language='en', target_language='es')
+        real_existing = TranslationImportBatch._existing
+        checks = []
+
+        def existing(batch, pending):
+            # The first duplicate check misses the row, as if it was inserted just after it
+            checks.append(pending)
+            return set() if len(checks) == 1 else real_existing(batch, pending)
+
+        with mock.patch.object(TranslationImportBatch, '_existing', autospec=True, side_effect=existing):
+            body = self.upload_csv('word 1,palabra 1,mot 1\nword 2,palabra 2,mot 2').json()
+        self.assertEqual((body['added_count'], body['skipped_count'], body['errors']), (3, 1, []))
+        self.assertEqual(Translation.objects.filter(source_text__in=['word 1', 'word 2']).count(), 4)
+
+    def test_csv_upload_reports_batches_that_cannot_be_saved(self):
+        with mock.patch('api.utils.csv_import.Translation.objects.bulk_create', side_effect=DatabaseError('disk full')):
+            response = self.upload_csv('word 1,palabra 1,mot 1')
+        body = response.json()
+        self.assertEqual((response.status_code, body['added_count']), (200, 0))
+        self.assertEqual(body['errors'], ["2 translations were not saved (from 'word 1' to 'word 1'): disk full"])
+
+
+class AuthQueryBudgetTests(QueryBudgetTestCase):
+    def test_register(self):
+        CustomUser.objects.create_user('newcomer', 'other@example.com', 'pw12345!')
+        with assert_max_queries(5):
+            response = self.post_json(
+                '/api/auth/register', {'email': 'newcomer@example.com', 'password': 'pw12345!'}
+            )
+        self.assertEqual(response.status_code, 201)
+
+    def test_login(self):
+        with assert_max_queries(3):
+            response = self.post_json('/api/token', {'username': 'budget', 'password': 'pw12345!'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_logout(self):
+        refresh = CustomTokenObtainPairSerializer.get_token(self.user)
+        with assert_max_queries(8):
+            response = self.post_json('/api/auth/logout', {'refresh_token': str(refresh)}, **self.auth)
+        self.assertEqual(response.status_code, 200)
+
+
+class QueryBudgetMiddlewareTests(QueryBudgetTestCase):
+    @override_settings(QUERY_BUDGET_MODE='raise')
+    def test_raises_when_view_exceeds_budget(self):
+        with mock.patch('api.views.translation.get_translation_history.query_budget', 1, create=True):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get('/api/translations/history', **self.auth)
+
+    def test_assert_max_queries_reports_repeats(self):
+        with self.assertRaisesMessage(AssertionError, '3x'):
+            with assert_max_queries(2):
+                for pk in range(3):
+                    list(Translation.objects.filter(pk=pk))
+
+    def test_normalize_sql_collapses_lists(self):
+        self.assertEqual(normalize_sql('WHERE id IN (%s, %s, %s)'), 'WHERE id IN (...)')
+        self.assertEqual(normalize_sql('VALUES (%s, %s), (%s, %s)'), 'VALUES (...)')
+
+
+class ResponseEncodingTests(SimpleTestCase):
+    def test_orjson_renderer_matches_drf(self):
+        data = {'timestamp': timezone.now(), 'text': 'caf\u00e9 \u2028', 'items': [1, 2.5, None, True], 3: 'x'}
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_negotiation(self):
+        self.assertEqual(CompressionMiddleware.negotiate('gzip;q=0.5, deflate'), 'gzip')
+        self.assertIsNone(CompressionMiddleware.negotiate('gzip;q=0, identity'))
+        self.assertIsNone(CompressionMiddleware.negotiate(''))
+
+
+class ResponseCompressionTests(APITestCase):
+    @override_settings(RESPONSE_COMPRESSION_MIN_BYTES=200)
+    def test_large_json_is_gzipped(self):
+        for i in range(20):
+            UserTranslationHistory.objects.create(
+                user=self.user, source_language='es', target_language='en', input_text=f'palabra {i}', output_text=f'word {i}'
+            )
+        response = self.client.get('/api/translations/history?limit=20', HTTP_ACCEPT_ENCODING='gzip', **self.auth)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(len(json.loads(gzip.decompress(response.content))['translations']), 20)
+
+        response = self.client.get('/api/translations/history', **self.auth)
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+
+class ChangeFeedTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        feed_settings = override_settings(BUNDLE_DIR=directory.name, CHANGE_FEED_SETTLE_SECONDS=0)
+        feed_settings.enable()
+        self.addCleanup(feed_settings.disable)
+
+    def changes(self, since, path='/api/translations/changes'):
+        with assert_max_queries(5):
+            response = self.client.get(f'{path}?since={since}', **self.auth)
+        return response.json()
+
+    def test_feed_records_inserts_updates_and_deletes(self):
+        since = self.changes(0)['version']
+        entry = UserTranslationHistory.objects.create(
+            user=self.user, source_language='es', target_language='en', input_text='hola', output_text='hello'
+        )
+        self.client.patch(f'/api/translations/{entry.id}', {'output_text': 'hi'}, content_type='application/json', **self.auth)
+        self.client.delete(f'/api/translations/{entry.id}/delete?delete_from_cache=true', **self.auth)
+        # Usage counters are not content changes
+        Translation.objects.update(usage_count=5)
+
+        feed = self.changes(since)
+        self.assertEqual(
+            [(change['operation'], change['translated_text']) for change in feed['changes']],
+            [('update', 'hi'), ('delete', 'hi')],
+        )
+        self.assertEqual(self.changes(feed['version'])['changes'], [])
+
+    @override_settings(CHANGE_FEED_SETTLE_SECONDS=60)
+    def test_versions_stop_below_unsettled_changes(self):
+        settled = current_version()
+        Translation.objects.create(source_text='casa', translated_text='house', source_language='es', target_language='en')
+        Translation.objects.create(source_text='adios', translated_text='bye', source_language='es', target_language='en')
+        # "casa" was written recently; "hola" and the later "adios" are settled
+        TranslationChange.objects.exclude(source_text='casa').update(changed_at=timezone.now() - timedelta(minutes=5))
+
+        self.assertGreater(current_version(), settled)
+        self.assertEqual(settled_version(), settled)
+        self.assertEqual(build_bundle('es', 'en')[0], settled)
+        self.assertEqual(self.changes(0)['version'], settled)
+
+    def test_quiet_pair_bundle_survives_pruning(self):
+        TranslationChange.objects.update(changed_at=timezone.now() - timedelta(days=40))
+        Translation.objects.create(source_text='chat', translated_text='cat', source_language='fr', target_language='en')
+        prune_changes(30, 100)
+
+        version = build_bundle('es', 'en')[0]
+        self.assertEqual(version, current_version())
+        feed = self.changes(version, '/api/translations/bundles/es/en/delta')
+        self.assertEqual((feed['changes'], feed['version']), ([], version))
+
+        # A delta for a quiet pair still advances past other pairs' changes
+        Translation.objects.create(source_text='chien', translated_text='dog', source_language='fr', target_language='en')
+        feed = self.changes(version, '/api/translations/bundles/es/en/delta')
+        self.assertEqual((feed['changes'], feed['version']), ([], current_version()))
+        # Unchanged pair: the bundle is kept
+        self.assertEqual(build_bundle('es', 'en'), (version, bundle_path('es', 'en', version), None))
+
+    def test_bundle_then_delta(self):
+        version, path, rows = build_bundle('es', 'en')
+        self.assertEqual(rows, 1)
+        Translation.objects.create(source_text='casa', translated_text='house', source_language='es', target_language='en')
+
+        response = self.client.get('/api/translations/bundles/es/en', **self.auth)
+        self.assertEqual(response['ETag'], f'"{version}"')
+        with tempfile.NamedTemporaryFile() as handle:
+            handle.write(gzip.decompress(b''.join(response.streaming_content)))
+            handle.flush()
+            entries = sqlite3.connect(handle.name).execute('SELECT source_text, translated_text FROM entries').fetchall()
+        self.assertEqual(entries, [('hola', 'hello')])
+
+        feed = self.changes(version, '/api/translations/bundles/es/en/delta')
+        self.assertEqual([change['source_text'] for change in feed['changes']], ['casa'])
+
+
+@override_settings(CHANGE_FEED_SETTLE_SECONDS=0, AUTOCOMPLETE_REFRESH_SECONDS=0)
+class AutocompleteTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        for text, translated, usage in [('Hola amigo', 'hello friend', 3), ('hola', 'hi', 9), ('hoy', 'today', 5)]:
+            Translation.objects.create(
+                source_text=text, translated_text=translated, source_language='es', target_language='en', usage_count=usage
+            )
+
+    def test_index_ranks_by_usage_and_applies_changes(self):
+        index = AutocompleteIndex()
+        index.build()
+        self.assertEqual([result[1] for result in index.search('ho', 'en')], ['hola', 'hoy', 'Hola amigo'])
+        # Primary translation: highest usage_count among the synonyms
+        self.assertEqual(index.search('hola', 'en', limit=1)[0][2], 'hi')
+
+        Translation.objects.create(source_text='hora', translated_text='hour', source_language='es', target_language='en')
+        Translation.objects.filter(source_text='hoy').delete()
+        self.assertEqual([result[1] for result in index.search('ho', 'en')], ['hola', 'Hola amigo', 'hora'])
+
+    def test_lookup_applies_one_batch_without_background_tasks(self):
+        index = AutocompleteIndex()
+        index.build()
+        Translation.objects.create(source_text='hora', translated_text='hour', source_language='es', target_language='en')
+        Translation.objects.create(source_text='hotel', translated_text='hotel', source_language='es', target_language='en')
+        with mock.patch('api.utils.pairindex.REFRESH_BATCH_SIZE', 1):
+            found = [result[1] for result in index.search('ho', 'en')]
+            self.assertEqual(('hora' in found, 'hotel' in found), (True, False))
+            self.assertIn('hotel', [result[1] for result in index.search('ho', 'en')])
+
+    def test_build_replays_unsettled_changes(self):
+        index = AutocompleteIndex()
+        with override_settings(CHANGE_FEED_SETTLE_SECONDS=60):
+            index.build()
+        # Every change is recent, so the snapshot is stamped before all of them
+        self.assertEqual(index._version, 0)
+        # Replaying changes the snapshot already holds leaves it unchanged
+        self.assertEqual([result[1] for result in index.search('ho', 'en')], ['hola', 'hoy', 'Hola amigo'])
+        self.assertEqual(index._version, current_version())
+
+    @override_settings(AUTOCOMPLETE_BACKEND='database')
+    def test_database_fallback_matches_index(self):
+        index = AutocompleteIndex()
+        index.build()
+        with assert_max_queries(4):
+            response = self.client.get('/api/translate/autocomplete?q=Ho&target_language=en&source_language=es', **self.auth)
+        suggestions = response.json()['suggestions']
+        self.assertEqual(
+            [(item['source_text'], item['translated_text']) for item in suggestions],
+            [result[1:3] for result in index.search('Ho', 'en', 'es')],
+        )
+
+
+@override_settings(CHANGE_FEED_SETTLE_SECONDS=0, TRANSLATION_MEMORY_REFRESH_SECONDS=0, TRANSLATION_MEMORY_THRESHOLD=0.8)
+class TranslationMemoryTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        Translation.objects.create(
+            source_text='I lost my key', translated_text='perdí mi llave', source_language='en', target_language='es'
+        )
+        self.memory = TranslationMemory()
+        self.memory.build()
+
+    def test_normalized_and_fuzzy_matches(self):
+        self.assertEqual(self.memory.match('  HOLA!! ', 'en')['match_type'], 'normalized')
+        match = self.memory.match('I lost my keys', 'es', 'en')
+        self.assertEqual((match['match_type'], match['translated_text']), ('fuzzy', 'perdí mi llave'))
+        self.assertGreaterEqual(match['score'], 0.8)
+        self.assertIsNone(self.memory.match('I lost my wallet', 'es'))
+
+        Translation.objects.create(
+            source_text='I lost my wallet', translated_text='perdí mi cartera', source_language='en', target_language='es'
+        )
+        self.assertEqual(self.memory.match('i lost my wallet.', 'es')['translated_text'], 'perdí mi cartera')
+
+    @mock.patch.dict('os.environ', {'GOOGLE_TRANSLATE_API_KEY': 'test-key'})
+    def test_translate_serves_normalized_matches_by_default(self):
+        with mock.patch('api.views.translation.translation_memory', self.memory), \
+                mock.patch('api.views.translation.requests.post') as upstream:
+            body = self.post_json('/api/translate', {'text': 'i lost my KEY!', 'target_language': 'es'}, **self.auth).json()
+            upstream.assert_not_called()
+            self.assertEqual((body['match_type'], body['from_cache']), ('normalized', True))
+
+            # A near match is only used when asked for
+            upstream.return_value = self.upstream_response('perdí mis llaves')
+            body = self.post_json('/api/translate', {'text': 'I lost my keys', 'target_language': 'es'}, **self.auth).json()
+            upstream.assert_called_once()
+            self.assertEqual((body['translated_text'], body['from_cache']), ('perdí mis llaves', False))
+
+    @mock.patch.dict('os.environ', {'GOOGLE_TRANSLATE_API_KEY': 'test-key'})
+    def test_fuzzy_match_is_not_reported_as_cached(self):
+        with mock.patch('api.views.translation.translation_memory', self.memory), \
+                mock.patch('api.views.translation.requests.post') as upstream:
+            response = self.post_json(
+                '/api/translate', {'text': 'I lost my keys', 'target_language': 'es', 'fuzzy': True}, **self.auth
+            )
+            upstream.assert_not_called()
+            body = response.json()
+            self.assertEqual(
+                (body['match_type'], body['from_cache'], body['matched_source_text']), ('fuzzy', False, 'I lost my key')
+            )
+            self.assertFalse(UserTranslationHistory.objects.get(input_text='I lost my keys').was_cached)
+
+            body = self.post_json(
+                '/api/translate/multi', {'text': 'I lost my keys', 'target_languages': ['es'], 'fuzzy': True}, **self.auth
+            ).json()
+            upstream.assert_not_called()
+            self.assertEqual((body['translations'][0]['match_type'], body['translations'][0]['from_cache']), ('fuzzy', False))
+
+
+class GlossaryMatchingTests(SimpleTestCase):
+    def test_matches_whole_words_longest_first(self):
+        glossary = Glossary([('cloud', 'nube', False), ('cloud storage', 'almacenamiento en la nube', False),
+                             ('Acme', '', True)])
+        text = 'Cloud storage by Acme, not acme or cloudy skies; cloud.'
+        self.assertEqual(
+            [(text[start:end], replacement) for start, end, replacement in glossary.find(text)],
+            [('Cloud storage', 'almacenamiento en la nube'), ('Acme', 'Acme'), ('cloud', 'nube')],
+        )
+
+
+class GlossaryTests(APITestCase):
+    @mock.patch.dict('os.environ', {'GOOGLE_TRANSLATE_API_KEY': 'test-key'})
+    def test_upstream_call_enforces_terms(self):
+        self.addCleanup(glossaries.invalidate, 'en', 'es')
+        GlossaryTerm.objects.create(source_language='en', target_language='es', term='Acme Cloud')
+        upstream_text = 'Bienvenido a <span translate="no">Acme Cloud</span>'
+        with mock.patch('api.views.translation.requests.post', return_value=self.upstream_response(upstream_text)) as post:
+            response = self.post_json(
+                '/api/translate', {'text': 'Welcome to acme cloud', 'source_language': 'en', 'target_language': 'es'},
+                **self.auth
+            )
+        self.assertEqual(post.call_args.kwargs['params']['q'], 'Welcome to <span translate="no">acme cloud</span>')
+        self.assertEqual(response.json()['translated_text'], 'Bienvenido a Acme Cloud')
+
+
+class LanguageIdentificationTests(SimpleTestCase):
+    def test_identifies_with_confidence(self):
+        identifier = LanguageIdentifier(train([
+            ('the house is next to the old station', 'en'), ('where is the train to the city', 'en'),
+            ('la casa está junto a la vieja estación', 'es'), ('dónde está el tren a la ciudad', 'es'),
+        ]))
+        language, confidence = identifier.identify('the old train station')
+        self.assertEqual(language, 'en')
+        self.assertGreater(confidence, 0.9)
+        self.assertEqual(identifier.identify('la vieja casa')[0], 'es')
+        self.assertEqual(identifier.identify('1234 !!'), (None, 0.0))
+        # Few or mixed words are not evidence enough, however many n-grams they have
+        self.assertLess(identifier.identify('estación')[1], 0.8)
+        self.assertLess(identifier.identify('casa the')[1], 0.8)
+
+
+class LanguageGuessLookupTests(APITestCase):
+    @mock.patch.dict('os.environ', {'GOOGLE_TRANSLATE_API_KEY': 'test-key'})
+    def test_confident_guess_is_preferred_by_cache_lookup(self):
+        Translation.objects.create(source_text='fin', translated_text='aleta', source_language='en', target_language='es',
+                                   usage_count=5)
+        Translation.objects.create(source_text='fin', translated_text='fin', source_language='fr', target_language='es')
+        with mock.patch('api.views.translation.guess_language', return_value=('fr', 0.99)):
+            response = self.post_json('/api/translate', {'text': 'fin', 'target_language': 'es'}, **self.auth)
+        body = response.json()
+        self.assertEqual((body['translated_text'], body['translated_texts'], body['source_language']), ('fin', ['fin'], 'fr'))
+        self.assertEqual(body['language_guess'], {'language': 'fr', 'confidence': 0.99})
+
+    @mock.patch.dict('os.environ', {'GOOGLE_TRANSLATE_API_KEY': 'test-key'})
+    def test_wrong_guess_still_hits_cache(self):
+        Translation.objects.create(source_text='fin', translated_text='aleta', source_language='en', target_language='es')
+        with mock.patch('api.views.translation.guess_language', return_value=('de', 0.9)), \
+                mock.patch('api.views.translation.requests.post') as upstream:
+            body = self.post_json('/api/translate', {'text': 'fin', 'target_language': 'es'}, **self.auth).json()
+            self.assertEqual((body['translated_text'], body['source_language']), ('aleta', 'en'))
+            body = self.post_json('/api/translate/multi', {'text': 'fin', 'target_languages': ['es']}, **self.auth).json()
+            self.assertEqual(body['translations'][0]['translated_text'], 'aleta')
+            upstream.assert_not_called()
+
+
+@override_settings(METERING_ENABLED=True)
+class MeteringTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        # A private usage meter per test, so pending counts do not cross tests
+        self.meter = UsageMeter()
+        patcher = mock.patch('api.views.translation.usage_meter', self.meter)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @mock.patch.dict('os.environ', {'GOOGLE_TRANSLATE_API_KEY': 'test-key'})
+    def test_quota_is_enforced_before_upstream(self):
+        self.user.daily_character_quota = 10
+        self.user.save()
+        with mock.patch('api.views.translation.requests.post') as upstream:
+            response = self.post_json('/api/translate', {'text': 'adios amigos', 'target_language': 'en'}, **self.auth)
+            self.assertEqual(response.status_code, 429)
+            self.assertEqual((response.json()['quota'], response.json()['used']), ('character', 0))
+            upstream.assert_not_called()
+
+            # Cached answers are not limited, and are counted as savings
+            self.assertEqual(self.post_json('/api/translate', {'text': 'hola', 'target_language': 'en'}, **self.auth).status_code, 200)
+            upstream.return_value = self.upstream_response('goodbye')
+            self.assertEqual(self.post_json('/api/translate', {'text': 'adios', 'target_language': 'en'}, **self.auth).status_code, 200)
+        self.assertEqual(self.meter.usage_today(self.user.pk), (5, 1))
+
+    def test_flush_adds_to_rollup(self):
+        for _ in range(2):
+            self.meter.record_upstream(self.user.pk, 5)
+            self.meter.record_cached(self.user.pk, 7)
+            self.assertEqual(self.meter.flush(), 1)
+        rollup = UsageRollup.objects.get(user=self.user)
+        self.assertEqual(
+            (rollup.upstream_characters, rollup.upstream_requests, rollup.cached_characters, rollup.cached_requests),
+            (10, 2, 14, 2),
+        )
+        self.assertEqual(self.meter.usage_today(self.user.pk), (10, 2))
+
+        with tempfile.TemporaryFile('w+') as output:
+            call_command('usage_report', '--json', stdout=output)
+            output.seek(0)
+            totals = json.load(output)['totals']
+        self.assertEqual((totals['cached_characters'], totals['cache_share']), (14, 0.5833))
@@ -0,0 +1,14 @@
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from .utils.revocation import revoked_tokens
+
+
+class FilteredRefreshToken(RefreshToken):
+    """
+    RefreshToken that consults the per-worker revocation filter first and
+    only queries the blacklist when the filter reports a possible match.
+    """
+
+    def check_blacklist(self):
+        if revoked_tokens.might_be_revoked(self.payload[api_settings.JTI_CLAIM]):
+            super().check_blacklist()
@@ -1,6 +1,7 @@
 from django.urls import path
 from .views import MyTokenObtainPairView, set_api_key, example_view, register, logout
-from .views.translation import translate_text, get_translation_history, edit_translation, delete_translation, get_flashcards, upload_translations_csv
+from .views.bundles import list_bundles, download_bundle, bundle_delta, translation_changes
+from .views.translation import translate_text, translate_multi, autocomplete, get_translation_history, edit_translation, delete_translation, get_flashcards, upload_translations_csv
 from rest_framework_simplejwt.views import TokenRefreshView
 import logging
 
@@ -12,12 +13,18 @@ urlpatterns = [
     path('auth/logout', logout, name='logout'),  # POST: refresh_token
     path('token', MyTokenObtainPairView.as_view(), name='token_obtain_pair'),  # POST: username, password
     path('token/refresh', TokenRefreshView.as_view(), name='token_refresh'),  # POST: refresh
-    path('set-api-key', set_api_key, name='set_api_key'),  # POST: api_key
+    path('set-api-key', set_api_key, name='set_api_key'),  # POST: generates an API key, returned once
     path('example', example_view, name='example_view'),  # GET
     path('translate', translate_text, name='translate_text'),  # POST: text, target_language, [source_language]
+    path('translate/multi', translate_multi, name='translate_multi'),  # POST: text, target_languages, [source_language]
+    path('translate/autocomplete', autocomplete, name='autocomplete'),  # GET: q, target_language, [source_language], [limit]
     path('translations/history', get_translation_history, name='translation_history'),  # GET: page, limit
     path('translations/flashcards', get_flashcards, name='get_flashcards'),  # POST: source_lang, target_lang, limit
     path('translations/upload-csv', upload_translations_csv, name='upload_translations_csv'),  # POST: file, [source_language]
+    path('translations/changes', translation_changes, name='translation_changes'),  # GET: since, [limit], [source_language], [target_language]
+    path('translations/bundles', list_bundles, name='list_bundles'),  # GET
+    path('translations/bundles/<str:source_language>/<str:target_language>', download_bundle, name='download_bundle'),  # GET
+    path('translations/bundles/<str:source_language>/<str:target_language>/delta', bundle_delta, name='bundle_delta'),  # GET: since, [limit]
     path('translations/<int:translation_id>', edit_translation, name='edit_translation'),  # PATCH: output_text, source_language, target_language
     path('translations/<int:translation_id>/delete', delete_translation, name='delete_translation'),  # DELETE: [delete_from_cache]
 ]
@@ -0,0 +1,135 @@
+"""
+Type-ahead suggestions over cached source texts.
+
+Each worker keeps an in-memory prefix index per language pair (see
+``api.utils.pairindex`` for how it is built and kept current): the distinct
+lower-cased source texts in a sorted array, searched with ``bisect``, each
+mapped to its best row. The top suggestions for every prefix of up to
+``TOP_DEPTH`` characters are precomputed, because those ranges are the
+largest; longer prefixes select from their (short) range on demand.
+
+Until the index is built, and whenever ``AUTOCOMPLETE_BACKEND`` is
+``database`` or the table exceeds ``AUTOCOMPLETE_MAX_ENTRIES``, suggestions
+come from the database instead, using the ``lower(left(source_text, 64))
+text_pattern_ops`` index from migration 0011 on PostgreSQL.
+"""
+from bisect import bisect_left, insort
+import heapq
+from itertools import groupby
+
+from django.conf import settings
+from django.db.models.functions import Left, Lower
+
+from ..models import Translation
+from .pairindex import PairIndex, PairIndexSet
+
+TOP_DEPTH = 3
+PREFIX_INDEX_LENGTH = 64
+
+_MAX_CHAR = '\U0010ffff'
+
+
+def normalize(text):
+    return text.strip().lower()
+
+
+class PrefixIndex(PairIndex):
+    """Sorted-array prefix index over the source texts of one language pair."""
+
+    def __init__(self, source_language, target_language, max_results):
+        super().__init__(source_language, target_language)
+        self.max_results = max_results
+        self._keys = []
+        self._top = {}  # prefix of up to TOP_DEPTH characters -> ranked keys
+
+    key = staticmethod(normalize)
+
+    def _rank(self, key):
+        return (-self._best[key][0], key)
+
+    def _finish_keys(self):
+        self._keys = sorted(self._members)
+        for depth in range(1, TOP_DEPTH + 1):
+            for prefix, keys in groupby((key for key in self._keys if len(key) >= depth), key=lambda key: key[:depth]):
+                self._top[prefix] = heapq.nsmallest(self.max_results, keys, key=self._rank)
+
+    def _key_added(self, key):
+        insort(self._keys, key)
+
+    def _key_removed(self, key):
+        index = bisect_left(self._keys, key)
+        if index < len(self._keys) and self._keys[index] == key:
+            del self._keys[index]
+
+    def reindex(self, keys):
+        """Recompute the precomputed lists for every short prefix of ``keys``."""
+        prefixes = {key[:depth] for key in keys for depth in range(1, TOP_DEPTH + 1) if len(key) >= depth}
+        for prefix in prefixes:
+            ranked = self._select(prefix, self.max_results)
+            if ranked:
+                self._top[prefix] = ranked
+            else:
+                self._top.pop(prefix, None)
+
+    def _select(self, prefix, limit):
+        lo = bisect_left(self._keys, prefix)
+        hi = bisect_left(self._keys, prefix + _MAX_CHAR, lo)
+        return heapq.nsmallest(limit, (self._keys[index] for index in range(lo, hi)), key=self._rank)
+
+    def search(self, prefix, limit):
+        """``[(usage_count, source_text, translated_text)]`` for the top ``limit`` keys starting with ``prefix``."""
+        keys = self._top.get(prefix, [])[:limit] if len(prefix) <= TOP_DEPTH else self._select(prefix, limit)
+        return [self._best[key] for key in keys]
+
+
+class AutocompleteIndex(PairIndexSet):
+    """Per-worker set of ``PrefixIndex`` objects."""
+
+    settings_prefix = 'AUTOCOMPLETE'
+    name = 'autocomplete index'
+
+    def enabled(self):
+        return settings.AUTOCOMPLETE_BACKEND == 'memory'
+
+    def new_pair(self, source_language, target_language):
+        return PrefixIndex(source_language, target_language, settings.AUTOCOMPLETE_MAX_RESULTS)
+
+    def search(self, prefix, target_language, source_language=None, limit=10):
+        """Ranked ``(usage_count, source_text, translated_text, source_language)`` tuples."""
+        self.refresh()
+        prefix = normalize(prefix)
+        with self._lock:
+            results = [
+                (usage_count, source_text, translated_text, index.source_language)
+                for index in self._indexes(target_language, source_language)
+                for usage_count, source_text, translated_text in index.search(prefix, limit)
+            ]
+        return sorted(results, key=lambda result: (-result[0], normalize(result[1])))[:limit]
+
+
+autocomplete_index = AutocompleteIndex()
+
+
+def search_database(prefix, target_language, source_language=None, limit=10):
+    """
+    Same results as ``AutocompleteIndex.search`` straight from the table. On
+    PostgreSQL the prefix filter is served by the text_pattern_ops index.
+    """
+    prefix = normalize(prefix)
+    queryset = Translation.objects.filter(target_language=target_language)
+    if source_language:
+        queryset = queryset.filter(source_language=source_language)
+    queryset = queryset.alias(prefix_key=Lower(Left('source_text', PREFIX_INDEX_LENGTH))).filter(
+        prefix_key__startswith=prefix[:PREFIX_INDEX_LENGTH]
+    )
+    if len(prefix) > PREFIX_INDEX_LENGTH:
+        queryset = queryset.filter(source_text__istartswith=prefix)
+
+    best = {}
+    # Synonyms of one text share a key; over-fetch so `limit` distinct texts survive
+    rows = queryset.order_by('-usage_count', 'translated_text').values_list(
+        'source_text', 'translated_text', 'source_language', 'usage_count'
+    )[:limit * 4]
+    for source_text, translated_text, source, usage_count in rows:
+        best.setdefault((normalize(source_text), source), (usage_count, source_text, translated_text, source))
+    return sorted(best.values(), key=lambda result: (-result[0], normalize(result[1])))[:limit]
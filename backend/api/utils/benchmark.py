@@ -0,0 +1,306 @@
+"""
+Building blocks for the load-testing commands (fake_translate_server,
+seed_bench_data, run_benchmark).
+
+- ``FakeTranslateServer`` stubs the Translate v2 endpoint with configurable
+  latency, jitter and error rate.
+- ``HTTPTarget`` / ``InProcessTarget`` send requests either to a running
+  server or through Django's test client in the current process.
+- ``WORKLOADS`` are the scripted request types; ``run_workload`` drives them
+  from worker threads with a seeded RNG so runs are repeatable.
+- ``summarize`` turns latencies into throughput and p50/p95/p99.
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import math
+import random
+import threading
+import time
+from urllib.parse import parse_qs, quote
+import uuid
+
+BENCH_USER_PREFIX = 'bench_user_'
+LANGUAGE_PAIRS = (('en', 'es'), ('en', 'fr'), ('es', 'en'), ('en', 'de'))
+VOCABULARY = (
+    'house', 'order', 'shipped', 'water', 'morning', 'letter', 'computer', 'thank', 'you', 'please',
+    'train', 'station', 'ticket', 'window', 'garden', 'yellow', 'quickly', 'market', 'friend', 'city',
+    'invoice', 'number', 'delivery', 'address', 'account', 'password', 'weather', 'tomorrow', 'evening',
+)
+
+
+def phrase(rng, index):
+    """Deterministic phrase for fixture row ``index``; unique per index."""
+    words = rng.sample(VOCABULARY, rng.randint(1, 4))
+    return f"{' '.join(words)} {index}"
+
+
+def fake_translation(text, target):
+    return f'[{target}] {text[::-1]}'
+
+
+class FakeTranslateServer:
+    """
+    Threaded HTTP stub of ``POST /language/translate/v2``. Every request
+    sleeps ``latency_ms`` plus uniform ``jitter_ms`` and fails with a 500 at
+    ``error_rate``.
+    """
+
+    path = '/language/translate/v2'
+
+    def __init__(self, host='127.0.0.1', port=0, latency_ms=50.0, jitter_ms=0.0, error_rate=0.0, seed=0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.requests = 0
+        self.errors = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._thread = None
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}{self.path}'
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                server.handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def handle(self, handler):
+        with self._lock:
+            self.requests += 1
+            delay = self.latency_ms + self._rng.uniform(0, self.jitter_ms)
+            fail = self._rng.random() < self.error_rate
+            self.errors += fail
+        time.sleep(delay / 1000.0)
+
+        if fail or not handler.path.startswith(self.path):
+            self._respond(handler, 500 if fail else 404, {'error': {'message': 'stub failure'}})
+            return
+        length = int(handler.headers.get('Content-Length') or 0)
+        params = parse_qs(handler.path.partition('?')[2])
+        params.update(parse_qs(handler.rfile.read(length).decode()))
+        texts = params.get('q', [''])
+        target = params.get('target', ['en'])[0]
+        source = params.get('source', [None])[0]
+        translations = []
+        for text in texts:
+            item = {'translatedText': fake_translation(text, target)}
+            if not source:
+                item['detectedSourceLanguage'] = 'en'
+            translations.append(item)
+        self._respond(handler, 200, {'data': {'translations': translations}})
+
+    @staticmethod
+    def _respond(handler, status, payload):
+        body = json.dumps(payload).encode()
+        handler.send_response(status)
+        handler.send_header('Content-Type', 'application/json')
+        handler.send_header('Content-Length', str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self.httpd.serve_forever()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class HTTPTarget:
+    """Sends workload requests to a running server."""
+
+    def __init__(self, base_url, token):
+        import requests
+
+        self.base_url = base_url.rstrip('/')
+        self.session = requests.Session()
+        self.session.headers['Authorization'] = f'Bearer {token}'
+
+    def post_json(self, path, data):
+        return self.session.post(self.base_url + path, json=data).status_code
+
+    def get(self, path):
+        return self.session.get(self.base_url + path).status_code
+
+    def upload(self, path, filename, content, data):
+        return self.session.post(self.base_url + path, data=data, files={'file': (filename, content)}).status_code
+
+    def close(self):
+        self.session.close()
+
+
+class InProcessTarget:
+    """Sends workload requests through Django's test client (no server needed)."""
+
+    def __init__(self, token):
+        from django.test import Client
+
+        self.client = Client(raise_request_exception=False)
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+
+    def post_json(self, path, data):
+        return self.client.post('/api' + path, data, content_type='application/json', **self.auth).status_code
+
+    def get(self, path):
+        return self.client.get('/api' + path, **self.auth).status_code
+
+    def upload(self, path, filename, content, data):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        upload = SimpleUploadedFile(filename, content, content_type='text/csv')
+        return self.client.post('/api' + path, {**data, 'file': upload}, **self.auth).status_code
+
+    def close(self):
+        from django.db import connections
+
+        # Each worker thread has its own connections
+        connections.close_all()
+
+
+class Workload:
+    """
+    Request generators. ``hot_phrases`` are source texts known to be cached;
+    cold requests use phrases that have never been seen, so they go upstream.
+    ``run_id`` keeps cold phrases and CSV rows unique across runs, otherwise a
+    second run against the same database would find them cached.
+    """
+
+    def __init__(self, hot_phrases, hot_ratio, csv_rows=50, run_id=None):
+        self.hot_phrases = hot_phrases
+        self.hot_ratio = hot_ratio
+        self.csv_rows = csv_rows
+        self.run_id = run_id or uuid.uuid4().hex[:8]
+
+    def translate(self, target, rng, worker, sequence):
+        if self.hot_phrases and rng.random() < self.hot_ratio:
+            source, target_language, text = rng.choice(self.hot_phrases)
+            data = {'text': text, 'source_language': source, 'target_language': target_language}
+            name = 'translate_hot'
+        else:
+            source, target_language = rng.choice(LANGUAGE_PAIRS)
+            data = {'text': f'cold {self.run_id} {worker}-{sequence}',
+                    'source_language': source, 'target_language': target_language}
+            name = 'translate_cold'
+        return name, target.post_json('/translate', data)
+
+    def history(self, target, rng, worker, sequence):
+        return 'history', target.get(f'/translations/history?page={rng.randint(1, 20)}&limit=20')
+
+    def flashcards(self, target, rng, worker, sequence):
+        source, target_language = rng.choice(LANGUAGE_PAIRS)
+        return 'flashcards', target.post_json(
+            '/translations/flashcards', {'source_lang': source, 'target_lang': target_language, 'limit': 20}
+        )
+
+    def autocomplete(self, target, rng, worker, sequence):
+        if self.hot_phrases:
+            source, target_language, text = rng.choice(self.hot_phrases)
+        else:
+            (source, target_language), text = rng.choice(LANGUAGE_PAIRS), rng.choice(VOCABULARY)
+        prefix = quote(text[:rng.randint(2, 8)])
+        return 'autocomplete', target.get(
+            f'/translate/autocomplete?q={prefix}&source_language={source}&target_language={target_language}'
+        )
+
+    def csv(self, target, rng, worker, sequence):
+        lines = ['en,es,fr'] + [
+            f'csv {self.run_id} {worker}-{sequence}-{row},es {row},fr {row}' for row in range(self.csv_rows)
+        ]
+        content = ('\n'.join(lines) + '\n').encode()
+        return 'csv_upload', target.upload('/translations/upload-csv', 'bench.csv', content, {'source_language': 'en'})
+
+
+WORKLOADS = ('translate', 'history', 'flashcards', 'autocomplete', 'csv')
+
+
+def parse_mix(value):
+    """Parse ``"translate=70,history=15"`` into ``[(name, weight), ...]``."""
+    mix = []
+    for item in filter(None, (part.strip() for part in value.split(','))):
+        name, _, weight = item.partition('=')
+        name = name.strip()
+        if name not in WORKLOADS:
+            raise ValueError(f"Unknown workload: {name}")
+        mix.append((name, float(weight or 1)))
+    return mix
+
+
+def run_workload(make_target, workload, mix, requests_per_worker, concurrency, seed):
+    """
+    Run ``requests_per_worker`` requests from each of ``concurrency``
+    threads; ``make_target(worker_index)`` builds each thread's target. Returns ``({name: [(latency_seconds, ok), ...]}, wall_seconds)``.
+    """
+    names = [name for name, _ in mix]
+    weights = [weight for _, weight in mix]
+    results = {}
+    lock = threading.Lock()
+
+    def worker(index):
+        target = make_target(index)
+        rng = random.Random(seed * 1000 + index)
+        local = {}
+        try:
+            for sequence in range(requests_per_worker):
+                kind = rng.choices(names, weights)[0]
+                started = time.perf_counter()
+                try:
+                    name, status = getattr(workload, kind)(target, rng, index, sequence)
+                except Exception:
+                    name, status = kind, None
+                elapsed = time.perf_counter() - started
+                local.setdefault(name, []).append((elapsed, status is not None and status < 400))
+        finally:
+            target.close()
+        with lock:
+            for name, samples in local.items():
+                results.setdefault(name, []).extend(samples)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, time.perf_counter() - started
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(samples, wall_seconds):
+    latencies = sorted(latency * 1000 for latency, _ok in samples)
+    errors = sum(1 for _latency, ok in samples if not ok)
+    return {
+        'requests': len(samples),
+        'errors': errors,
+        'throughput_rps': round(len(samples) / wall_seconds, 2) if wall_seconds else None,
+        'latency_ms': {
+            'mean': round(sum(latencies) / len(latencies), 3) if latencies else None,
+            'p50': round(percentile(latencies, 0.50), 3) if latencies else None,
+            'p95': round(percentile(latencies, 0.95), 3) if latencies else None,
+            'p99': round(percentile(latencies, 0.99), 3) if latencies else None,
+            'max': round(latencies[-1], 3) if latencies else None,
+        },
+    }
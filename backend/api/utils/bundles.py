@@ -0,0 +1,182 @@
+"""
+Offline dictionary bundles for the desktop client.
+
+A bundle is a gzip-compressed SQLite database with every cached Translation
+for one language pair::
+
+    meta(key TEXT PRIMARY KEY, value TEXT)
+        format, version, source_language, target_language, built_at, rows
+    entries(source_text, translated_text, usage_count)
+        PRIMARY KEY (source_text, translated_text), WITHOUT ROWID
+
+The entries table is clustered on ``source_text``, so a lookup is a single
+B-tree probe; a phrase's synonyms are ordered by ``usage_count`` descending,
+the same primary pick ``translate_text`` makes.
+
+A bundle's ``version`` is the settled change-feed version (see
+``api.utils.changes``) read before its rows, so replaying the pair's changes
+after that version brings it up to date. Clients do that instead of
+downloading a new bundle, and only call ``/api/translate`` on a local miss.
+Versions are global, so a pair's newest bundle is kept while the pair is
+unchanged, until it is half ``CHANGE_LOG_RETENTION_DAYS`` old; it is then
+rebuilt so its version stays within the retained change log.
+
+Bundles are written to ``BUNDLE_DIR`` as ``<source>_<target>_<version>.sqlite.gz``
+(atomically, via a temporary file) by ``manage.py build_bundles``.
+"""
+import glob
+import gzip
+import logging
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import time
+
+from django.conf import settings
+from django.utils import timezone
+
+from ..models import Translation, TranslationChange
+from .changes import is_retained, settled_version
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+DEFAULT_CHUNK_SIZE = 5000
+
+_LANGUAGE_CODE = re.compile(r'^[A-Za-z]{2,3}(-[A-Za-z0-9]{2,8})?$')
+_BUNDLE_NAME = re.compile(r'^(?P<source>[A-Za-z0-9-]+)_(?P<target>[A-Za-z0-9-]+)_(?P<version>\d+)\.sqlite\.gz$')
+
+SCHEMA = (
+    'CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)',
+    'CREATE TABLE entries ('
+    ' source_text TEXT NOT NULL, translated_text TEXT NOT NULL, usage_count INTEGER NOT NULL,'
+    ' PRIMARY KEY (source_text, translated_text)) WITHOUT ROWID',
+)
+
+
+def valid_language(code):
+    return bool(code) and _LANGUAGE_CODE.match(code) is not None
+
+
+def bundle_path(source_language, target_language, version):
+    return os.path.join(settings.BUNDLE_DIR, f'{source_language}_{target_language}_{version}.sqlite.gz')
+
+
+def list_bundles(source_language=None, target_language=None):
+    """``[(source, target, version, path)]`` for the bundles on disk, newest version first."""
+    bundles = []
+    for path in glob.glob(os.path.join(settings.BUNDLE_DIR, '*.sqlite.gz')):
+        match = _BUNDLE_NAME.match(os.path.basename(path))
+        if match is None:
+            continue
+        source, target = match['source'], match['target']
+        if source_language not in (None, source) or target_language not in (None, target):
+            continue
+        bundles.append((source, target, int(match['version']), path))
+    return sorted(bundles, key=lambda bundle: (bundle[0], bundle[1], -bundle[2]))
+
+
+def latest_bundle(source_language, target_language):
+    """``(version, path)`` of the newest bundle for the pair, or None."""
+    bundles = list_bundles(source_language, target_language)
+    return (bundles[0][2], bundles[0][3]) if bundles else None
+
+
+def bundle_is_current(source_language, target_language, bundle, version):
+    """
+    True if ``bundle`` (``(version, path)``) has every change to the pair up
+    to ``version`` and will not drop out of the change log before the next
+    scheduled build.
+    """
+    bundle_version, path = bundle
+    if bundle_version == version:
+        return True
+    max_age = settings.CHANGE_LOG_RETENTION_DAYS * 86400 / 2
+    if time.time() - os.path.getmtime(path) > max_age or not is_retained(bundle_version):
+        return False
+    changed = TranslationChange.objects.filter(
+        source_language=source_language, target_language=target_language, id__gt=bundle_version, id__lte=version
+    )
+    return not changed.exists()
+
+
+def language_pairs():
+    return list(
+        Translation.objects.order_by().values_list('source_language', 'target_language').distinct()
+    )
+
+
+def build_bundle(source_language, target_language, chunk_size=DEFAULT_CHUNK_SIZE, force=False):
+    """
+    Write the bundle for a pair; returns ``(version, path, rows)``. When the
+    newest bundle on disk is still current (see ``bundle_is_current``) it is
+    returned and nothing is rebuilt (``rows`` is None) unless ``force`` is set.
+    """
+    pair = Translation.objects.filter(source_language=source_language, target_language=target_language)
+    # Read before the rows: a change made while building is replayed by the client, never lost
+    version = settled_version()
+    latest = latest_bundle(source_language, target_language)
+    if latest and not force and bundle_is_current(source_language, target_language, latest, version):
+        return latest[0], latest[1], None
+
+    os.makedirs(settings.BUNDLE_DIR, exist_ok=True)
+    fd, db_path = tempfile.mkstemp(dir=settings.BUNDLE_DIR, prefix='.bundle-', suffix='.sqlite')
+    os.close(fd)
+    gz_path = db_path + '.gz'
+    rows = 0
+    try:
+        db = sqlite3.connect(db_path)
+        try:
+            for statement in SCHEMA:
+                db.execute(statement)
+            # Keyset pagination over the primary key
+            last_pk = 0
+            while True:
+                chunk = list(
+                    pair.filter(pk__gt=last_pk)
+                    .order_by('pk')
+                    .values_list('pk', 'source_text', 'translated_text', 'usage_count')[:chunk_size]
+                )
+                if not chunk:
+                    break
+                last_pk = chunk[-1][0]
+                db.executemany(
+                    'INSERT OR REPLACE INTO entries VALUES (?, ?, ?)',
+                    [(source_text, translated_text, usage_count) for _, source_text, translated_text, usage_count in chunk],
+                )
+                rows += len(chunk)
+            db.executemany('INSERT INTO meta VALUES (?, ?)', [
+                ('format', str(FORMAT_VERSION)),
+                ('version', str(version)),
+                ('source_language', source_language),
+                ('target_language', target_language),
+                ('built_at', timezone.now().isoformat()),
+                ('rows', str(rows)),
+            ])
+            db.commit()
+            db.execute('VACUUM')
+        finally:
+            db.close()
+
+        with open(db_path, 'rb') as source, gzip.open(gz_path, 'wb', compresslevel=9) as target:
+            shutil.copyfileobj(source, target)
+        path = bundle_path(source_language, target_language, version)
+        os.replace(gz_path, path)
+    finally:
+        for leftover in (db_path, gz_path):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+
+    logger.info("Built %s-%s bundle version %s with %s rows", source_language, target_language, version, rows)
+    return version, path, rows
+
+
+def prune_bundles(source_language, target_language, keep=2):
+    """Delete all but the ``keep`` newest bundles for the pair. Returns the number removed."""
+    stale = list_bundles(source_language, target_language)[keep:]
+    for _, _, _, path in stale:
+        os.remove(path)
+    return len(stale)
+
@@ -0,0 +1,135 @@
+"""
+Change feed over ``TranslationChange`` for incremental client sync.
+
+A client keeps the last version it applied and asks for ``changes_since``
+that version; pages are keyset-paginated on the change id, so a sync costs
+a function of the number of changes, not of the table size.
+
+Ids are assigned when a change is written but become visible when its
+transaction commits, so a later id can be readable before an earlier one.
+Unsettled changes are therefore held back: on PostgreSQL those whose
+transaction horizon is above the reader's snapshot xmin (see
+``TranslationChange``), on SQLite those younger than
+``CHANGE_FEED_SETTLE_SECONDS``. The feed only hands out changes up to
+``settled_version()``, the highest id with no unsettled change at or below
+it, so a client never steps past an id that may still appear.
+
+Versions are global. A feed filtered to one language pair still advances
+the client to ``settled_version()`` once it has caught up, so a quiet pair
+does not fall behind the retained log.
+
+Old changes are pruned after ``CHANGE_LOG_RETENTION_DAYS``
+(``manage.py prune_translation_changes``). A client whose version predates
+the oldest retained change gets ``FeedExpired`` and must resync from a
+bundle.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, router
+from django.db.models import Max, Min, Q
+from django.utils import timezone
+
+from ..models import TranslationChange
+from .maintenance import delete_in_chunks
+
+OPERATION_NAMES = dict(TranslationChange.OPERATIONS)
+
+
+class FeedExpired(Exception):
+    """The requested version is older than the retained change log."""
+
+
+def _pair_filter(queryset, source_language=None, target_language=None):
+    if source_language:
+        queryset = queryset.filter(source_language=source_language)
+    if target_language:
+        queryset = queryset.filter(target_language=target_language)
+    return queryset
+
+
+def current_version(source_language=None, target_language=None):
+    """Highest change id, optionally for one language pair (0 when empty)."""
+    queryset = _pair_filter(TranslationChange.objects.all(), source_language, target_language)
+    return queryset.aggregate(version=Max('id'))['version'] or 0
+
+
+def _unsettled():
+    """Filter for changes that may still have uncommitted changes with lower ids."""
+    connection = connections[router.db_for_read(TranslationChange)]
+    if connection.vendor == 'postgresql':
+        # Read separately so the planner sees a constant and uses the horizon index
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint')
+            return Q(horizon__gt=cursor.fetchone()[0])
+    return Q(changed_at__gt=timezone.now() - timedelta(seconds=settings.CHANGE_FEED_SETTLE_SECONDS))
+
+
+def settled_version():
+    """
+    Highest change id with no unsettled change at or below it (0 when there
+    is none). This is the version to stamp on a snapshot of the table read
+    after it: ``changes_since`` that version returns every change the
+    snapshot may lack. ``current_version`` can be past an id whose
+    transaction has not committed yet.
+    """
+    first_unsettled = TranslationChange.objects.filter(_unsettled()).aggregate(first=Min('id'))['first']
+    queryset = TranslationChange.objects.all()
+    if first_unsettled is not None:
+        queryset = queryset.filter(id__lt=first_unsettled)
+    return queryset.aggregate(version=Max('id'))['version'] or 0
+
+
+def is_retained(since):
+    """True if every change after version ``since`` is still in the log."""
+    oldest = TranslationChange.objects.aggregate(oldest=Min('id'))['oldest']
+    return oldest is None or since + 1 >= oldest
+
+
+def changes_since(since, limit, source_language=None, target_language=None):
+    """
+    Up to ``limit`` settled changes after version ``since``, oldest first.
+    Returns ``(changes, version, has_more)``; ``version`` is what to pass as
+    ``since`` next. Raises ``FeedExpired`` if changes after ``since`` were
+    pruned.
+    """
+    if not is_retained(since):
+        raise FeedExpired(f'Changes after version {since} are no longer retained')
+
+    settled = settled_version()
+    queryset = _pair_filter(
+        TranslationChange.objects.filter(id__gt=since, id__lte=settled), source_language, target_language
+    )
+    chunk = list(
+        queryset.order_by('id').values(
+            'id', 'operation', 'translation_id', 'source_text', 'translated_text', 'source_language', 'target_language',
+        )[:limit + 1]
+    )
+    has_more = len(chunk) > limit
+    changes = [
+        {
+            'version': change['id'],
+            'operation': OPERATION_NAMES[change['operation']],
+            'translation_id': change['translation_id'],
+            'source_text': change['source_text'],
+            'translated_text': change['translated_text'],
+            'source_language': change['source_language'],
+            'target_language': change['target_language'],
+        }
+        for change in chunk[:limit]
+    ]
+    if has_more:
+        return changes, changes[-1]['version'], True
+    # Caught up: skip past other pairs' changes too
+    return changes, max(since, settled), False
+
+
+def prune_changes(older_than_days, chunk_size, progress=None):
+    """
+    Delete changes older than ``older_than_days``, oldest first. The newest
+    change is always kept so ``FeedExpired`` can still be detected. Returns
+    the number deleted.
+    """
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    stale = TranslationChange.objects.filter(changed_at__lt=cutoff, id__lt=current_version())
+    return delete_in_chunks(stale, chunk_size, progress, order_by=('pk',))
@@ -0,0 +1,96 @@
+"""
+Batched inserts for the CSV importers (API upload and admin upload).
+
+Rows are buffered and, every ``batch_size`` cells, checked against the
+Translation table with a single query and inserted with ``bulk_create``, so
+an import costs two queries per batch instead of two per cell.
+
+A batch that collides with rows inserted concurrently (``unique_together``)
+is retried with ``ignore_conflicts`` and only the rows that were really
+inserted are counted as added. A batch that cannot be saved at all is
+reported in ``errors`` and counted in ``failed``; ``flush`` does not raise.
+"""
+import logging
+
+from django.db import DatabaseError, IntegrityError, transaction
+
+from ..models import Translation
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 500
+
+
+class TranslationImportBatch:
+    def __init__(self, source_language, batch_size=DEFAULT_BATCH_SIZE):
+        self.source_language = source_language
+        self.batch_size = batch_size
+        self.added = 0
+        self.skipped = 0
+        self.failed = 0
+        self.errors = []
+        self._pending = []
+        self._seen = set()
+
+    def add(self, source_text, target_language, translated_text):
+        key = (source_text, target_language, translated_text)
+        # A repeat within the same file is a duplicate of the row queued earlier
+        if key in self._seen:
+            self.skipped += 1
+            return
+        self._seen.add(key)
+        self._pending.append(key)
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def _existing(self, pending):
+        return set(
+            Translation.objects.filter(
+                source_language=self.source_language,
+                source_text__in={source_text for source_text, _, _ in pending},
+                target_language__in={target for _, target, _ in pending},
+            ).values_list('source_text', 'target_language', 'translated_text')
+        )
+
+    def _new_rows(self, pending, existing):
+        return [
+            Translation(
+                source_text=source_text,
+                translated_text=translated_text,
+                source_language=self.source_language,
+                target_language=target_language,
+            )
+            for source_text, target_language, translated_text in pending
+            if (source_text, target_language, translated_text) not in existing
+        ]
+
+    def _insert(self, pending):
+        """Insert the rows of ``pending`` that do not exist yet; returns how many were inserted."""
+        try:
+            with transaction.atomic():
+                new_rows = self._new_rows(pending, self._existing(pending))
+                Translation.objects.bulk_create(new_rows)
+            return len(new_rows)
+        except IntegrityError:
+            # Rows inserted by someone else since the check: skip those and
+            # count what this batch actually added
+            with transaction.atomic():
+                existing = self._existing(pending)
+                Translation.objects.bulk_create(self._new_rows(pending, existing), ignore_conflicts=True)
+                return len(self._existing(pending) - existing)
+
+    def flush(self):
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+        try:
+            added = self._insert(pending)
+        except DatabaseError as e:
+            logger.error("Could not import %s translations: %s", len(pending), e)
+            self.failed += len(pending)
+            self.errors.append(
+                f"{len(pending)} translations were not saved (from {pending[0][0]!r} to {pending[-1][0]!r}): {e}"
+            )
+            return
+        self.added += added
+        self.skipped += len(pending) - added
@@ -0,0 +1,194 @@
+"""
+Glossary enforcement on upstream translations.
+
+The ``GlossaryTerm`` rows of a language pair are compiled into an
+Aho-Corasick automaton, so an input is scanned in one pass whatever the
+number of terms. Matches are whole words (a term is not matched inside a
+longer word), case-insensitive unless the term says otherwise, and
+leftmost-longest without overlaps.
+
+Before the upstream call each match is wrapped in
+``<span translate="no">`` holding the required translation (or the term
+itself when the translation is blank), which Google Translate leaves
+untouched in its default HTML mode; ``Glossary.restore`` unwraps the spans
+in the response. Cached translations are served as they are.
+
+Each worker caches the compiled glossaries (``glossaries``). A pair is
+rechecked at most every ``GLOSSARY_REFRESH_SECONDS`` with one aggregate
+query (newest ``updated_at`` and row count) for all requested pairs and
+recompiled when that changed; saving or deleting a term through the ORM
+drops this worker's copy at once.
+"""
+from collections import deque
+import html
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.db.models import Count, Max
+
+from ..models import GlossaryTerm
+
+_PROTECTED = re.compile(r'<span translate="no">(.*?)</span>', re.DOTALL)
+
+
+def _fold(text):
+    """Lower-case ``text`` keeping every character at its offset."""
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    return ''.join(char if len(char.lower()) != 1 else char.lower() for char in text)
+
+
+class AhoCorasick:
+    """Multi-pattern matcher over lower-cased text; patterns carry a payload."""
+
+    def __init__(self, patterns):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]  # node -> (pattern length, payload) of the patterns ending there
+        for pattern, payload in patterns:
+            node = 0
+            for char in _fold(pattern):
+                following = self._goto[node].get(char)
+                if following is None:
+                    following = len(self._goto)
+                    self._goto[node][char] = following
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = following
+            self._out[node].append((len(pattern), payload))
+
+        # Breadth-first, so a node's fail target is final before its children use it
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, following in self._goto[node].items():
+                queue.append(following)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[following] = self._goto[fail].get(char, 0)
+                self._out[following].extend(self._out[self._fail[following]])
+
+    def scan(self, text):
+        """``(start, end, payload)`` for every occurrence in ``text``, by end position."""
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for index, char in enumerate(_fold(text)):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for length, payload in out[node]:
+                yield index + 1 - length, index + 1, payload
+
+
+class Glossary:
+    """The compiled terms of one language pair."""
+
+    def __init__(self, terms):
+        # terms: (term, translation, case_sensitive)
+        self.size = len(terms)
+        self._matcher = AhoCorasick((term, (term, translation, case_sensitive)) for term, translation, case_sensitive in terms)
+
+    def __len__(self):
+        return self.size
+
+    def find(self, text):
+        """Non-overlapping whole-word matches as ``(start, end, replacement)``, leftmost-longest."""
+        candidates = []
+        for start, end, (term, translation, case_sensitive) in self._matcher.scan(text):
+            if case_sensitive and text[start:end] != term:
+                continue
+            if (start > 0 and text[start - 1].isalnum() and text[start].isalnum()) or \
+                    (end < len(text) and text[end].isalnum() and text[end - 1].isalnum()):
+                continue
+            candidates.append((start, -end, translation or text[start:end]))
+        matches = []
+        position = 0
+        for start, negative_end, replacement in sorted(candidates):
+            if start >= position:
+                matches.append((start, -negative_end, replacement))
+                position = -negative_end
+        return matches
+
+    def protect(self, text):
+        """``text`` with each match replaced by its protected translation, and the match count."""
+        matches = self.find(text)
+        if not matches:
+            return text, 0
+        parts = []
+        position = 0
+        for start, end, replacement in matches:
+            parts.append(text[position:start])
+            parts.append(f'<span translate="no">{html.escape(replacement, quote=False)}</span>')
+            position = end
+        parts.append(text[position:])
+        return ''.join(parts), len(matches)
+
+    @staticmethod
+    def restore(translated):
+        return _PROTECTED.sub(lambda match: html.unescape(match[1]), translated)
+
+
+class GlossaryCache:
+    """Per-worker compiled glossaries, keyed on language pair."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pairs = {}  # (source, target) -> (checked_at, version, Glossary or None)
+
+    def invalidate(self, source_language, target_language):
+        with self._lock:
+            self._pairs.pop((source_language, target_language), None)
+
+    def for_targets(self, source_language, target_languages):
+        """
+        ``{target: Glossary}`` for the pairs from ``source_language`` that have
+        terms. At most two queries, and none while every pair is fresh.
+        """
+        if not settings.GLOSSARY_ENABLED or not source_language:
+            return {}
+        now = time.monotonic()
+        with self._lock:
+            cached = {target: self._pairs.get((source_language, target)) for target in target_languages}
+        stale = [
+            target for target, entry in cached.items()
+            if entry is None or now - entry[0] >= settings.GLOSSARY_REFRESH_SECONDS
+        ]
+        if stale:
+            pair_terms = GlossaryTerm.objects.filter(source_language=source_language, target_language__in=stale)
+            versions = {
+                row['target_language']: (row['updated'], row['terms'])
+                for row in pair_terms.order_by().values('target_language').annotate(
+                    updated=Max('updated_at'), terms=Count('id')
+                )
+            }
+            changed = [
+                target for target in stale
+                if cached[target] is None or cached[target][1] != versions.get(target)
+            ]
+            terms = {}
+            if any(target in versions for target in changed):
+                for target, term, translation, case_sensitive in pair_terms.filter(target_language__in=changed).values_list(
+                    'target_language', 'term', 'translation', 'case_sensitive'
+                ):
+                    terms.setdefault(target, []).append((term, translation, case_sensitive))
+            with self._lock:
+                for target in stale:
+                    if target in changed:
+                        glossary = Glossary(terms[target]) if target in terms else None
+                    else:
+                        glossary = cached[target][2]
+                    cached[target] = self._pairs[(source_language, target)] = (now, versions.get(target), glossary)
+        return {target: entry[2] for target, entry in cached.items() if entry[2] is not None}
+
+
+glossaries = GlossaryCache()
+
+
+def invalidate_glossary(sender, instance, **kwargs):
+    """post_save/post_delete receiver for ``GlossaryTerm``."""
+    glossaries.invalidate(instance.source_language, instance.target_language)
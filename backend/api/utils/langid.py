@@ -0,0 +1,154 @@
+"""
+Offline language identification for requests without ``source_language``.
+
+A multinomial naive Bayes model over character n-grams (1 to 3 characters
+of each word, padded with spaces) trained from the Translation cache
+itself: every row labels its ``source_text`` with ``source_language`` and
+its ``translated_text`` with ``target_language``
+(``manage.py train_language_model``). The model file is a gzip-compressed
+JSON document::
+
+    {"format": 1, "max_n": 3, "languages": {"en": {"total": ..., "grams": {"th": 812, ...}}, ...}}
+
+Each worker loads ``LANGUAGE_MODEL_PATH`` once, the first time it is
+needed; without a model file nothing is guessed. ``identify`` returns the
+most likely language and a confidence: the posterior with each word
+counted as one observation. The n-grams of a word overlap and are far from
+independent, so the plain naive Bayes posterior is ~1.0 for nearly any
+input of a few words. ``translate_text`` prefers cached rows in guesses of
+at least ``LANGUAGE_ID_MIN_CONFIDENCE`` and falls back to other source
+languages; Google still detects the language of an upstream call, so a
+wrong guess costs neither a cache hit nor a wrong translation.
+"""
+import gzip
+import json
+import logging
+import math
+import os
+import threading
+
+from django.conf import settings
+
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+MAX_N = 3
+
+
+def ngrams(text, max_n=MAX_N):
+    """Character n-grams of each lower-cased word of ``text``, padded with spaces."""
+    grams = []
+    for word in text.lower().split():
+        word = ''.join(char for char in word if char.isalpha())
+        if not word:
+            continue
+        padded = f' {word} '
+        for n in range(1, max_n + 1):
+            grams.extend(padded[i:i + n] for i in range(len(padded) - n + 1) if padded[i:i + n].strip())
+    return grams
+
+
+class LanguageIdentifier:
+    """Per-n-gram log-probabilities for the languages of a model, stored sparsely."""
+
+    def __init__(self, model):
+        if model.get('format') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported language model format {model.get('format')}")
+        self.max_n = model.get('max_n', MAX_N)
+        self.languages = sorted(model['languages'])
+        vocabulary = set()
+        for profile in model['languages'].values():
+            vocabulary.update(profile['grams'])
+        # Add-one smoothing over the model vocabulary. A gram scores ``unseen``
+        # in every language plus, where the language has seen it, a bonus.
+        self._unseen = []
+        self._bonus = {}  # gram -> ((language index, log-probability above unseen), ...)
+        for index, language in enumerate(self.languages):
+            profile = model['languages'][language]
+            denominator = math.log(profile['total'] + len(vocabulary))
+            self._unseen.append(-denominator)
+            for gram, count in profile['grams'].items():
+                self._bonus.setdefault(gram, []).append((index, math.log(count + 1)))
+        self._bonus = {gram: tuple(bonus) for gram, bonus in self._bonus.items()}
+
+    @classmethod
+    def load(cls, path):
+        with gzip.open(path, 'rt', encoding='utf-8') as handle:
+            return cls(json.load(handle))
+
+    def identify(self, text):
+        """``(language, confidence)`` for ``text``, or ``(None, 0.0)`` with no usable n-grams."""
+        bonus = [0.0] * len(self.languages)
+        known = 0
+        words = sum(1 for word in text.split() if any(char.isalpha() for char in word))
+        for gram in ngrams(text, self.max_n):
+            seen = self._bonus.get(gram)
+            if seen is None:
+                # Outside every profile: no evidence either way
+                continue
+            known += 1
+            for index, logprob in seen:
+                bonus[index] += logprob
+        if not known:
+            return None, 0.0
+        scores = [known * unseen + extra for unseen, extra in zip(self._unseen, bonus)]
+        best = max(scores)
+        index = scores.index(best)
+        # Scale the log-likelihoods down from one per n-gram to one per word
+        grams_per_word = max(known / words, 1.0)
+        return self.languages[index], 1.0 / sum(math.exp((score - best) / grams_per_word) for score in scores)
+
+
+def train(samples, max_ngrams=3000):
+    """Model dict from ``(text, language)`` pairs, keeping each language's ``max_ngrams`` commonest n-grams."""
+    counts = {}
+    for text, language in samples:
+        profile = counts.setdefault(language, {})
+        for gram in ngrams(text):
+            profile[gram] = profile.get(gram, 0) + 1
+    languages = {}
+    for language, profile in counts.items():
+        top = sorted(profile.items(), key=lambda item: (-item[1], item[0]))[:max_ngrams]
+        languages[language] = {'total': sum(count for _, count in top), 'grams': dict(top)}
+    return {'format': FORMAT_VERSION, 'max_n': MAX_N, 'languages': languages}
+
+
+_identifier = None
+_loaded = False
+_load_lock = threading.Lock()
+
+
+def get_identifier():
+    """This worker's ``LanguageIdentifier``, loaded on first use; None when disabled or without a model."""
+    global _identifier, _loaded
+    if not settings.LANGUAGE_ID_ENABLED:
+        return None
+    if not _loaded:
+        with _load_lock:
+            if not _loaded:
+                path = settings.LANGUAGE_MODEL_PATH
+                if os.path.exists(path):
+                    try:
+                        _identifier = LanguageIdentifier.load(path)
+                        logger.info("Loaded language model %s (%s languages)", path, len(_identifier.languages))
+                    except (OSError, ValueError, KeyError) as e:
+                        logger.error("Could not load language model %s: %s", path, e)
+                else:
+                    logger.info("No language model at %s; source languages will not be guessed", path)
+                _loaded = True
+    return _identifier
+
+
+def guess_language(text):
+    """``(language, confidence)`` when the guess reaches ``LANGUAGE_ID_MIN_CONFIDENCE``, else None."""
+    identifier = get_identifier()
+    if identifier is None:
+        return None
+    language, confidence = identifier.identify(text)
+    if language is None or confidence < settings.LANGUAGE_ID_MIN_CONFIDENCE:
+        registry.inc('language_guesses_total', result='unsure')
+        return None
+    registry.inc('language_guesses_total', result='confident')
+    return language, confidence
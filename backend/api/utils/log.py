@@ -0,0 +1,163 @@
+"""
+Low-overhead logging building blocks, wired up in ``settings.LOGGING``.
+
+- ``AsyncStreamHandler`` hands records to a background ``QueueListener``
+  thread, so rendering the log line and stream I/O happen off the request
+  thread (the message itself is formatted before the hand-off).
+- ``JSONFormatter`` renders one JSON object per line.
+- ``RateSamplingFilter`` caps high-frequency loggers to N records per second
+  (WARNING and above are never dropped) and reports how many were skipped.
+
+This module is imported while settings are configured, so it must not import
+Django models.
+"""
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+
+# Attributes every LogRecord has; anything else was passed via ``extra``
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+_PLAIN_TYPES = (str, int, float, bool, type(None))
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record):
+        payload = {
+            'ts': round(record.created, 6),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                payload[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            payload['exc_info'] = record.exc_text
+        return json.dumps(payload, default=str, ensure_ascii=False)
+
+
+class AsyncStreamHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that owns its listener thread and a StreamHandler target.
+
+    ``prepare`` runs in the calling thread and renders everything that can
+    refer to live objects (request objects, model instances, frames): the
+    message with its args, exception tracebacks, and ``extra`` values that
+    are not plain JSON types. The listener only applies the formatter and
+    writes to the stream. When the queue is full, records are dropped and
+    counted rather than blocking the request.
+    """
+
+    def __init__(self, stream=None, max_queue_size=10000):
+        super().__init__(queue.Queue(max_queue_size))
+        self.target = logging.StreamHandler(stream or sys.stderr)
+        self.dropped = 0
+        self._listener = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def setFormatter(self, fmt):
+        super().setFormatter(fmt)
+        self.target.setFormatter(fmt)
+
+    def _ensure_listener(self):
+        # Started lazily and per process: threads do not survive a gunicorn fork
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid != os.getpid():
+                self._listener = logging.handlers.QueueListener(self.queue, self.target, respect_handler_level=True)
+                self._listener.start()
+                self._pid = os.getpid()
+                atexit.register(self.stop)
+
+    def prepare(self, record):
+        if record.exc_info and not record.exc_text:
+            record.exc_text = (self.formatter or logging.Formatter()).formatException(record.exc_info)
+        message = record.getMessage()
+        record = copy.copy(record)
+        record.msg = record.message = message
+        record.args = None
+        record.exc_info = None
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not isinstance(value, _PLAIN_TYPES):
+                setattr(record, key, str(value))
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def emit(self, record):
+        self._ensure_listener()
+        super().emit(record)
+
+    def stop(self):
+        if self._listener and self._pid == os.getpid():
+            self._listener.stop()
+            self._listener = None
+            self._pid = None
+
+
+class RateSamplingFilter(logging.Filter):
+    """
+    Allow at most ``rates[logger_name]`` records per second from each
+    configured logger (prefix match, most specific wins). Records at WARNING
+    or above always pass. The first record let through after a period of
+    dropping carries ``sampled_out=<count>``.
+
+    ``rates`` is a dict or a ``"logger=rate,..."`` string (see ``parse_sample_rates``).
+    """
+
+    def __init__(self, rates=None):
+        super().__init__()
+        self.rates = parse_sample_rates(rates) if isinstance(rates, str) else dict(rates or {})
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def _rate_for(self, name):
+        while name:
+            if name in self.rates:
+                return name, self.rates[name]
+            name = name.rpartition('.')[0]
+        return None, None
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        key, rate = self._rate_for(record.name)
+        if key is None:
+            return True
+
+        now = int(time.monotonic())
+        with self._lock:
+            second, passed, dropped = self._windows.get(key, (now, 0, 0))
+            if second != now:
+                second, passed = now, 0
+            if passed >= rate:
+                self._windows[key] = (second, passed, dropped + 1)
+                return False
+            self._windows[key] = (second, passed + 1, 0)
+        if dropped:
+            record.sampled_out = dropped
+        return True
+
+
+def parse_sample_rates(value):
+    """Parse ``"api.views.translation=50,api.admin=10"`` into ``{name: rate}``."""
+    rates = {}
+    for item in filter(None, (part.strip() for part in (value or '').split(','))):
+        name, _, rate = item.partition('=')
+        rates[name.strip()] = int(rate)
+    return rates
@@ -0,0 +1,207 @@
+"""
+Set-based maintenance operations for the Translation cache.
+
+Every operation works in bounded chunks of SQL statements (never by loading
+model instances) so it is safe to run against the full production table. Each
+accepts an optional ``progress(done, total)`` callback used by the management
+commands and admin actions to report progress (``total`` is None when it is
+not known up front).
+"""
+from datetime import timedelta
+import logging
+
+from django.db import transaction
+from django.db.models import Case, Count, F, Func, IntegerField, Max, Min, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Lower, Trim
+from django.utils import timezone
+
+from ..models import Translation, UserTranslationHistory
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 5000
+
+
+def _report(progress, done, total):
+    if progress:
+        progress(done, total)
+
+
+def delete_in_chunks(queryset, chunk_size=DEFAULT_CHUNK_SIZE, progress=None, total=None, order_by=()):
+    """
+    Delete every row matched by ``queryset`` in batches of ``chunk_size``
+    primary keys, committing between batches so locks stay short.
+    ``order_by`` controls which rows each batch picks (unordered by default).
+    Returns the number of rows deleted.
+    """
+    model = queryset.model
+    queryset = queryset.order_by(*order_by)
+    deleted = 0
+    while True:
+        pks = list(queryset.values_list('pk', flat=True)[:chunk_size])
+        if not pks:
+            break
+        with transaction.atomic():
+            count, _ = model._default_manager.filter(pk__in=pks).delete()
+        deleted += count
+        _report(progress, deleted, total)
+    return deleted
+
+
+def cold_translations(queryset=None, older_than_days=180, max_usage_count=0):
+    """Rows not accessed for ``older_than_days`` and used at most ``max_usage_count`` times."""
+    queryset = Translation.objects.all() if queryset is None else queryset
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    return queryset.filter(last_accessed__lt=cutoff, usage_count__lte=max_usage_count)
+
+
+def evict_cold_translations(queryset=None, older_than_days=180, max_usage_count=0,
+                            chunk_size=DEFAULT_CHUNK_SIZE, progress=None, dry_run=False):
+    """Delete cold rows (see ``cold_translations``). Returns the number of rows evicted."""
+    cold = cold_translations(queryset, older_than_days, max_usage_count)
+    total = cold.count()
+    if dry_run or not total:
+        return total
+    evicted = delete_in_chunks(cold, chunk_size, progress, total)
+    logger.info("Evicted %d cold translations (older than %d days, usage <= %d)",
+                evicted, older_than_days, max_usage_count)
+    return evicted
+
+
+def duplicate_synonym_groups(queryset=None):
+    """
+    Groups of rows for the same source text and language pair whose
+    translated_text differs only by case or surrounding whitespace.
+    """
+    queryset = Translation.objects.all() if queryset is None else queryset
+    return (
+        queryset.order_by()
+        .annotate(normalized=Lower(Trim('translated_text')))
+        .values('source_text', 'source_language', 'target_language', 'normalized')
+        .annotate(
+            rows=Count('pk'),
+            keep_id=Min('pk'),
+            total_usage=Sum('usage_count'),
+            latest_access=Max('last_accessed'),
+        )
+        .filter(rows__gt=1)
+    )
+
+
+def source_text_ranges(queryset, rows_per_range):
+    """
+    Consecutive ``(after, upto)`` bounds on source_text covering
+    ``queryset``, each selecting ``source_text > after AND source_text <= upto``
+    for about ``rows_per_range`` rows (``None`` leaves that side open). A
+    source text never spans two ranges, so neither does a duplicate group.
+    """
+    ordered = queryset.order_by('source_text').values_list('source_text', flat=True)
+    after = None
+    while True:
+        remaining = ordered if after is None else ordered.filter(source_text__gt=after)
+        upto = next(iter(remaining[rows_per_range - 1:rows_per_range]), None)
+        yield after, upto
+        if upto is None:
+            return
+        after = upto
+
+
+def _in_range(queryset, after, upto):
+    if after is not None:
+        queryset = queryset.filter(source_text__gt=after)
+    if upto is not None:
+        queryset = queryset.filter(source_text__lte=upto)
+    return queryset
+
+
+def merge_duplicate_synonyms(queryset=None, chunk_size=1000, progress=None, dry_run=False):
+    """
+    Collapse each duplicate group into its oldest row, which receives the
+    summed usage_count and the latest last_accessed. The table is walked in
+    source_text ranges of about ``chunk_size`` rows (see
+    ``source_text_ranges``), with one UPDATE/DELETE pair per range, so only
+    one range's groups are held in memory.
+    Returns ``(groups_merged, rows_removed)``.
+    """
+    queryset = Translation.objects.all() if queryset is None else queryset
+    merged = removed = 0
+    for after, upto in source_text_ranges(queryset, chunk_size):
+        chunk = list(duplicate_synonym_groups(_in_range(queryset, after, upto)))
+        if not chunk:
+            continue
+        merged += len(chunk)
+        if dry_run:
+            removed += sum(group['rows'] - 1 for group in chunk)
+            continue
+
+        keep_ids = [group['keep_id'] for group in chunk]
+        duplicates = Q()
+        for group in chunk:
+            duplicates |= Q(
+                source_text=group['source_text'],
+                source_language=group['source_language'],
+                target_language=group['target_language'],
+                normalized=group['normalized'],
+            )
+
+        with transaction.atomic():
+            Translation.objects.filter(pk__in=keep_ids).update(
+                usage_count=Case(
+                    *[When(pk=group['keep_id'], then=Value(group['total_usage'])) for group in chunk],
+                    output_field=IntegerField(),
+                ),
+                last_accessed=Case(
+                    *[When(pk=group['keep_id'], then=Value(group['latest_access'])) for group in chunk],
+                    default=F('last_accessed'),
+                ),
+            )
+            count, _ = (
+                queryset.order_by()
+                .alias(normalized=Lower(Trim('translated_text')))
+                .filter(duplicates)
+                .exclude(pk__in=keep_ids)
+                .delete()
+            )
+        removed += count
+        _report(progress, merged, None)
+
+    if not dry_run:
+        logger.info("Merged %d duplicate synonym groups, removed %d rows", merged, removed)
+    return merged, removed
+
+
+def recompute_usage_counts(queryset=None, chunk_size=DEFAULT_CHUNK_SIZE, progress=None):
+    """
+    Reset usage_count to the number of matching UserTranslationHistory rows,
+    one correlated UPDATE per primary-key range. The lower(input_text)
+    predicate lets PostgreSQL use the expression index from migration 0007.
+    Returns the number of rows updated.
+    """
+    queryset = (Translation.objects.all() if queryset is None else queryset).order_by()
+    bounds = queryset.aggregate(first=Min('pk'), last=Max('pk'))
+    if bounds['first'] is None:
+        return 0
+
+    history_count = (
+        UserTranslationHistory.objects.order_by()
+        .alias(input_lower=Lower('input_text'))
+        .filter(
+            input_lower=Lower(OuterRef('source_text')),
+            input_text=OuterRef('source_text'),
+            output_text=OuterRef('translated_text'),
+            source_language=OuterRef('source_language'),
+            target_language=OuterRef('target_language'),
+        )
+        .annotate(count=Func(F('pk'), function='COUNT'))
+        .values('count')
+    )
+
+    total = bounds['last'] - bounds['first'] + 1
+    updated = 0
+    for start in range(bounds['first'], bounds['last'] + 1, chunk_size):
+        with transaction.atomic():
+            updated += queryset.filter(pk__gte=start, pk__lt=start + chunk_size).update(
+                usage_count=Coalesce(Subquery(history_count, output_field=IntegerField()), 0)
+            )
+        _report(progress, min(start + chunk_size - bounds['first'], total), total)
+    return updated
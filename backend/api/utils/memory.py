@@ -0,0 +1,130 @@
+"""
+Translation memory: reuse a cached translation for a text that is not an
+exact ``source_text`` match but close to one.
+
+Two levels of match, tried after the exact lookup misses:
+
+- ``normalized``: same ``memory_key`` (Unicode NFKC, case-folded,
+  punctuation dropped, whitespace collapsed), so "Hello, world!" reuses
+  "hello world". Score 1.0.
+- ``fuzzy``: trigram similarity of the keys (shared trigrams / all distinct
+  trigrams, the pg_trgm formula) of at least
+  ``TRANSLATION_MEMORY_THRESHOLD``, so "I lost my keys" can reuse "I lost
+  my key".
+
+Each worker keeps a ``FuzzyIndex`` per language pair with an inverted index
+from trigram to keys, built and kept current like the autocomplete index
+(``api.utils.pairindex``). A lookup gathers candidates only from the
+query's rarest trigrams: a key reaching the threshold must share at least
+``ceil(threshold * n)`` of the query's ``n`` trigrams, so it shares one of
+any ``n - ceil(threshold * n) + 1`` of them. Candidates are then scored
+exactly.
+"""
+import math
+import unicodedata
+
+from django.conf import settings
+
+from .pairindex import PairIndex, PairIndexSet
+
+
+def memory_key(text):
+    text = unicodedata.normalize('NFKC', text).casefold()
+    kept = ''.join(' ' if unicodedata.category(char)[0] in 'PZC' else char for char in text)
+    return ' '.join(kept.split())
+
+
+def trigrams(key):
+    padded = f'  {key} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class FuzzyIndex(PairIndex):
+    """Trigram index over the memory keys of one language pair."""
+
+    key = staticmethod(memory_key)
+
+    def __init__(self, source_language, target_language):
+        super().__init__(source_language, target_language)
+        self._grams = {}  # trigram -> keys containing it
+
+    def _finish_keys(self):
+        for key in self._members:
+            self._key_added(key)
+
+    def _key_added(self, key):
+        for gram in trigrams(key):
+            self._grams.setdefault(gram, set()).add(key)
+
+    def _key_removed(self, key):
+        for gram in trigrams(key):
+            keys = self._grams.get(gram)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._grams[gram]
+
+    def similar(self, key, threshold):
+        """``(score, best row)`` of the most similar key scoring at least ``threshold``, or None."""
+        grams = trigrams(key)
+        size = len(grams)
+        probe = sorted(grams, key=lambda gram: len(self._grams.get(gram, ())))[:size - math.ceil(threshold * size) + 1]
+        candidates = set()
+        for gram in probe:
+            candidates.update(self._grams.get(gram, ()))
+
+        best = None
+        for candidate in candidates:
+            candidate_grams = trigrams(candidate)
+            shared = len(grams & candidate_grams)
+            score = shared / (size + len(candidate_grams) - shared)
+            if score >= threshold and (best is None or (score, self._best[candidate][0]) > (best[0], best[1][0])):
+                best = (score, self._best[candidate])
+        return best
+
+
+class TranslationMemory(PairIndexSet):
+    """Per-worker set of ``FuzzyIndex`` objects."""
+
+    settings_prefix = 'TRANSLATION_MEMORY'
+    name = 'translation memory'
+
+    def enabled(self):
+        return settings.TRANSLATION_MEMORY_ENABLED
+
+    def new_pair(self, source_language, target_language):
+        return FuzzyIndex(source_language, target_language)
+
+    def match(self, text, target_language, source_language=None, threshold=None):
+        """
+        Best ``{match_type, score, source_text, translated_text,
+        source_language}`` for ``text``, or None. Call ``ready()`` first.
+        """
+        self.refresh()
+        threshold = settings.TRANSLATION_MEMORY_THRESHOLD if threshold is None else threshold
+        key = memory_key(text)
+        if not key:
+            return None
+        with self._lock:
+            indexes = self._indexes(target_language, source_language)
+            found = [(1.0, index.best(key), index.source_language) for index in indexes if index.best(key)]
+            match_type = 'normalized'
+            if not found and threshold < 1.0:
+                match_type = 'fuzzy'
+                for index in indexes:
+                    result = index.similar(key, threshold)
+                    if result is not None:
+                        found.append((*result, index.source_language))
+        if not found:
+            return None
+        score, (_usage_count, source_text, translated_text), source = max(found, key=lambda item: (item[0], item[1][0]))
+        return {
+            'match_type': match_type,
+            'score': round(score, 3),
+            'source_text': source_text,
+            'translated_text': translated_text,
+            'source_language': source,
+        }
+
+
+translation_memory = TranslationMemory()
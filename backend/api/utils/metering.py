@@ -0,0 +1,173 @@
+"""
+Character-cost metering and per-user daily quotas.
+
+Google bills translation per character sent. Each worker counts, per user
+and day, the characters and calls sent upstream and the characters and
+requests answered from the cache (which would otherwise have been billed)
+in memory. Every ``METERING_FLUSH_SECONDS`` a background thread adds the
+pending counts to ``UsageRollup`` with one upsert
+(``INSERT ... ON CONFLICT DO UPDATE SET n = n + excluded.n``), so requests
+never take a row lock; pending counts are also flushed when the worker
+exits. Without ``BACKGROUND_TASKS_ENABLED`` they are flushed only then.
+
+``check_quota`` runs before an upstream call. A user's usage today is the
+rollup row, read at most every ``METERING_USAGE_CACHE_SECONDS`` per worker,
+plus this worker's pending counts. Counts still pending in other workers
+are not visible, so a quota can be overshot by up to one flush interval of
+their traffic.
+"""
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection, connections
+from django.utils import timezone
+
+from ..models import UsageRollup
+from .metrics import registry
+from .ttlcache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ('upstream_characters', 'upstream_requests', 'cached_characters', 'cached_requests')
+
+
+class QuotaExceeded(Exception):
+    """The user's daily character or request quota does not cover an upstream call."""
+
+    def __init__(self, quota, limit, used):
+        super().__init__(f'Daily {quota} quota of {limit} exceeded ({used} used)')
+        self.quota = quota
+        self.limit = limit
+        self.used = used
+
+
+def _upsert_sql():
+    table = connection.ops.quote_name(UsageRollup._meta.db_table)
+    columns = ', '.join(connection.ops.quote_name(column) for column in ('user_id', 'day', *FIELDS))
+    updates = ', '.join(
+        f'{connection.ops.quote_name(field)} = {table}.{connection.ops.quote_name(field)} + EXCLUDED.{connection.ops.quote_name(field)}'
+        for field in FIELDS
+    )
+    placeholders = ', '.join(['%s'] * (2 + len(FIELDS)))
+    return (f'INSERT INTO {table} ({columns}) VALUES ({placeholders}) '
+            f'ON CONFLICT ({connection.ops.quote_name("user_id")}, {connection.ops.quote_name("day")}) DO UPDATE SET {updates}')
+
+
+class UsageMeter:
+    """Per-worker pending usage counts, keyed on ``(user_id, day)``."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}  # (user_id, day) -> [upstream_characters, upstream_requests, cached_characters, cached_requests]
+        self._flushed_at = time.monotonic()
+        self._flushing = False
+        self._persisted = TTLCache(settings.METERING_USAGE_CACHE_SECONDS)
+
+    def _add(self, user_id, counts):
+        if not settings.METERING_ENABLED:
+            return
+        key = (user_id, timezone.localdate())
+        with self._lock:
+            pending = self._pending.setdefault(key, [0] * len(FIELDS))
+            for index, count in enumerate(counts):
+                pending[index] += count
+        if time.monotonic() - self._flushed_at >= settings.METERING_FLUSH_SECONDS:
+            self._start_flush()
+
+    def record_upstream(self, user_id, characters):
+        registry.inc('translation_characters_total', amount=characters, source='upstream')
+        self._add(user_id, (characters, 1, 0, 0))
+
+    def record_cached(self, user_id, characters):
+        registry.inc('translation_characters_total', amount=characters, source='cache')
+        self._add(user_id, (0, 0, characters, 1))
+
+    def _start_flush(self):
+        if not settings.BACKGROUND_TASKS_ENABLED:
+            return
+        with self._lock:
+            if self._flushing:
+                return
+            self._flushing = True
+            self._flushed_at = time.monotonic()
+        threading.Thread(target=self._flush_in_background, name='usage-flush', daemon=True).start()
+
+    def _flush_in_background(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Usage flush failed")
+        finally:
+            self._flushing = False
+            # The thread's connections are not closed by any request cycle
+            connections.close_all()
+
+    def flush(self):
+        """Add the pending counts to ``UsageRollup``; they are kept for the next flush if that fails."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        try:
+            with connection.cursor() as cursor:
+                cursor.executemany(_upsert_sql(), [(user_id, day, *counts) for (user_id, day), counts in pending.items()])
+        except Exception:
+            with self._lock:
+                for key, counts in pending.items():
+                    merged = self._pending.setdefault(key, [0] * len(FIELDS))
+                    for index, count in enumerate(counts):
+                        merged[index] += count
+            raise
+        for key in pending:
+            # The row now includes these counts; read it again on the next check
+            self._persisted.delete(key)
+        return len(pending)
+
+    def usage_today(self, user_id):
+        """``(upstream_characters, upstream_requests)`` for today: rollup plus this worker's pending counts."""
+        key = (user_id, timezone.localdate())
+        persisted = self._persisted.get(key)
+        if persisted is None:
+            row = UsageRollup.objects.filter(user_id=user_id, day=key[1]).values_list(
+                'upstream_characters', 'upstream_requests'
+            ).first()
+            persisted = row or (0, 0)
+            self._persisted.set(key, persisted)
+        with self._lock:
+            pending = self._pending.get(key, (0, 0))
+            return persisted[0] + pending[0], persisted[1] + pending[1]
+
+    def check_quota(self, user, characters, requests=1):
+        """Raise ``QuotaExceeded`` if ``requests`` upstream calls sending ``characters`` would exceed a quota."""
+        if not settings.METERING_ENABLED:
+            return
+        character_quota = user.daily_character_quota
+        if character_quota is None:
+            character_quota = settings.METERING_DAILY_CHARACTER_QUOTA
+        request_quota = user.daily_request_quota
+        if request_quota is None:
+            request_quota = settings.METERING_DAILY_REQUEST_QUOTA
+        if not character_quota and not request_quota:
+            return
+
+        used_characters, used_requests = self.usage_today(user.pk)
+        if character_quota and used_characters + characters > character_quota:
+            registry.inc('translation_quota_rejections_total', quota='characters')
+            raise QuotaExceeded('character', character_quota, used_characters)
+        if request_quota and used_requests + requests > request_quota:
+            registry.inc('translation_quota_rejections_total', quota='requests')
+            raise QuotaExceeded('request', request_quota, used_requests)
+
+
+usage_meter = UsageMeter()
+
+
+@atexit.register
+def _flush_at_exit():
+    try:
+        usage_meter.flush()
+    except Exception:
+        logger.exception("Usage flush at exit failed")
@@ -0,0 +1,282 @@
+"""
+Request timing and in-memory latency histograms.
+
+Code running inside a request records named spans with ``span()``::
+
+    with span('upstream'):
+        response = requests.post(...)
+
+``api.middleware.RequestMetricsMiddleware`` opens a ``RequestTimer`` per
+request, counts database queries, turns the spans into a ``Server-Timing``
+header and feeds the per-route histograms below. Outside a request ``span()``
+is a no-op.
+
+Each worker process aggregates into its own ``registry``. When
+``METRICS_DIR`` is set, workers write their cumulative snapshot to
+``<METRICS_DIR>/metrics-<pid>.json`` at most every ``METRICS_FLUSH_SECONDS``
+and ``render_metrics()`` sums every file in the directory, so ``/metrics``
+reports all gunicorn workers whichever one serves it. Files from exited
+workers are kept so counters never go backwards, but their gauges are
+dropped: a dead worker's last reading is no longer current. Clear the
+directory when the service is (re)deployed.
+"""
+from contextlib import contextmanager
+import contextvars
+import glob
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+HISTOGRAMS = {
+    'http_request_duration_seconds': ('Request latency by route.', LATENCY_BUCKETS),
+    'http_request_db_queries': ('Database queries per request by route.', QUERY_COUNT_BUCKETS),
+    'http_request_span_seconds': ('Time spent in named spans per request.', LATENCY_BUCKETS),
+}
+
+# Counters only go up; across workers they are summed
+COUNTERS = {
+    'translation_cache_lookups_total': 'translate_text cache lookups by result (hit, reverse_hit, normalized_hit, fuzzy_hit, miss).',
+    'translation_reverse_ambiguous_total': ('Reverse lookups skipped because the cached rows disagree on the source text; '
+                                            'the lookup is counted once more in translation_cache_lookups_total.'),
+    'translation_masked_lookups_total': ('Exact cache lookups of texts with masked placeholders: hit or miss '
+                                         'on the literal text (before) and on literal text or template (after).'),
+    'translation_mask_fallbacks_total': 'Upstream translations whose placeholder tokens did not survive, retranslated unmasked.',
+    'glossary_terms_applied_total': 'Glossary terms protected or substituted in upstream translation requests.',
+    'language_guesses_total': 'Local source-language guesses for requests without one, by result (confident, unsure).',
+    'translation_characters_total': 'Characters translated, by source (upstream: sent to Google, cache: served from the cache).',
+    'translation_quota_rejections_total': 'Upstream calls refused by a daily user quota, by quota (characters, requests).',
+}
+
+# Gauges hold the last value set; across workers the most recently set value is reported
+GAUGES = {
+    'db_replica_lag_seconds': 'Replication lag of each read replica, as last measured.',
+}
+
+_current_timer = contextvars.ContextVar('request_timer', default=None)
+
+
+class RequestTimer:
+    """Spans and database activity recorded during one request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = {}
+        self.queries = 0
+        self.db_seconds = 0.0
+
+    def add(self, name, seconds):
+        self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+    def __call__(self, execute, sql, params, many, context):
+        # Installed with connection.execute_wrapper()
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_seconds += time.perf_counter() - started
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self, total):
+        entries = [f'{name};dur={seconds * 1000:.1f}' for name, seconds in self.spans.items()]
+        entries.append(f'db;dur={self.db_seconds * 1000:.1f};desc="{self.queries} queries"')
+        entries.append(f'total;dur={total * 1000:.1f}')
+        return ', '.join(entries)
+
+
+def start_request():
+    """Begin timing a request; returns ``(timer, token)`` for ``finish_request``."""
+    timer = RequestTimer()
+    return timer, _current_timer.set(timer)
+
+
+def finish_request(token):
+    _current_timer.reset(token)
+
+
+def current_timer():
+    return _current_timer.get()
+
+
+@contextmanager
+def span(name):
+    """Add the time spent in the block to the current request's ``name`` span."""
+    timer = _current_timer.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timer is not None:
+            timer.add(name, time.perf_counter() - started)
+
+
+class MetricsRegistry:
+    """
+    Cumulative histograms, counters and gauges keyed by name and label
+    values. A histogram series is stored as ``[per-bucket counts..., +Inf
+    count, sum]`` (``+Inf`` is the total count); a counter as ``[value]``; a
+    gauge as ``[value, set_at]``.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = _empty()
+        self._flushed_at = 0.0
+        self._dirty = False
+
+    def observe(self, name, value, **labels):
+        buckets = HISTOGRAMS[name][1]
+        key = json.dumps(sorted(labels.items()))
+        with self._lock:
+            series = self._series[name].get(key)
+            if series is None:
+                series = self._series[name][key] = [0] * (len(buckets) + 1) + [0.0]
+            for index, bound in enumerate(buckets):
+                if value <= bound:
+                    series[index] += 1
+            series[-2] += 1
+            series[-1] += value
+            self._dirty = True
+
+    def inc(self, name, amount=1, **labels):
+        key = json.dumps(sorted(labels.items()))
+        with self._lock:
+            series = self._series[name].setdefault(key, [0])
+            series[0] += amount
+            self._dirty = True
+
+    def set_gauge(self, name, value, **labels):
+        key = json.dumps(sorted(labels.items()))
+        with self._lock:
+            self._series[name][key] = [value, time.time()]
+            self._dirty = True
+
+    def snapshot(self):
+        with self._lock:
+            return {name: {key: list(values) for key, values in series.items()}
+                    for name, series in self._series.items()}
+
+    def flush(self, directory, force=False):
+        """Write this process's snapshot to ``directory`` if it changed and is due."""
+        now = time.monotonic()
+        if not force and (not self._dirty or now - self._flushed_at < settings.METRICS_FLUSH_SECONDS):
+            return
+        self._dirty = False
+        self._flushed_at = now
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.metrics-', suffix='.tmp')
+        with os.fdopen(fd, 'w') as handle:
+            json.dump(self.snapshot(), handle)
+        os.replace(tmp_path, os.path.join(directory, f'metrics-{os.getpid()}.json'))
+
+    def reset(self):
+        with self._lock:
+            self._series = _empty()
+            self._dirty = False
+
+
+def _empty():
+    return {name: {} for name in (*HISTOGRAMS, *COUNTERS, *GAUGES)}
+
+
+registry = MetricsRegistry()
+
+
+def record_request(route, method, status, timer, duration):
+    labels = {'route': route, 'method': method, 'status': str(status)}
+    registry.observe('http_request_duration_seconds', duration, **labels)
+    registry.observe('http_request_db_queries', timer.queries, route=route, method=method)
+    for name, seconds in timer.spans.items():
+        registry.observe('http_request_span_seconds', seconds, route=route, span=name)
+    registry.observe('http_request_span_seconds', timer.db_seconds, route=route, span='db')
+    if settings.METRICS_DIR:
+        registry.flush(settings.METRICS_DIR)
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _merge(total, snapshot, live=True):
+    for name, series in snapshot.items():
+        if name not in total or (name in GAUGES and not live):
+            continue
+        for key, values in series.items():
+            existing = total[name].get(key)
+            if existing is None or len(existing) != len(values):
+                total[name][key] = list(values)
+            elif name in GAUGES:
+                total[name][key] = list(max(existing, values, key=lambda value: value[1]))
+            else:
+                total[name][key] = [a + b for a, b in zip(existing, values)]
+
+
+def collect():
+    """Merged snapshot for every worker sharing ``METRICS_DIR`` (or just this one)."""
+    if not settings.METRICS_DIR:
+        return registry.snapshot()
+    registry.flush(settings.METRICS_DIR, force=True)
+    total = _empty()
+    for path in glob.glob(os.path.join(settings.METRICS_DIR, 'metrics-*.json')):
+        pid = re.fullmatch(r'metrics-(\d+)\.json', os.path.basename(path))
+        try:
+            with open(path) as handle:
+                _merge(total, json.load(handle), live=bool(pid) and _alive(int(pid.group(1))))
+        except (OSError, ValueError):
+            # A worker may be replacing its file; it will be complete next scrape
+            continue
+    return total
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(pairs):
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def render_metrics(snapshot=None):
+    """Prometheus text exposition format (version 0.0.4)."""
+    snapshot = collect() if snapshot is None else snapshot
+    lines = []
+    for name, (help_text, buckets) in HISTOGRAMS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} histogram')
+        for key in sorted(snapshot.get(name, {})):
+            values = snapshot[name][key]
+            labels = [tuple(pair) for pair in json.loads(key)]
+            for bound, count in zip(buckets, values):
+                lines.append(f'{name}_bucket{_format_labels(labels + [("le", bound)])} {count}')
+            lines.append(f'{name}_bucket{_format_labels(labels + [("le", "+Inf")])} {values[-2]}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {values[-1]}')
+            lines.append(f'{name}_count{_format_labels(labels)} {values[-2]}')
+    for name, help_text in COUNTERS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} counter')
+        for key in sorted(snapshot.get(name, {})):
+            labels = [tuple(pair) for pair in json.loads(key)]
+            lines.append(f'{name}{_format_labels(labels)} {snapshot[name][key][0]}')
+    for name, help_text in GAUGES.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} gauge')
+        for key in sorted(snapshot.get(name, {})):
+            labels = [tuple(pair) for pair in json.loads(key)]
+            lines.append(f'{name}{_format_labels(labels)} {snapshot[name][key][0]}')
+    return '\n'.join(lines) + '\n'
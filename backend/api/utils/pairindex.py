@@ -0,0 +1,284 @@
+"""
+Per-worker in-memory indexes over the Translation cache, one per language
+pair, kept current from the change feed.
+
+``PairIndex`` holds the rows of one pair grouped by a normalized key and
+tracks the best row per key (highest ``usage_count``, the translation
+``translate_text`` would return); subclasses add their lookup structure
+through ``_key_added``/``_key_removed``/``_finish_keys``/``reindex``.
+
+``PairIndexSet`` builds the pair indexes in a background thread the first
+time it is needed and answers nothing until they are ready. Inserts, edits
+and deletes are applied from the change feed (``api.utils.changes``) at most
+every ``<PREFIX>_REFRESH_SECONDS``, also in a background thread, so a
+lookup never waits for a catch-up after a bulk import (without background
+tasks, the lookup applies one batch itself). ``usage_count`` bumps are not in the
+feed, so the whole set is rebuilt (in the background, swapped in when done)
+every ``<PREFIX>_REBUILD_SECONDS`` to refresh the ranking. Above
+``<PREFIX>_MAX_ENTRIES`` rows the set disables itself.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+
+from ..models import Translation
+from .changes import FeedExpired, changes_since, settled_version
+
+logger = logging.getLogger(__name__)
+
+BUILD_CHUNK_SIZE = 5000
+REFRESH_BATCH_SIZE = 5000
+
+
+class PairIndex:
+    """Rows of one language pair grouped by ``key(source_text)``."""
+
+    def __init__(self, source_language, target_language):
+        self.source_language = source_language
+        self.target_language = target_language
+        self._rows = {}  # translation id -> (key, source_text, translated_text, usage_count)
+        self._members = {}  # key -> ids of the rows sharing it
+        self._best = {}  # key -> (usage_count, source_text, translated_text)
+
+    def __len__(self):
+        return len(self._rows)
+
+    @staticmethod
+    def key(text):
+        raise NotImplementedError
+
+    def _key_added(self, key):
+        """``key`` got its first row (not called while bulk-loading)."""
+
+    def _key_removed(self, key):
+        """``key`` lost its last row."""
+
+    def _finish_keys(self):
+        """Build the lookup structure over ``self._members`` after a bulk load."""
+
+    def reindex(self, keys):
+        """Refresh derived data for ``keys`` after a batch of adds and removes."""
+
+    def _update_best(self, key):
+        members = self._members.get(key)
+        if not members:
+            self._members.pop(key, None)
+            self._best.pop(key, None)
+            return
+        _key, source_text, translated_text, usage_count = min(
+            (self._rows[pk] for pk in members), key=lambda row: (-row[3], row[2])
+        )
+        self._best[key] = (usage_count, source_text, translated_text)
+
+    def load(self, pk, source_text, translated_text, usage_count):
+        """Bulk-load a row; call ``finish_load`` once every row is loaded."""
+        key = self.key(source_text)
+        self._rows[pk] = (key, source_text, translated_text, usage_count)
+        self._members.setdefault(key, set()).add(pk)
+
+    def finish_load(self):
+        for key in self._members:
+            self._update_best(key)
+        self._finish_keys()
+
+    def remove(self, pk):
+        row = self._rows.pop(pk, None)
+        if row is None:
+            return None
+        key = row[0]
+        self._members[key].discard(pk)
+        if not self._members[key]:
+            self._key_removed(key)
+        self._update_best(key)
+        return key
+
+    def add(self, pk, source_text, translated_text, usage_count=0):
+        key = self.key(source_text)
+        if not self._members.get(key):
+            self._key_added(key)
+        self._rows[pk] = (key, source_text, translated_text, usage_count)
+        self._members.setdefault(key, set()).add(pk)
+        self._update_best(key)
+        return key
+
+    def usage_count(self, pk):
+        row = self._rows.get(pk)
+        return row[3] if row else 0
+
+    def best(self, key):
+        """``(usage_count, source_text, translated_text)`` of the best row for ``key``, or None."""
+        return self._best.get(key)
+
+
+class PairIndexSet:
+    """Per-worker set of ``PairIndex`` objects, kept current from the change feed."""
+
+    # Settings are read as <settings_prefix>_MAX_ENTRIES, _REFRESH_SECONDS and _REBUILD_SECONDS
+    settings_prefix = None
+    name = 'pair index'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._pairs = None
+        self._version = 0
+        self._built_at = 0.0
+        self._refreshed_at = 0.0
+        self._building = False
+        self._too_large = False
+
+    def _setting(self, name):
+        return getattr(settings, f'{self.settings_prefix}_{name}')
+
+    def enabled(self):
+        return True
+
+    def new_pair(self, source_language, target_language):
+        raise NotImplementedError
+
+    def ready(self):
+        """True when the in-memory index can answer; starts a (re)build when one is due."""
+        if not self.enabled() or self._too_large:
+            return False
+        now = time.monotonic()
+        if self._pairs is None or now - self._built_at >= self._setting('REBUILD_SECONDS'):
+            self._start_build()
+        return self._pairs is not None
+
+    def _start_build(self):
+        if not settings.BACKGROUND_TASKS_ENABLED:
+            return
+        with self._lock:
+            if self._building:
+                return
+            self._building = True
+        threading.Thread(
+            target=self._build_in_background, name=self.name.replace(' ', '-') + '-build', daemon=True
+        ).start()
+
+    def _build_in_background(self):
+        try:
+            self.build()
+        except Exception:
+            logger.exception("%s build failed", self.name.capitalize())
+        finally:
+            self._building = False
+            # The thread's connections are not closed by any request cycle
+            connections.close_all()
+
+    def build(self):
+        """Load every Translation into new pair indexes and swap them in."""
+        started = time.monotonic()
+        version = settled_version()
+        max_entries = self._setting('MAX_ENTRIES')
+        pairs = {}
+        loaded = 0
+        last_pk = 0
+        while True:
+            chunk = list(
+                Translation.objects.filter(pk__gt=last_pk).order_by('pk').values_list(
+                    'pk', 'source_language', 'target_language', 'source_text', 'translated_text', 'usage_count'
+                )[:BUILD_CHUNK_SIZE]
+            )
+            if not chunk:
+                break
+            last_pk = chunk[-1][0]
+            loaded += len(chunk)
+            if loaded > max_entries:
+                logger.warning("%s disabled: more than %s translations", self.name.capitalize(), max_entries)
+                self._too_large = True
+                return
+            for pk, source, target, source_text, translated_text, usage_count in chunk:
+                index = pairs.get((source, target))
+                if index is None:
+                    index = pairs[(source, target)] = self.new_pair(source, target)
+                index.load(pk, source_text, translated_text, usage_count)
+        for index in pairs.values():
+            index.finish_load()
+
+        with self._lock:
+            self._pairs = pairs
+            self._version = version
+            self._built_at = self._refreshed_at = time.monotonic()
+        logger.info("Built %s: %s rows in %s pairs (%.2fs)", self.name, loaded, len(pairs),
+                    time.monotonic() - started)
+
+    def refresh(self):
+        """Start applying changes from the feed if a refresh is due and no other thread is doing it."""
+        if self._pairs is None or time.monotonic() - self._refreshed_at < self._setting('REFRESH_SECONDS'):
+            return
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+        if not settings.BACKGROUND_TASKS_ENABLED:
+            try:
+                self._catch_up(max_batches=1)
+            finally:
+                self._refresh_lock.release()
+            return
+        # The thread releases the lock when it is done
+        threading.Thread(
+            target=self._refresh_in_background, name=self.name.replace(' ', '-') + '-refresh', daemon=True
+        ).start()
+
+    def _refresh_in_background(self):
+        try:
+            self._catch_up()
+        except Exception:
+            logger.exception("%s refresh failed", self.name.capitalize())
+        finally:
+            self._refresh_lock.release()
+            connections.close_all()
+
+    def _catch_up(self, max_batches=None):
+        """Apply feed changes in batches until caught up (or after ``max_batches``); call with the refresh lock held."""
+        pairs = self._pairs
+        self._refreshed_at = time.monotonic()
+        version = self._version
+        batches = 0
+        while True:
+            # Read outside the lock so lookups are not held up by the query
+            try:
+                changes, version, has_more = changes_since(version, REFRESH_BATCH_SIZE)
+            except FeedExpired:
+                # Fell behind the retained log: rebuild from the table
+                self._built_at = 0.0
+                return
+            with self._lock:
+                if self._pairs is not pairs:
+                    # A rebuild was swapped in meanwhile and has its own version
+                    return
+                self._apply(changes)
+                self._version = version
+            batches += 1
+            if not has_more or not changes or batches == max_batches:
+                break
+
+    def _apply(self, changes):
+        touched = {}
+        for change in changes:
+            pk = change['translation_id']
+            pair = (change['source_language'], change['target_language'])
+            if change['operation'] == 'insert' and pair not in self._pairs:
+                self._pairs[pair] = self.new_pair(*pair)
+            index = self._pairs.get(pair)
+            if index is None:
+                continue
+            usage_count = index.usage_count(pk)
+            key = index.remove(pk)
+            if key is not None:
+                touched.setdefault(pair, set()).add(key)
+            if change['operation'] != 'delete':
+                key = index.add(pk, change['source_text'], change['translated_text'], usage_count)
+                touched.setdefault(pair, set()).add(key)
+        for pair, keys in touched.items():
+            self._pairs[pair].reindex(keys)
+
+    def _indexes(self, target_language, source_language=None):
+        """Pair indexes into ``target_language``; call with ``self._lock`` held."""
+        return [
+            index for (source, target), index in self._pairs.items()
+            if target == target_language and source_language in (None, source)
+        ]
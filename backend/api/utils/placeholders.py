@@ -0,0 +1,81 @@
+"""
+Placeholder masking for template-aware caching.
+
+Transactional text differs only in its values ("Order 1234 shipped",
+"Order 5678 shipped"), so ``mask`` replaces URLs, email addresses, numbers
+and the regular expressions in ``TRANSLATION_MASK_PATTERNS`` with numbered
+tokens (``Order {0} shipped``). The template is what gets cached and sent
+upstream; ``MaskedText.unmask`` puts the values back into its translation,
+wherever the translation moved the tokens.
+
+Text that already contains ``{`` is not masked (its own braces could be
+taken for tokens), nor is text that would be left with no letters to
+translate.
+"""
+from functools import lru_cache
+import re
+
+from django.conf import settings
+
+URL_PATTERN = r'(?:https?://|www\.)[^\s<>"]*[^\s<>".,;:!?)\]]'
+EMAIL_PATTERN = r'[\w.+-]+@[\w-]+(?:\.[\w-]+)+'
+NUMBER_PATTERN = r'(?<!\w)[-+]?\d+(?:[.,:/]\d+)*%?(?!\w)'
+
+_TOKEN = re.compile(r'\{(\d+)\}')
+
+
+@lru_cache(maxsize=8)
+def _compile(entity_patterns):
+    # Earlier alternatives win, so a URL's digits are not masked as a number
+    return re.compile('|'.join(f'(?:{pattern})' for pattern in (URL_PATTERN, EMAIL_PATTERN, *entity_patterns, NUMBER_PATTERN)))
+
+
+class MaskedText:
+    """``template`` of ``original`` with ``values[i]`` replaced by ``{i}``."""
+
+    def __init__(self, original, template=None, values=()):
+        self.original = original
+        self.template = original if template is None else template
+        self.values = list(values)
+
+    def __bool__(self):
+        return bool(self.values)
+
+    @property
+    def lookup_texts(self):
+        """Source texts to look up: the original first, then the template."""
+        return [self.original, self.template] if self else [self.original]
+
+    def unmask(self, translated):
+        """
+        ``translated`` (a translation of the template) with the values put
+        back, or None when it does not contain every token exactly once.
+        Text that was not masked is returned as is.
+        """
+        if not self or translated is None:
+            return translated
+        tokens = [int(match) for match in _TOKEN.findall(translated)]
+        if sorted(tokens) != list(range(len(self.values))):
+            return None
+        return _TOKEN.sub(lambda match: self.values[int(match[1])], translated)
+
+    def unmask_all(self, translations):
+        """``unmask`` each of ``translations``, dropping those that do not fit."""
+        unmasked = (self.unmask(translated) for translated in translations)
+        return [translated for translated in unmasked if translated is not None]
+
+
+def mask(text):
+    """``MaskedText`` for ``text``; unmasked when disabled or nothing qualifies."""
+    if not settings.TRANSLATION_MASKING_ENABLED or '{' in text:
+        return MaskedText(text)
+    values = []
+
+    def replace(match):
+        values.append(match[0])
+        return f'{{{len(values) - 1}}}'
+
+    template = _compile(tuple(settings.TRANSLATION_MASK_PATTERNS)).sub(replace, text)
+    if not values or not any(char.isalpha() for char in _TOKEN.sub('', template)):
+        return MaskedText(text)
+    return MaskedText(text, template, values)
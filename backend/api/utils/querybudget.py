@@ -0,0 +1,122 @@
+"""
+Query budgets and N+1 detection.
+
+Views declare how many queries a request may run::
+
+    @query_budget(6)
+    @api_view(['POST'])
+    def translate_text(request): ...
+
+(class-based views set a ``query_budget`` attribute instead).
+``QueryBudgetMiddleware`` counts every statement a request executes and, when
+a view goes over its budget (or ``QUERY_BUDGET_DEFAULT`` for views without
+one), logs a warning listing the statements that repeated
+``QUERY_BUDGET_REPEAT_THRESHOLD`` or more times, which is what an N+1 loop
+looks like. With ``QUERY_BUDGET_MODE=raise`` it raises ``QueryBudgetExceeded``
+instead, which is useful in development.
+
+Tests use the same counter through ``assert_max_queries`` (a context manager)
+or ``max_queries`` (a test method decorator).
+"""
+from collections import Counter
+from contextlib import ContextDecorator, ExitStack
+import functools
+import re
+
+from django.db import connections
+
+_IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+_VALUES_LIST = re.compile(r'VALUES (?:\([^()]*\), )*\([^()]*\)')
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def normalize_sql(sql):
+    """Collapse IN (...) and multi-row VALUES lists so N+1 repeats compare equal."""
+    return _VALUES_LIST.sub('VALUES (...)', _IN_LIST.sub('IN (...)', sql))
+
+
+class QueryCounter:
+    """``connection.execute_wrapper`` that counts statements by normalized SQL."""
+
+    def __init__(self):
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        self.statements[normalize_sql(sql)] += 1
+        return execute(sql, params, many, context)
+
+    @property
+    def count(self):
+        return sum(self.statements.values())
+
+    def repeated(self, threshold):
+        return [(sql, count) for sql, count in self.statements.most_common() if count >= threshold]
+
+    def report(self, threshold=2, limit=5):
+        lines = [f'{self.count} queries']
+        for sql, count in self.repeated(threshold)[:limit]:
+            lines.append(f'  {count}x {sql[:200]}')
+        return '\n'.join(lines)
+
+
+class count_queries(ContextDecorator):
+    """Count queries on ``using`` (a database alias or ``None`` for all) while active."""
+
+    def __init__(self, using=None):
+        self.using = using
+        self.counter = QueryCounter()
+
+    def __enter__(self):
+        self.counter = QueryCounter()
+        self._stack = ExitStack()
+        aliases = [self.using] if self.using else list(connections)
+        for alias in aliases:
+            self._stack.enter_context(connections[alias].execute_wrapper(self.counter))
+        return self.counter
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+        return False
+
+
+class assert_max_queries(count_queries):
+    """Fail with the repeated statements when the block runs more than ``limit`` queries."""
+
+    def __init__(self, limit, using=None):
+        super().__init__(using)
+        self.limit = limit
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        super().__exit__(exc_type, exc_value, traceback)
+        if exc_type is None and self.counter.count > self.limit:
+            raise AssertionError(f'Expected at most {self.limit} queries, ran {self.counter.report()}')
+        return False
+
+
+def max_queries(limit, using=None):
+    """Test method decorator form of ``assert_max_queries``."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with assert_max_queries(limit, using):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def query_budget(limit):
+    """Declare the maximum number of queries a view may run per request."""
+    def decorator(view_func):
+        view_func.query_budget = limit
+        return view_func
+    return decorator
+
+
+def budget_for(view_func, default=None):
+    budget = getattr(view_func, 'query_budget', None)
+    if budget is None:
+        budget = getattr(getattr(view_func, 'view_class', None), 'query_budget', None)
+    return default if budget is None else budget
@@ -0,0 +1,207 @@
+"""
+Retention policy engine for the Translation cache.
+
+Policies (configured through ``settings.TRANSLATION_RETENTION``; a value of 0
+disables a policy):
+
+- ``ttl``: rows whose ``last_accessed`` is older than ``TTL_DAYS``.
+- ``min_usage``: rows older than ``MIN_USAGE_GRACE_DAYS`` that were used fewer
+  than ``MIN_USAGE_COUNT`` times.
+- ``score``: rows whose LFU/LRU hybrid score falls below ``MIN_SCORE``.
+- ``max_rows``: per (source_language, target_language) pair, the lowest-scored
+  rows beyond ``MAX_ROWS_PER_LANGUAGE_PAIR``.
+
+The hybrid score is ``(usage_count + 1) * 0.5 ** (idle_days / SCORE_HALF_LIFE_DAYS)``:
+frequently used rows survive, but their weight halves for every half-life
+they go unused.
+
+Deletes run in batches of ``BATCH_SIZE`` primary keys with a pause between
+batches so locks stay short and replicas can keep up.
+"""
+from datetime import timedelta
+import logging
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, FloatField, Func, Q, Sum, Value
+from django.db.models.functions import Coalesce, Power
+from django.utils import timezone
+
+from ..models import Translation
+
+logger = logging.getLogger(__name__)
+
+POLICIES = ('ttl', 'min_usage', 'score', 'max_rows')
+
+
+class IdleDays(Func):
+    """Fractional days between ``now`` and a datetime column."""
+    output_field = FloatField()
+
+    def __init__(self, expression, now, **extra):
+        super().__init__(expression, Value(now), **extra)
+
+    def _compile(self, compiler):
+        column, now = self.source_expressions
+        column_sql, column_params = compiler.compile(column)
+        now_sql, now_params = compiler.compile(now)
+        return column_sql, column_params, now_sql, now_params
+
+    def as_sql(self, compiler, connection, **extra_context):
+        column_sql, column_params, now_sql, now_params = self._compile(compiler)
+        return f'(julianday({now_sql}) - julianday({column_sql}))', (*now_params, *column_params)
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        column_sql, column_params, now_sql, now_params = self._compile(compiler)
+        return (
+            f'(EXTRACT(EPOCH FROM ({now_sql} - {column_sql})) / 86400.0)',
+            (*now_params, *column_params),
+        )
+
+
+class StoredBytes(Func):
+    """Bytes a text column occupies: pg_column_size on PostgreSQL, LENGTH elsewhere."""
+    function = 'LENGTH'
+    output_field = FloatField()
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return super().as_sql(compiler, connection, function='pg_column_size', **extra_context)
+
+
+def get_config(overrides=None):
+    config = dict(settings.TRANSLATION_RETENTION)
+    config.update(overrides or {})
+    return config
+
+
+def hybrid_score(config, now=None):
+    """ORM expression for the LFU/LRU hybrid score described in the module docstring."""
+    now = now or timezone.now()
+    half_life = float(config['SCORE_HALF_LIFE_DAYS'])
+    return (F('usage_count') + 1.0) * Power(Value(0.5), IdleDays('last_accessed', now) / half_life)
+
+
+def candidates(policy, config, now=None):
+    """Queryset of eviction candidates for a filter-style policy."""
+    now = now or timezone.now()
+    queryset = Translation.objects.order_by()
+    if policy == 'ttl':
+        return queryset.filter(last_accessed__lt=now - timedelta(days=config['TTL_DAYS']))
+    if policy == 'min_usage':
+        return queryset.filter(
+            usage_count__lt=config['MIN_USAGE_COUNT'],
+            created_at__lt=now - timedelta(days=config['MIN_USAGE_GRACE_DAYS']),
+        )
+    if policy == 'score':
+        return queryset.alias(score=hybrid_score(config, now)).filter(score__lt=config['MIN_SCORE'])
+    raise ValueError(f"Unknown filter policy: {policy}")
+
+
+def policy_enabled(policy, config):
+    setting = {
+        'ttl': 'TTL_DAYS',
+        'min_usage': 'MIN_USAGE_COUNT',
+        'score': 'MIN_SCORE',
+        'max_rows': 'MAX_ROWS_PER_LANGUAGE_PAIR',
+    }[policy]
+    return bool(config.get(setting))
+
+
+def evict_batches(queryset, config, dry_run=False):
+    """
+    Delete the rows of ``queryset`` in batches of ``BATCH_SIZE`` primary
+    keys. Batches are taken by keyset on the primary key, so the candidates
+    are read in one pass over the table rather than re-sorted per batch.
+    Returns ``{'rows': n, 'bytes': b}``; in dry-run mode nothing is deleted
+    and the figures are what would have been evicted.
+    """
+    batch_size = config['BATCH_SIZE']
+    pause = config['BATCH_PAUSE_SECONDS']
+    size = Coalesce(Sum(StoredBytes('source_text') + StoredBytes('translated_text')), 0.0)
+
+    if dry_run:
+        totals = queryset.order_by().aggregate(rows=Count('pk'), bytes=size)
+        return {'rows': totals['rows'], 'bytes': int(totals['bytes'])}
+
+    queryset = queryset.order_by('pk')
+    rows = 0
+    reclaimed = 0
+    last_pk = None
+    while True:
+        page = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        pks = list(page.values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            break
+        last_pk = pks[-1]
+        with transaction.atomic():
+            batch = Translation.objects.filter(pk__in=pks)
+            reclaimed += int(batch.aggregate(bytes=size)['bytes'])
+            deleted, _ = batch.delete()
+        rows += deleted
+        if pause:
+            time.sleep(pause)
+    return {'rows': rows, 'bytes': reclaimed}
+
+
+def lowest_scored(queryset, count, config, now):
+    """
+    The ``count`` rows of ``queryset`` with the lowest ``(score, pk)``, as a
+    filter on the score of the last of them: the partition is sorted once
+    to find that row instead of once per batch.
+    """
+    scored = queryset.annotate(score=hybrid_score(config, now))
+    cutoff = scored.order_by('score', 'pk').values_list('score', 'pk')[count - 1:count].first()
+    if cutoff is None:
+        return scored
+    score, pk = cutoff
+    return scored.filter(Q(score__lt=score) | Q(score=score, pk__lte=pk))
+
+
+def apply_max_rows(config, now=None, dry_run=False):
+    """Trim every language pair down to ``MAX_ROWS_PER_LANGUAGE_PAIR``, lowest score first."""
+    now = now or timezone.now()
+    max_rows = config['MAX_ROWS_PER_LANGUAGE_PAIR']
+    pairs = (
+        Translation.objects.order_by()
+        .values('source_language', 'target_language')
+        .annotate(rows=Count('pk'))
+        .filter(rows__gt=max_rows)
+    )
+    result = {'rows': 0, 'bytes': 0}
+    for pair in pairs:
+        pair_rows = Translation.objects.filter(
+            source_language=pair['source_language'], target_language=pair['target_language']
+        )
+        victims = lowest_scored(pair_rows, pair['rows'] - max_rows, config, now)
+        evicted = evict_batches(victims, config, dry_run=dry_run)
+        result['rows'] += evicted['rows']
+        result['bytes'] += evicted['bytes']
+    return result
+
+
+def run_retention(config=None, policies=POLICIES, dry_run=False):
+    """
+    Apply each enabled policy in order and return per-policy metrics:
+    ``{policy: {'rows': evicted, 'bytes': reclaimed}}``. Policies run
+    sequentially, so in dry-run mode a row matching several policies is
+    counted under each of them.
+    """
+    config = get_config(config)
+    now = timezone.now()
+    metrics = {}
+    for policy in policies:
+        if not policy_enabled(policy, config):
+            continue
+        started = time.monotonic()
+        if policy == 'max_rows':
+            result = apply_max_rows(config, now, dry_run)
+        else:
+            result = evict_batches(candidates(policy, config, now), config, dry_run=dry_run)
+        result['seconds'] = round(time.monotonic() - started, 3)
+        metrics[policy] = result
+        logger.info(
+            "Retention policy %s%s: %d rows, %d bytes in %.3fs",
+            policy, ' (dry run)' if dry_run else '', result['rows'], result['bytes'], result['seconds']
+        )
+    return metrics
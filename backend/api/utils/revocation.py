@@ -0,0 +1,181 @@
+"""
+Per-worker revocation filter for refresh tokens.
+
+simplejwt checks every refresh token against ``BlacklistedToken`` with a join
+on ``OutstandingToken.jti``. Almost every token presented is *not* revoked, so
+this module keeps a Bloom filter of revoked JTIs per worker: a negative answer
+is trusted without touching the database, and only positives (real
+revocations plus a small false-positive rate) fall through to the exact
+blacklist query.
+
+The filter is synced incrementally by primary key (``id > last seen``) at most
+every ``TOKEN_REVOCATION_SYNC_SECONDS`` by one request at a time (the others
+keep using the filter as it is), so a token revoked in another worker can be
+accepted for at most that long. It is built in a background thread from
+unexpired blacklist entries the first time it is needed, then rebuilt every
+``TOKEN_REVOCATION_REBUILD_SECONDS``, which drops expired JTIs; until the
+first build every token goes to the blacklist query. A rebuild sizes the
+filter for ``TOKEN_REVOCATION_CAPACITY`` JTIs, or twice the unexpired
+entries when there are more.
+"""
+import hashlib
+import logging
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+SYNC_ID_OVERLAP = 100
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings using double hashing."""
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+
+    def add(self, value):
+        """Add ``value``; ``count`` only grows if it set a new bit, so re-adding a value is not counted."""
+        added = False
+        for position in self._positions(value):
+            mask = 1 << (position & 7)
+            if not self.bits[position >> 3] & mask:
+                self.bits[position >> 3] |= mask
+                added = True
+        if added:
+            self.count += 1
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+class RevokedTokenFilter:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._bloom = None
+        self._last_id = 0
+        self._synced_at = 0.0
+        self._built_at = 0.0
+        self._rebuilding = False
+        self._revoked_during_rebuild = []
+
+    def might_be_revoked(self, jti):
+        """False means the JTI was not blacklisted as of the last sync; always True before the first build."""
+        self.sync()
+        bloom = self._bloom
+        return bloom is None or jti in bloom
+
+    def add(self, jti):
+        """Record a revocation made in this worker immediately."""
+        with self._lock:
+            if self._bloom is not None:
+                self._bloom.add(jti)
+            if self._rebuilding:
+                self._revoked_during_rebuild.append(jti)
+
+    def _sync_due(self):
+        return self._bloom is not None and time.monotonic() - self._synced_at >= settings.TOKEN_REVOCATION_SYNC_SECONDS
+
+    def sync(self):
+        """Apply new blacklist rows if a sync is due and no other thread is doing it; start a rebuild if one is due."""
+        if self._bloom is None or time.monotonic() - self._built_at >= settings.TOKEN_REVOCATION_REBUILD_SECONDS:
+            self._start_rebuild()
+        if not self._sync_due() or not self._sync_lock.acquire(blocking=False):
+            return
+        try:
+            # Another thread may have synced between the check and the lock
+            if self._sync_due():
+                bloom = self._bloom
+                # Re-read a few ids back: transactions can commit out of id order
+                last_id = self._load(bloom, id__gt=self._last_id - SYNC_ID_OVERLAP)
+                with self._lock:
+                    if self._bloom is bloom:
+                        self._last_id = max(self._last_id, last_id)
+                        self._synced_at = time.monotonic()
+        finally:
+            self._sync_lock.release()
+
+    def _start_rebuild(self):
+        if self._rebuilding or not settings.BACKGROUND_TASKS_ENABLED:
+            return
+        with self._lock:
+            if self._rebuilding:
+                return
+            self._rebuilding = True
+            self._revoked_during_rebuild = []
+        threading.Thread(target=self._rebuild_in_background, name='revocation-rebuild', daemon=True).start()
+
+    def _rebuild_in_background(self):
+        try:
+            self.rebuild()
+        except Exception:
+            logger.exception("Token revocation filter rebuild failed")
+        finally:
+            with self._lock:
+                self._rebuilding = False
+            # The thread's connections are not closed by any request cycle
+            connections.close_all()
+
+    def rebuild(self):
+        """Load the unexpired blacklist entries into a new filter and swap it in."""
+        unexpired = {'token__expires_at__gt': timezone.now()}
+        entries = self._blacklist(**unexpired).count()
+        capacity = settings.TOKEN_REVOCATION_CAPACITY
+        if entries * 2 > capacity:
+            logger.warning("%d unexpired revoked tokens; sizing the filter above TOKEN_REVOCATION_CAPACITY", entries)
+            capacity = entries * 2
+        bloom = BloomFilter(capacity, settings.TOKEN_REVOCATION_ERROR_RATE)
+        last_id = self._load(bloom, **unexpired)
+        with self._lock:
+            for jti in self._revoked_during_rebuild:
+                bloom.add(jti)
+            self._revoked_during_rebuild = []
+            self._bloom = bloom
+            self._last_id = last_id
+            self._built_at = self._synced_at = time.monotonic()
+        logger.debug("Rebuilt token revocation filter with %d entries", bloom.count)
+
+    @staticmethod
+    def _blacklist(**filters):
+        from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+        return BlacklistedToken.objects.filter(**filters)
+
+    @classmethod
+    def _load(cls, bloom, **filters):
+        """Add the matching blacklist JTIs to ``bloom``; returns the highest id read (0 if none)."""
+        rows = (
+            cls._blacklist(**filters)
+            .order_by('id')
+            .values_list('id', 'token__jti')
+            .iterator(chunk_size=10000)
+        )
+        last_id = 0
+        for row_id, jti in rows:
+            bloom.add(jti)
+            last_id = row_id
+        return last_id
+
+
+revoked_tokens = RevokedTokenFilter()
+
+
+def on_token_blacklisted(sender, instance, created, **kwargs):
+    if created:
+        revoked_tokens.add(instance.token.jti)
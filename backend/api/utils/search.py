@@ -0,0 +1,85 @@
+"""
+Index-friendly search helpers for the admin changelists.
+
+Django's stock ``icontains`` / ``iexact`` lookups compile to
+``UPPER(col) LIKE UPPER(%s)`` on PostgreSQL, which cannot use any index on
+the column itself. The lookups below are written so that PostgreSQL can use
+the ``pg_trgm`` GIN indexes and the ``lower()`` expression indexes created in
+migration ``0007_search_indexes``. On other backends (SQLite in development)
+they fall back to Django's default SQL, so behaviour is unchanged there.
+"""
+from functools import reduce
+import operator
+
+from django.db import models
+from django.db.models import Q, Value
+from django.db.models.functions import Lower
+from django.db.models.lookups import IContains
+
+
+class TrigramIContains(IContains):
+    """
+    Case-insensitive substring match that emits ``col ILIKE '%term%'`` on
+    PostgreSQL so the ``gin_trgm_ops`` index on the column is used.
+    """
+    lookup_name = 'trgm_icontains'
+
+    def as_sql(self, compiler, connection):
+        # Non-PostgreSQL backends: plain icontains
+        return IContains(self.lhs, self.rhs).as_sql(compiler, connection)
+
+    def as_postgresql(self, compiler, connection):
+        lhs_sql, lhs_params = self.process_lhs(compiler, connection)
+        rhs_sql, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs_sql} ILIKE {rhs_sql}', (*lhs_params, *rhs_params)
+
+
+def register_lookups():
+    """Register the search lookups on text fields (called from ApiConfig.ready)."""
+    models.TextField.register_lookup(TrigramIContains)
+    models.CharField.register_lookup(TrigramIContains)
+
+
+def exact_match_filter(search_term, fields):
+    """
+    Build a Q object matching rows where any of ``fields`` equals
+    ``search_term`` case-insensitively, expressed as ``lower(col) = lower(term)``
+    so the ``lower()`` expression indexes can serve it.
+
+    Returns ``(aliases, q)``; the aliases must be applied with
+    ``queryset.alias(**aliases)`` before filtering on ``q``.
+    """
+    aliases = {f'_exact_{field}': Lower(field) for field in fields}
+    term = Lower(Value(search_term))
+    q = reduce(operator.or_, (Q(**{alias: term}) for alias in aliases))
+    return aliases, q
+
+
+class IndexedSearchMixin:
+    """
+    ModelAdmin mixin providing index-backed search.
+
+    - ``search_fields`` entries without an explicit lookup are searched with
+      ``trgm_icontains`` instead of ``icontains``.
+    - A search term starting with ``=`` switches to exact, case-insensitive
+      matching on ``exact_search_fields``.
+    """
+    exact_search_fields = ()
+
+    def get_search_fields(self, request):
+        search_fields = []
+        for field_name in super().get_search_fields(request):
+            if field_name[0] in '^=@' or '__' in field_name:
+                search_fields.append(field_name)
+            else:
+                search_fields.append(f'{field_name}__trgm_icontains')
+        return search_fields
+
+    def get_search_results(self, request, queryset, search_term):
+        if search_term.startswith('=') and len(search_term) > 1 and self.exact_search_fields:
+            exact_term = search_term[1:].strip()
+            aliases, q = exact_match_filter(exact_term, self.exact_search_fields)
+            # `False` because we didn't alter joins that could cause duplicates
+            return queryset.alias(**aliases).filter(q), False
+
+        return super().get_search_results(request, queryset, search_term)
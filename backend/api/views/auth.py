@@ -4,17 +4,23 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from django.contrib.auth import get_user_model
 from rest_framework_simplejwt.views import TokenObtainPairView
-from rest_framework_simplejwt.tokens import RefreshToken
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from ..tokens import FilteredRefreshToken
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenObtainSerializer
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from django.contrib.auth.models import update_last_login
 from rest_framework_simplejwt.token_blacklist.models import OutstandingToken, BlacklistedToken
 from django.core.exceptions import ObjectDoesNotExist
 from ..serializers import UserRegistrationSerializer
+from ..authentication import TOKEN_VERSION_CLAIM, invalidate_cached_user
+from ..utils.querybudget import query_budget
 import logging
+import secrets
 from rest_framework import serializers
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
 
+@query_budget(5)
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def register(request):
@@ -29,16 +35,29 @@ def register(request):
         }, status=status.HTTP_201_CREATED)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+@query_budget(3)
 @api_view(['POST'])
+@permission_classes([IsAuthenticated])
 def set_api_key(request):
+    """
+    Replace the caller's API key with a newly generated one. Keys are always
+    generated here: a chosen key could be guessed, and only its unsalted
+    digest is stored. The key is returned in this response and never again.
+    """
+    if 'api_key' in request.data:
+        return Response({'error': 'API keys are generated by the server; do not send api_key.'},
+                        status=status.HTTP_400_BAD_REQUEST)
     user = request.user
-    api_key = request.data.get('api_key')
-    if api_key:
-        user.api_key = api_key
-        user.save()
-        return Response({'message': 'API key saved successfully.'}, status=status.HTTP_200_OK)
-    return Response({'error': 'API key is required.'}, status=status.HTTP_400_BAD_REQUEST)
+    api_key = secrets.token_urlsafe(32)
+    user.set_api_key(api_key)
+    user.save(update_fields=['api_key_hash'])
+    invalidate_cached_user(user.pk)
+    return Response({
+        'message': 'API key created. Store it now: it cannot be shown again.',
+        'api_key': api_key,
+    }, status=status.HTTP_201_CREATED)
 
+@query_budget(8)
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def logout(request):
@@ -56,66 +75,54 @@ def logout(request):
 
         # Blacklist the token
         try:
-            token = RefreshToken(refresh_token)
+            token = FilteredRefreshToken(refresh_token)
             token.blacklist()
-            logger.info(f"User {request.user.username} logged out successfully")
+            logger.info("User %s logged out successfully", request.user.username)
             return Response(
                 {'message': 'Successfully logged out'}, 
                 status=status.HTTP_200_OK
             )
         except Exception as e:
-            logger.error(f"Error blacklisting token: {str(e)}")
+            logger.error("Error blacklisting token: %s", e)
             return Response(
                 {'error': 'Invalid refresh token'}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
     except Exception as e:
-        logger.error(f"Logout error: {str(e)}")
+        logger.error("Logout error: %s", e)
         return Response(
             {'error': 'Error during logout'}, 
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        # Lets CachedJWTAuthentication reject tokens issued before a status change
+        token[TOKEN_VERSION_CLAIM] = user.token_version
+        return token
+
     def validate(self, attrs):
-        logger.debug("Validating credentials in serializer")
-        logger.debug(f"Received username: {attrs.get('username')}")
-        try:
-            user = User.objects.get(username=attrs.get('username'))
-            logger.debug(f"Found user: {user.username}, is_active: {user.is_active}, is_approved: {user.is_approved}")
-            
-            if not user.is_approved:
-                raise serializers.ValidationError("Your account is pending approval. Please contact the administrator.")
-                
-            logger.debug(f"Checking password for user: {user.username}")
-            data = super().validate(attrs)
-            logger.debug("Credentials validated successfully")
-            return data
-        except User.DoesNotExist:
-            logger.debug(f"No user found with username: {attrs.get('username')}")
-            raise
-        except Exception as e:
-            logger.debug(f"Validation failed with error: {str(e)}")
-            raise
+        # Authenticate only (TokenObtainSerializer.validate loads the user and
+        # checks the password), so that no refresh token is minted, recorded
+        # as outstanding or counted as a login before the approval check
+        data = TokenObtainSerializer.validate(self, attrs)
+        if not self.user.is_approved:
+            raise serializers.ValidationError("Your account is pending approval. Please contact the administrator.")
+
+        refresh = self.get_token(self.user)
+        data['refresh'] = str(refresh)
+        data['access'] = str(refresh.access_token)
+        if jwt_settings.UPDATE_LAST_LOGIN:
+            update_last_login(None, self.user)
+        return data
 
 class MyTokenObtainPairView(TokenObtainPairView):
     serializer_class = CustomTokenObtainPairSerializer
+    query_budget = 3
 
     def post(self, request, *args, **kwargs):
-        logger.debug("=== Login Attempt ===")
-        logger.debug(f"Request data: {request.data}")
-        logger.debug(f"Request headers: {request.headers}")
-        try:
-            username = request.data.get('username')
-            user = User.objects.get(username=username)
-            logger.debug(f"User found: {user.username}")
-            logger.debug(f"User is_active: {user.is_active}")
-            logger.debug(f"User has_usable_password: {user.has_usable_password()}")
-        except User.DoesNotExist:
-            logger.debug(f"No user found with username: {username}")
-        
         response = super().post(request, *args, **kwargs)
-        logger.debug(f"Login response status: {response.status_code}")
-        logger.debug(f"Login response data: {response.data}")
-        logger.debug("=== End Login Attempt ===")
+        logger.debug("Login attempt for %s: status %s", request.data.get('username'), response.status_code)
         return response 
\ No newline at end of file
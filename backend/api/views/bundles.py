@@ -0,0 +1,123 @@
+from django.http import FileResponse
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from ..db_router import replica_reads
+from ..utils import bundles
+from ..utils.changes import FeedExpired, changes_since
+from ..utils.querybudget import query_budget
+import logging
+
+logger = logging.getLogger(__name__)
+
+MAX_DELTA_LIMIT = 5000
+
+
+@query_budget(2)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def list_bundles(request):
+    """
+    Offline dictionary bundles available for download, newest version of
+    each language pair.
+    """
+    latest = {}
+    for source, target, version, _path in bundles.list_bundles():
+        latest.setdefault((source, target), version)
+    return Response({
+        'bundles': [
+            {'source_language': source, 'target_language': target, 'version': version}
+            for (source, target), version in latest.items()
+        ]
+    })
+
+
+@query_budget(2)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def download_bundle(request, source_language, target_language):
+    """
+    Download the newest offline bundle for a language pair (a gzip-compressed
+    SQLite file, see ``api.utils.bundles``). The bundle version is sent as
+    the ETag and in ``X-Bundle-Version``; clients revalidate with
+    ``If-None-Match`` and catch up with the delta endpoint.
+    """
+    if not (bundles.valid_language(source_language) and bundles.valid_language(target_language)):
+        return Response({'error': 'Invalid language code'}, status=status.HTTP_400_BAD_REQUEST)
+
+    latest = bundles.latest_bundle(source_language, target_language)
+    if latest is None:
+        return Response(
+            {'error': f'No bundle has been built for {source_language}-{target_language}'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+
+    version, path = latest
+    etag = f'"{version}"'
+    if etag in [tag.strip() for tag in request.headers.get('If-None-Match', '').split(',')]:
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = FileResponse(
+            open(path, 'rb'), as_attachment=True, filename=f'{source_language}-{target_language}-{version}.sqlite.gz',
+            content_type='application/gzip'
+        )
+    response['ETag'] = etag
+    response['X-Bundle-Version'] = str(version)
+    return response
+
+
+def _feed_response(request, source_language=None, target_language=None):
+    try:
+        since = int(request.query_params.get('since', 0))
+        limit = int(request.query_params.get('limit', 1000))
+    except ValueError:
+        return Response({'error': 'since and limit must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+    if since < 0 or not 0 < limit <= MAX_DELTA_LIMIT:
+        return Response(
+            {'error': f'since must be non-negative and limit between 1 and {MAX_DELTA_LIMIT}'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    try:
+        changes, version, has_more = changes_since(since, limit, source_language, target_language)
+    except FeedExpired as e:
+        return Response({'error': str(e), 'resync': True}, status=status.HTTP_410_GONE)
+    return Response({
+        'since': since,
+        'version': version,
+        'has_more': has_more,
+        'changes': changes,
+    })
+
+
+@query_budget(6)
+@replica_reads
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def translation_changes(request):
+    """
+    Change feed of the translation cache (inserts, updates, deletes).
+    Query parameters:
+    - since: Last version the client applied (0 for everything)
+    - limit: Changes per page (default 1000, max 5000)
+    - source_language, target_language: Optional language pair filter
+    Response: changes oldest first, the ``version`` to pass as ``since`` next,
+    and ``has_more`` when another page is waiting. 410 when ``since`` is older
+    than the retained log; the client must then resync from a bundle.
+    """
+    return _feed_response(
+        request, request.query_params.get('source_language'), request.query_params.get('target_language')
+    )
+
+
+@query_budget(6)
+@replica_reads
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def bundle_delta(request, source_language, target_language):
+    """
+    Changes to a language pair since a bundle version, in the same format
+    and with the same parameters (since, limit) as ``translation_changes``.
+    """
+    return _feed_response(request, source_language, target_language)
@@ -0,0 +1,22 @@
+import hmac
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.views.decorators.http import require_GET
+
+from ..utils.metrics import render_metrics
+
+
+@require_GET
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint. The scraper must send
+    ``Authorization: Bearer <METRICS_TOKEN>``; without a configured token
+    every request is refused.
+    """
+    if not settings.METRICS_TOKEN:
+        return HttpResponse(status=403)
+    expected = f'Bearer {settings.METRICS_TOKEN}'
+    if not hmac.compare_digest(request.headers.get('Authorization', ''), expected):
+        return HttpResponse(status=401)
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
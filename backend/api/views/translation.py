@@ -1,9 +1,26 @@
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, When
+from django.db.models.functions import MD5
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes, parser_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from rest_framework.parsers import JSONParser, MultiPartParser, FormParser
+from rest_framework.parsers import MultiPartParser, FormParser
+from ..renderers import ORJSONParser
+from ..db_router import read_from_replica, replica_reads
 from ..models import Translation, UserTranslationHistory
+from ..utils.autocomplete import autocomplete_index, search_database
+from ..utils.csv_import import TranslationImportBatch
+from ..utils.glossary import glossaries
+from ..utils.langid import guess_language
+from ..utils.memory import translation_memory
+from ..utils.metering import QuotaExceeded, usage_meter
+from ..utils.metrics import registry, span
+from ..utils.placeholders import mask
+from ..utils.querybudget import query_budget
+import hashlib
 import logging
 import requests
 import os
@@ -13,23 +30,41 @@ import random
 
 logger = logging.getLogger(__name__)
 
+# Rows read to decide whether a reverse lookup is unambiguous
+REVERSE_LOOKUP_MAX_ROWS = 5
+
+@query_budget(9)
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def translate_text(request):
     """
     Translate text using Google Cloud Translate API with caching.
+    A miss is also looked up in reverse (a cached row translated the other way)
+    and in the translation memory (normalized and near matches, see
+    ``api.utils.memory``); cached responses carry a ``match_type``. Upstream
+    calls enforce the glossary of the language pair when source_language is
+    given (``api.utils.glossary``).
     Required fields in request:
     - text: The text to translate
     - target_language: The target language code (e.g., 'es', 'fr', 'de')
     Optional fields:
     - source_language: The source language code (if known)
     - save_to_db: Boolean flag to save translation to database (default: True)
+    - fuzzy: Boolean flag to also allow near (trigram) translation-memory
+      matches (default: False); normalized matches are always used. A near
+      match has ``from_cache`` false, ``match_type`` "fuzzy" and a ``score``.
+    Characters sent upstream and served from cache are metered per user and
+    day; a call over the user's daily quota gets 429 (``api.utils.metering``).
+    Without source_language, a confident local guess (``api.utils.langid``)
+    is preferred by the cache lookups, which still fall back to rows of other
+    source languages, and is returned as ``language_guess``.
     """
     try:
         text = request.data.get('text')
         target_language = request.data.get('target_language')
         source_language = request.data.get('source_language')
         save_to_db = request.data.get('save_to_db', True)
+        fuzzy = request.data.get('fuzzy', False)
         api_key = os.getenv('GOOGLE_TRANSLATE_API_KEY')
 
         if not text or not target_language:
@@ -44,121 +79,617 @@ def translate_text(request):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+        # Numbers, URLs etc. are replaced by tokens; the template is cached and translated
+        masked = mask(text)
+        lookup_text = masked.template
+
+        # Without a source language, the cache lookups prefer a confident local guess
+        language_guess = None if source_language else _guess_source_language(text)
+        guessed_language = language_guess[0] if language_guess else None
+        guess_fields = {'language_guess': _guess_payload(language_guess)} if language_guess else {}
+
         # Retrieve all cached translations (synonyms) for the given text / language
         cached_qs = Translation.objects.filter(
-            source_text=text,
+            source_text__in=masked.lookup_texts,
             target_language=target_language
         )
 
-        # If a specific source_language is provided, prioritise those rows
+        # If a specific source_language is provided, only use those rows
         if source_language:
             cached_qs = cached_qs.filter(source_language=source_language)
 
-        if cached_qs.exists():
+        ordering = ['-usage_count', 'translated_text']
+        if guessed_language:
+            # A guess may be wrong: rows in the guessed language win, others still answer
+            ordering.insert(0, Case(When(source_language=guessed_language, then=0), default=1))
+        if masked:
+            # A row cached for the literal text wins over the template
+            ordering.insert(0, Case(When(source_text=text, then=0), default=1))
+        with span('cache_lookup'), read_from_replica():
             # Pick one primary translation (highest usage_count, then alphabetic)
-            primary_translation = cached_qs.order_by('-usage_count', 'translated_text').first()
+            primary_translation = cached_qs.order_by(*ordering).first()
+
+        if masked:
+            registry.inc(
+                'translation_masked_lookups_total',
+                before='hit' if primary_translation is not None and primary_translation.source_text == text else 'miss',
+                after='hit' if primary_translation is not None else 'miss'
+            )
 
+        primary_text = masked.unmask(primary_translation.translated_text) if primary_translation is not None else None
+        if primary_text is not None:
             # Update usage stats for the primary translation only (to avoid inflating all rows)
             if save_to_db:
-                primary_translation.usage_count += 1
-                primary_translation.last_accessed = timezone.now()
-                primary_translation.save()
-
-                # Record history entry
-                UserTranslationHistory.objects.create(
-                    user=request.user,
-                    source_language=primary_translation.source_language,
-                    target_language=primary_translation.target_language,
-                    input_text=primary_translation.source_text,
-                    output_text=primary_translation.translated_text,
-                    was_cached=True
-                )
+                with span('history_write'):
+                    primary_translation.usage_count += 1
+                    primary_translation.last_accessed = timezone.now()
+                    primary_translation.save()
 
-            all_translations = list(cached_qs.values_list('translated_text', flat=True))
+                    # Record history entry
+                    UserTranslationHistory.objects.create(
+                        user=request.user,
+                        source_language=primary_translation.source_language,
+                        target_language=primary_translation.target_language,
+                        input_text=text,
+                        output_text=primary_text,
+                        was_cached=True
+                    )
 
-            logger.info(f"Cache hit for translation: {text[:50]}...")
+            synonyms_qs = cached_qs.filter(source_text=primary_translation.source_text)
+            if guessed_language:
+                synonyms_qs = synonyms_qs.filter(source_language=primary_translation.source_language)
+            with span('cache_lookup'), read_from_replica():
+                all_translations = list(synonyms_qs.values_list('translated_text', flat=True))
+            if primary_translation.source_text != text:
+                all_translations = masked.unmask_all(all_translations)
+
+            registry.inc('translation_cache_lookups_total', result='hit')
+            usage_meter.record_cached(request.user.pk, len(text))
+            logger.info("Cache hit for translation: %.50s...", text)
             return Response({
                 'source_text': text,
-                'translated_text': primary_translation.translated_text,
+                'translated_text': primary_text,
                 'translated_texts': all_translations,
                 'source_language': primary_translation.source_language,
                 'target_language': primary_translation.target_language,
-                'from_cache': True
+                'from_cache': True,
+                'match_type': 'exact',
+                **guess_fields
             })
 
-        # If not in cache, proceed with Google API call
-        url = 'https://translation.googleapis.com/language/translate/v2'
-        params = {
-            'key': api_key,
-            'q': text,
-            'target': target_language
-        }
-        if source_language:
-            params['source'] = source_language
+        # An existing row in the opposite direction can answer, if it is the only one
+        if settings.REVERSE_LOOKUP_ENABLED:
+            with span('reverse_lookup'), read_from_replica():
+                reverse = _reverse_lookup(lookup_text, source_language, target_language, guessed_language)
+            reverse_text = masked.unmask(reverse[0]) if reverse is not None else None
+            if reverse_text is not None:
+                detected_language = reverse[1]
+                if save_to_db:
+                    with span('history_write'):
+                        UserTranslationHistory.objects.create(
+                            user=request.user,
+                            source_language=detected_language,
+                            target_language=target_language,
+                            input_text=text,
+                            output_text=reverse_text,
+                            was_cached=True
+                        )
+                registry.inc('translation_cache_lookups_total', result='reverse_hit')
+                usage_meter.record_cached(request.user.pk, len(text))
+                logger.info("Reverse cache hit for translation: %.50s...", text)
+                return Response({
+                    'source_text': text,
+                    'translated_text': reverse_text,
+                    'translated_texts': [reverse_text],
+                    'source_language': detected_language,
+                    'target_language': target_language,
+                    'from_cache': True,
+                    'reverse': True,
+                    'match_type': 'reverse',
+                    **guess_fields
+                })
+
+        # A cached source text that differs only trivially, or (if asked for) is similar enough
+        if translation_memory.ready():
+            with span('translation_memory'):
+                match = _memory_match(lookup_text, target_language, source_language, guessed_language, fuzzy)
+            match_text = masked.unmask(match['translated_text']) if match is not None else None
+            if match_text is not None:
+                if save_to_db:
+                    with span('history_write'):
+                        UserTranslationHistory.objects.create(
+                            user=request.user,
+                            source_language=match['source_language'],
+                            target_language=target_language,
+                            input_text=text,
+                            output_text=match_text,
+                            was_cached=match['match_type'] != 'fuzzy'
+                        )
+                registry.inc('translation_cache_lookups_total', result=f"{match['match_type']}_hit")
+                usage_meter.record_cached(request.user.pk, len(text))
+                logger.info("Translation memory %s match (%.2f) for: %.50s...", match['match_type'], match['score'], text)
+                return Response({
+                    'source_text': text,
+                    'translated_text': match_text,
+                    'translated_texts': [match_text],
+                    'source_language': match['source_language'],
+                    'target_language': target_language,
+                    'from_cache': match['match_type'] != 'fuzzy',
+                    'match_type': match['match_type'],
+                    'score': match['score'],
+                    'matched_source_text': match['source_text'],
+                    **guess_fields
+                })
 
-        response = requests.post(url, params=params)
-        response.raise_for_status()
-        result = response.json()
+        registry.inc('translation_cache_lookups_total', result='miss')
 
-        if 'data' not in result or 'translations' not in result['data']:
-            raise Exception('Unexpected API response format')
+        try:
+            usage_meter.check_quota(request.user, len(lookup_text))
+        except QuotaExceeded as e:
+            return _quota_response(e)
 
-        translation = result['data']['translations'][0]
+        # If not in cache, proceed with Google API call, enforcing the pair's glossary
+        with span('glossary'):
+            glossary = glossaries.for_targets(source_language, [target_language]).get(target_language)
+        with span('upstream'):
+            translation, lookup_text, translated_text = _translate_masked(
+                api_key, masked, target_language, source_language, glossary, request.user.pk
+            )
         detected_source_language = translation.get('detectedSourceLanguage', source_language)
 
         # Store in cache only if we're saving to db
         if save_to_db:
             try:
-                translation_obj = Translation.objects.create(
-                    source_text=text,
-                    translated_text=translation['translatedText'],
-                    source_language=detected_source_language,
-                    target_language=target_language
-                )
-                # Record history with new model fields
-                UserTranslationHistory.objects.create(
-                    user=request.user,
-                    source_language=detected_source_language,
-                    target_language=target_language,
-                    input_text=text,
-                    output_text=translation['translatedText'],
-                    was_cached=False
-                )
+                with span('history_write'):
+                    translation_obj = Translation.objects.create(
+                        source_text=lookup_text,
+                        translated_text=translation['translatedText'],
+                        source_language=detected_source_language,
+                        target_language=target_language
+                    )
+                    # Record history with new model fields
+                    UserTranslationHistory.objects.create(
+                        user=request.user,
+                        source_language=detected_source_language,
+                        target_language=target_language,
+                        input_text=text,
+                        output_text=translated_text,
+                        was_cached=False
+                    )
             except Exception as e:
-                logger.warning(f"Failed to cache translation: {str(e)}")
+                logger.warning("Failed to cache translation: %s", e)
                 # Continue even if caching fails
 
         # After creating the new translation, re-query all synonyms so the response is consistent
-        all_translations = list(
-            Translation.objects.filter(
-                source_text=text,
-                target_language=target_language
-            ).values_list('translated_text', flat=True)
-        )
+        with span('cache_lookup'):
+            all_translations = list(
+                Translation.objects.filter(
+                    source_text=lookup_text,
+                    target_language=target_language
+                ).values_list('translated_text', flat=True)
+            )
+        if lookup_text != text:
+            all_translations = masked.unmask_all(all_translations)
 
-        logger.info(f"Cache miss for translation: {text[:50]}...")
+        logger.info("Cache miss for translation: %.50s...", text)
         return Response({
             'source_text': text,
-            'translated_text': translation['translatedText'],
+            'translated_text': translated_text,
             'translated_texts': all_translations,
             'source_language': detected_source_language,
             'target_language': target_language,
-            'from_cache': False
+            'from_cache': False,
+            **guess_fields
         })
 
     except requests.exceptions.RequestException as e:
-        logger.error(f"Translation API error: {str(e)}")
+        logger.error("Translation API error: %s", e)
         return Response(
             {'error': 'Translation API request failed', 'details': str(e)},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
     except Exception as e:
-        logger.error(f"Translation error: {str(e)}")
+        logger.error("Translation error: %s", e)
+        return Response(
+            {'error': 'Translation failed', 'details': str(e)},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+@query_budget(11)
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def translate_multi(request):
+    """
+    Translate one text into several languages. Cached targets are resolved in
+    one query (plus one reverse lookup and the translation memory), missing
+    targets are fetched from Google concurrently, and new rows and history
+    are written in one transaction.
+    Required fields in request:
+    - text: The text to translate
+    - target_languages: List of target language codes (at most TRANSLATE_MAX_TARGETS)
+    Optional fields:
+    - source_language: The source language code (if known)
+    - save_to_db: Boolean flag to save translations to database (default: True)
+    - fuzzy: Boolean flag to also allow near translation-memory matches
+      (default: False), reported as in ``translate_text``
+    Missing targets are checked against the user's daily quota together; when
+    they do not fit, none of them is fetched.
+    Response: one entry per target, in request order, shaped like a
+    ``translate_text`` response; a target whose upstream call failed has an
+    ``error`` instead.
+    """
+    try:
+        text = request.data.get('text')
+        target_languages = request.data.get('target_languages')
+        source_language = request.data.get('source_language')
+        save_to_db = request.data.get('save_to_db', True)
+        fuzzy = request.data.get('fuzzy', False)
+        api_key = os.getenv('GOOGLE_TRANSLATE_API_KEY')
+
+        if not text or not target_languages or not isinstance(target_languages, list):
+            return Response(
+                {'error': 'text and a non-empty target_languages list are required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not all(code and isinstance(code, str) for code in target_languages):
+            return Response({'error': 'target_languages must be language codes'}, status=status.HTTP_400_BAD_REQUEST)
+        target_languages = list(dict.fromkeys(target_languages))
+        if len(target_languages) > settings.TRANSLATE_MAX_TARGETS:
+            return Response(
+                {'error': f'At most {settings.TRANSLATE_MAX_TARGETS} target languages per request'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if not api_key:
+            return Response(
+                {'error': 'Google Translate API key not configured'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+        masked = mask(text)
+        language_guess = None if source_language else _guess_source_language(text)
+        guessed_language = language_guess[0] if language_guess else None
+        cached_qs = Translation.objects.filter(source_text__in=masked.lookup_texts, target_language__in=target_languages)
+        if source_language:
+            cached_qs = cached_qs.filter(source_language=source_language)
+
+        # Same primary pick as translate_text: literal text over template, guessed language,
+        # highest usage_count, then alphabetic
+        ordering = ['-usage_count', 'translated_text']
+        if guessed_language:
+            ordering.insert(0, Case(When(source_language=guessed_language, then=0), default=1))
+        if masked:
+            ordering.insert(0, Case(When(source_text=text, then=0), default=1))
+        primaries = {}
+        synonyms = {}
+        with span('cache_lookup'), read_from_replica():
+            rows = cached_qs.order_by(*ordering).values_list(
+                'pk', 'target_language', 'source_language', 'source_text', 'translated_text'
+            )
+            for pk, target, detected_language, source_text, translated_text in rows:
+                if source_text != text:
+                    translated_text = masked.unmask(translated_text)
+                    if translated_text is None:
+                        continue
+                primary = primaries.setdefault(target, (pk, detected_language, translated_text, source_text))
+                if source_text == primary[3] and (not guessed_language or detected_language == primary[1]):
+                    synonyms.setdefault(target, []).append(translated_text)
+
+        if masked:
+            for target in target_languages:
+                primary = primaries.get(target)
+                registry.inc(
+                    'translation_masked_lookups_total',
+                    before='hit' if primary is not None and primary[3] == text else 'miss',
+                    after='hit' if primary is not None else 'miss'
+                )
+
+        results = {}
+        for target, (_pk, detected_language, translated_text, _source_text) in primaries.items():
+            results[target] = _multi_result(text, target, detected_language, translated_text, synonyms[target], 'exact')
+            registry.inc('translation_cache_lookups_total', result='hit')
+            usage_meter.record_cached(request.user.pk, len(text))
+
+        missing = [target for target in target_languages if target not in primaries]
+        if missing and settings.REVERSE_LOOKUP_ENABLED:
+            with span('reverse_lookup'), read_from_replica():
+                reverse = _reverse_lookups(masked.template, source_language, missing, guessed_language)
+            reverse = {
+                target: (masked.unmask(reverse_source_text), detected_language)
+                for target, (reverse_source_text, detected_language) in reverse.items()
+                if masked.unmask(reverse_source_text) is not None
+            }
+            for target, (reverse_text, detected_language) in reverse.items():
+                results[target] = _multi_result(
+                    text, target, detected_language, reverse_text, [reverse_text], 'reverse'
+                )
+                results[target]['reverse'] = True
+                registry.inc('translation_cache_lookups_total', result='reverse_hit')
+                usage_meter.record_cached(request.user.pk, len(text))
+            missing = [target for target in missing if target not in reverse]
+
+        if missing and translation_memory.ready():
+            with span('translation_memory'):
+                matches = {
+                    target: _memory_match(masked.template, target, source_language, guessed_language, fuzzy)
+                    for target in missing
+                }
+            for target, match in matches.items():
+                match_text = masked.unmask(match['translated_text']) if match is not None else None
+                if match_text is None:
+                    matches[target] = None
+                    continue
+                results[target] = _multi_result(
+                    text, target, match['source_language'], match_text, [match_text], match['match_type']
+                )
+                results[target].update(score=match['score'], matched_source_text=match['source_text'])
+                registry.inc('translation_cache_lookups_total', result=f"{match['match_type']}_hit")
+                usage_meter.record_cached(request.user.pk, len(text))
+            missing = [target for target in missing if matches[target] is None]
+
+        quota_error = None
+        if missing:
+            try:
+                usage_meter.check_quota(request.user, len(masked.template) * len(missing), len(missing))
+            except QuotaExceeded as e:
+                quota_error = e
+                for target in missing:
+                    results[target] = {'target_language': target, 'error': str(e)}
+
+        fetched = {}
+        if missing and quota_error is None:
+            registry.inc('translation_cache_lookups_total', amount=len(missing), result='miss')
+            # Resolved here: the worker threads do not touch the database
+            with span('glossary'):
+                target_glossaries = glossaries.for_targets(source_language, missing)
+            workers = min(len(missing), settings.TRANSLATE_FANOUT_WORKERS)
+            with span('upstream'), ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = {
+                    target: executor.submit(
+                        _translate_masked, api_key, masked, target, source_language, target_glossaries.get(target),
+                        request.user.pk
+                    )
+                    for target in missing
+                }
+                for target, future in futures.items():
+                    try:
+                        fetched[target] = future.result()
+                    except Exception as e:
+                        logger.error("Translation API error for %s: %s", target, e)
+                        results[target] = {'target_language': target, 'error': 'Translation API request failed',
+                                           'details': str(e)}
+            for target, (translation, _cached_text, translated_text) in fetched.items():
+                results[target] = _multi_result(
+                    text, target, translation.get('detectedSourceLanguage', source_language), translated_text,
+                    [translated_text], None
+                )
+
+        if save_to_db:
+            try:
+                with span('history_write'), transaction.atomic():
+                    if primaries:
+                        Translation.objects.filter(pk__in=[primary[0] for primary in primaries.values()]).update(
+                            usage_count=F('usage_count') + 1, last_accessed=timezone.now()
+                        )
+                    if fetched:
+                        Translation.objects.bulk_create([
+                            Translation(
+                                source_text=cached_text,
+                                translated_text=translation['translatedText'],
+                                source_language=results[target]['source_language'],
+                                target_language=target
+                            )
+                            for target, (translation, cached_text, _translated_text) in fetched.items()
+                        ], ignore_conflicts=True)
+                    UserTranslationHistory.objects.bulk_create([
+                        UserTranslationHistory(
+                            user=request.user,
+                            source_language=result['source_language'],
+                            target_language=target,
+                            input_text=text,
+                            output_text=result['translated_text'],
+                            was_cached=result['from_cache']
+                        )
+                        for target, result in results.items() if 'error' not in result
+                    ])
+            except Exception as e:
+                logger.warning("Failed to cache translations: %s", e)
+                # Continue even if caching fails
+
+        logger.info("Multi-target translation: %d cached, %d fetched, %d failed for %.50s...",
+                    len(target_languages) - len(missing), len(fetched), len(missing) - len(fetched), text)
+        # Partial failures are reported per target; fail the request only if nothing was translated
+        if quota_error is not None and len(missing) == len(target_languages):
+            return _quota_response(quota_error)
+        failed = all('error' in result for result in results.values())
+        data = {
+            'source_text': text,
+            'translations': [results[target] for target in target_languages],
+        }
+        if language_guess:
+            data['language_guess'] = _guess_payload(language_guess)
+        return Response(data, status=status.HTTP_500_INTERNAL_SERVER_ERROR if failed else status.HTTP_200_OK)
+
+    except Exception as e:
+        logger.error("Translation error: %s", e)
         return Response(
             {'error': 'Translation failed', 'details': str(e)},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
+def _quota_response(error):
+    return Response(
+        {'error': str(error), 'quota': error.quota, 'limit': error.limit, 'used': error.used},
+        status=status.HTTP_429_TOO_MANY_REQUESTS
+    )
+
+def _guess_source_language(text):
+    """Confident ``(language, confidence)`` guess for ``text``, or None."""
+    with span('language_id'):
+        return guess_language(text)
+
+def _guess_payload(language_guess):
+    language, confidence = language_guess
+    return {'language': language, 'confidence': round(confidence, 4)}
+
+def _memory_match(text, target_language, source_language, guessed_language, fuzzy):
+    """
+    Translation-memory match, normalized only unless ``fuzzy``. A guessed
+    source language is tried first, then every source language.
+    """
+    threshold = None if fuzzy else 1.0
+    match = translation_memory.match(text, target_language, source_language or guessed_language, threshold)
+    if match is None and guessed_language:
+        match = translation_memory.match(text, target_language, None, threshold)
+    return match
+
+def _multi_result(text, target_language, source_language, translated_text, translated_texts, match_type):
+    """One ``translate_multi`` entry; ``match_type`` is None for an upstream translation."""
+    result = {
+        'source_text': text,
+        'translated_text': translated_text,
+        'translated_texts': translated_texts,
+        'source_language': source_language,
+        'target_language': target_language,
+        'from_cache': match_type not in (None, 'fuzzy')
+    }
+    if match_type is not None:
+        result['match_type'] = match_type
+    return result
+
+def _translate_upstream(api_key, text, target_language, source_language=None, glossary=None, user_id=None):
+    """
+    One Translate v2 call; returns the ``translations[0]`` dict of the
+    response. Terms of ``glossary`` are protected for the call and restored
+    in ``translatedText``. The characters are metered against ``user_id``.
+    """
+    characters = len(text)
+    applied = 0
+    if glossary is not None:
+        text, applied = glossary.protect(text)
+    params = {
+        'key': api_key,
+        'q': text,
+        'target': target_language
+    }
+    if source_language:
+        params['source'] = source_language
+
+    response = requests.post(settings.GOOGLE_TRANSLATE_URL, params=params)
+    response.raise_for_status()
+    result = response.json()
+
+    if 'data' not in result or 'translations' not in result['data']:
+        raise Exception('Unexpected API response format')
+    translation = result['data']['translations'][0]
+    if user_id is not None:
+        usage_meter.record_upstream(user_id, characters)
+    if applied:
+        registry.inc('glossary_terms_applied_total', amount=applied)
+        translation['translatedText'] = glossary.restore(translation['translatedText'])
+    return translation
+
+def _translate_masked(api_key, masked, target_language, source_language=None, glossary=None, user_id=None):
+    """
+    Translate the template of ``masked`` upstream. Returns ``(translation,
+    source text to cache, unmasked translated text)``; when the tokens do not
+    survive translation the literal text is translated (and cached) instead.
+    """
+    translation = _translate_upstream(api_key, masked.template, target_language, source_language, glossary, user_id)
+    translated_text = masked.unmask(translation['translatedText'])
+    if translated_text is not None:
+        return translation, masked.template, translated_text
+    registry.inc('translation_mask_fallbacks_total')
+    translation = _translate_upstream(api_key, masked.original, target_language, source_language, glossary, user_id)
+    return translation, masked.original, translation['translatedText']
+
+def _reverse_lookup(text, source_language, target_language, guessed_language=None):
+    """
+    Serve ``source_language -> target_language`` from a cached row translated
+    the other way (``target_language -> source_language``) whose translated_text
+    is ``text``. Returns ``(source_text, detected source language)``, or None
+    if there is no such row or the rows disagree on the source text. Without
+    source_language, rows in ``guessed_language`` are preferred when there
+    are any. The md5 filter lets PostgreSQL use the index from migration 0012.
+    """
+    return _reverse_lookups(text, source_language, [target_language], guessed_language).get(target_language)
+
+def _reverse_lookups(text, source_language, target_languages, guessed_language=None):
+    """``_reverse_lookup`` for several target languages in one query: ``{target: result}``."""
+    queryset = Translation.objects.alias(digest=MD5('translated_text')).filter(
+        digest=hashlib.md5(text.encode()).hexdigest(),
+        translated_text=text,
+        source_language__in=target_languages,
+    )
+    if source_language:
+        queryset = queryset.filter(target_language=source_language)
+    rows = queryset.order_by('-usage_count').values_list('source_language', 'source_text', 'target_language')
+    by_target = {}
+    for target, source_text, language in rows[:REVERSE_LOOKUP_MAX_ROWS * len(target_languages)]:
+        by_target.setdefault(target, []).append((source_text, language))
+
+    found = {}
+    for target, candidates in by_target.items():
+        if guessed_language:
+            candidates = [candidate for candidate in candidates if candidate[1] == guessed_language] or candidates
+        if len({source_text for source_text, _ in candidates}) > 1:
+            registry.inc('translation_reverse_ambiguous_total')
+        else:
+            found[target] = candidates[0]
+    return found
+
+@query_budget(4)
+@replica_reads
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def autocomplete(request):
+    """
+    Suggest cached source texts (with their primary translation) starting with a prefix,
+    most used first. Served from the per-worker prefix index when it is ready.
+    Query parameters:
+    - q: The prefix typed so far (at least AUTOCOMPLETE_MIN_PREFIX characters)
+    - target_language: The target language code
+    Optional parameters:
+    - source_language: Restrict suggestions to one source language
+    - limit: Number of suggestions (default 10, max AUTOCOMPLETE_MAX_RESULTS)
+    """
+    prefix = request.query_params.get('q', '')
+    target_language = request.query_params.get('target_language')
+    source_language = request.query_params.get('source_language') or None
+    if not target_language:
+        return Response({'error': 'target_language is required'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        limit = int(request.query_params.get('limit', 10))
+    except ValueError:
+        return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+    limit = max(1, min(limit, settings.AUTOCOMPLETE_MAX_RESULTS))
+
+    if len(prefix.strip()) < settings.AUTOCOMPLETE_MIN_PREFIX:
+        results, backend = [], None
+    elif autocomplete_index.ready():
+        with span('autocomplete'):
+            results, backend = autocomplete_index.search(prefix, target_language, source_language, limit), 'memory'
+    else:
+        with span('autocomplete'):
+            results, backend = search_database(prefix, target_language, source_language, limit), 'database'
+
+    return Response({
+        'query': prefix,
+        'suggestions': [
+            {
+                'source_text': source_text,
+                'translated_text': translated_text,
+                'source_language': source,
+                'target_language': target_language,
+                'usage_count': usage_count,
+            }
+            for usage_count, source_text, translated_text, source in results
+        ],
+        'backend': backend,
+    })
+
+@query_budget(3)
+@replica_reads
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_translation_history(request):
@@ -216,15 +747,16 @@ def get_translation_history(request):
             status=status.HTTP_400_BAD_REQUEST
         )
     except Exception as e:
-        logger.error(f"Error fetching translation history: {str(e)}")
+        logger.error("Error fetching translation history: %s", e)
         return Response(
             {'error': 'Failed to fetch translation history'},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
+@query_budget(4)
 @api_view(['PATCH', 'OPTIONS'])
 @permission_classes([IsAuthenticated])
-@parser_classes([JSONParser, MultiPartParser, FormParser])
+@parser_classes([ORJSONParser, MultiPartParser, FormParser])
 def edit_translation(request, translation_id):
     """
     Edit a specific translation in the user's history and update the translation cache.
@@ -237,8 +769,8 @@ def edit_translation(request, translation_id):
     - target_language: The target language code
     """
     try:
-        logger.debug(f"Attempting to edit translation {translation_id} for user {request.user.id}")
-        logger.debug(f"Request content type: {request.content_type}")
+        logger.debug("Attempting to edit translation %s for user %s", translation_id, request.user.id)
+        logger.debug("Request content type: %s", request.content_type)
         
         # Handle OPTIONS request for CORS
         if request.method == 'OPTIONS':
@@ -256,7 +788,7 @@ def edit_translation(request, translation_id):
         else:
             data = request.data
             
-        logger.debug(f"Request data: {data}")
+        logger.debug("Request data: %s", data)
         
         # Get the translation and verify ownership
         history_entry = UserTranslationHistory.objects.filter(
@@ -265,13 +797,13 @@ def edit_translation(request, translation_id):
         ).first()
         
         if not history_entry:
-            logger.warning(f"Translation {translation_id} not found or user {request.user.id} doesn't have permission")
+            logger.warning("Translation %s not found or user %s doesn't have permission", translation_id, request.user.id)
             return Response(
                 {'error': 'Translation not found or you do not have permission to edit it'},
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        logger.debug(f"Found history entry: {history_entry.id}")
+        logger.debug("Found history entry: %s", history_entry.id)
         
         # Find the corresponding cache entry
         cache_entry = Translation.objects.filter(
@@ -280,7 +812,7 @@ def edit_translation(request, translation_id):
             source_language=history_entry.source_language
         ).first()
         
-        logger.debug(f"Cache entry found: {bool(cache_entry)}")
+        logger.debug("Cache entry found: %s", bool(cache_entry))
         
         # Update history entry
         if 'output_text' in data:
@@ -294,7 +826,7 @@ def edit_translation(request, translation_id):
             history_entry.save()
             logger.debug("Successfully saved history entry")
         except Exception as save_error:
-            logger.error(f"Error saving history entry: {str(save_error)}")
+            logger.error("Error saving history entry: %s", save_error)
             raise
         
         # Update cache entry if it exists
@@ -308,9 +840,9 @@ def edit_translation(request, translation_id):
             
             try:
                 cache_entry.save()
-                logger.info(f"Updated translation cache for text: {history_entry.input_text[:50]}...")
+                logger.info("Updated translation cache for text: %.50s...", history_entry.input_text)
             except Exception as cache_error:
-                logger.error(f"Error saving cache entry: {str(cache_error)}")
+                logger.error("Error saving cache entry: %s", cache_error)
                 raise
         
         return Response({
@@ -325,12 +857,13 @@ def edit_translation(request, translation_id):
         })
         
     except Exception as e:
-        logger.error(f"Error editing translation: {str(e)}", exc_info=True)
+        logger.error("Error editing translation: %s", e, exc_info=True)
         return Response(
             {'error': 'Failed to edit translation', 'details': str(e)},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
+@query_budget(4)
 @api_view(['DELETE'])
 @permission_classes([IsAuthenticated])
 def delete_translation(request, translation_id):
@@ -343,7 +876,7 @@ def delete_translation(request, translation_id):
     - delete_from_cache: Boolean (default: False) - Whether to also delete from the translation cache
     """
     try:
-        logger.debug(f"Attempting to delete translation {translation_id} for user {request.user.id}")
+        logger.debug("Attempting to delete translation %s for user %s", translation_id, request.user.id)
         
         # Get the translation and verify ownership
         history_entry = UserTranslationHistory.objects.filter(
@@ -352,7 +885,7 @@ def delete_translation(request, translation_id):
         ).first()
         
         if not history_entry:
-            logger.warning(f"Translation {translation_id} not found or user {request.user.id} doesn't have permission")
+            logger.warning("Translation %s not found or user %s doesn't have permission", translation_id, request.user.id)
             return Response(
                 {'error': 'Translation not found or you do not have permission to delete it'},
                 status=status.HTTP_404_NOT_FOUND
@@ -371,11 +904,11 @@ def delete_translation(request, translation_id):
             
             if cache_entry:
                 cache_entry.delete()
-                logger.info(f"Deleted translation from cache: {history_entry.input_text[:50]}...")
+                logger.info("Deleted translation from cache: %.50s...", history_entry.input_text)
         
         # Delete the history entry
         history_entry.delete()
-        logger.info(f"Deleted translation history entry {translation_id}")
+        logger.info("Deleted translation history entry %s", translation_id)
         
         return Response({
             'message': 'Translation deleted successfully',
@@ -383,12 +916,14 @@ def delete_translation(request, translation_id):
         })
         
     except Exception as e:
-        logger.error(f"Error deleting translation: {str(e)}", exc_info=True)
+        logger.error("Error deleting translation: %s", e, exc_info=True)
         return Response(
             {'error': 'Failed to delete translation', 'details': str(e)},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
+@query_budget(3)
+@replica_reads
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def get_flashcards(request):
@@ -493,12 +1028,13 @@ def get_flashcards(request):
         })
 
     except Exception as e:
-        logger.error(f"Flashcards error: {str(e)}")
+        logger.error("Flashcards error: %s", e)
         return Response(
             {'error': 'Failed to retrieve flashcards', 'details': str(e)},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
+@query_budget(25)
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 @parser_classes([MultiPartParser, FormParser])
@@ -563,8 +1099,7 @@ def upload_translations_csv(request):
         source_language = validation_result['source_language']
         target_languages = validation_result['target_languages']
         
-        added_count = 0
-        skipped_count = 0
+        batch = TranslationImportBatch(source_language)
         errors = []
         
         # Process each row (skip header)
@@ -587,34 +1122,20 @@ def upload_translations_csv(request):
                         errors.append(f"Row {row_num}: Empty translation for {target_lang}")
                         continue
                     
-                    # Check if translation already exists
-                    existing_translation = Translation.objects.filter(
-                        source_text=source_text,
-                        source_language=source_language,
-                        target_language=target_lang,
-                        translated_text=target_text
-                    ).first()
-                    
-                    if existing_translation:
-                        skipped_count += 1
-                        logger.info(f"Skipped duplicate: {source_language}->{target_lang}: {source_text[:50]}...")
-                    else:
-                        # Create new translation
-                        Translation.objects.create(
-                            source_text=source_text,
-                            translated_text=target_text,
-                            source_language=source_language,
-                            target_language=target_lang
-                        )
-                        added_count += 1
-                        logger.info(f"Added translation: {source_language}->{target_lang}: {source_text[:50]}...")
+                    # Duplicates are detected and skipped when the batch is flushed
+                    batch.add(source_text, target_lang, target_text)
                         
             except Exception as e:
                 errors.append(f"Row {row_num}: {str(e)}")
-                logger.error(f"Error processing row {row_num}: {str(e)}")
+                logger.error("Error processing row %s: %s", row_num, e)
+        
+        batch.flush()
+        errors.extend(batch.errors)
+        added_count = batch.added
+        skipped_count = batch.skipped
         
         # Log summary
-        logger.info(f"CSV upload completed: {added_count} added, {skipped_count} skipped, {len(errors)} errors")
+        logger.info("CSV upload completed: %s added, %s skipped, %s errors", added_count, skipped_count, len(errors))
         
         return Response({
             'message': 'CSV upload completed',
@@ -633,7 +1154,7 @@ def upload_translations_csv(request):
             status=status.HTTP_400_BAD_REQUEST
         )
     except Exception as e:
-        logger.error(f"CSV upload error: {str(e)}")
+        logger.error("CSV upload error: %s", e)
         return Response(
             {'error': 'Failed to process CSV file', 'details': str(e)},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -743,8 +1264,8 @@ def validate_csv_structure(csv_reader, source_language=None):
             return {'valid': False, 'error': f'Too many empty source texts: {empty_source_count} out of {total_rows} rows have empty source text'}
         
         # Log validation summary
-        logger.info(f"CSV validation completed: {total_rows} rows, {malformed_rows} malformed, "
-                   f"{empty_source_count} empty source, {empty_target_count} empty targets")
+        logger.info("CSV validation completed: %s rows, %s malformed, %s empty source, %s empty targets",
+                    total_rows, malformed_rows, empty_source_count, empty_target_count)
         
         return {
             'valid': True,
@@ -755,7 +1276,7 @@ def validate_csv_structure(csv_reader, source_language=None):
         }
         
     except Exception as e:
-        logger.error(f"CSV validation error: {str(e)}")
+        logger.error("CSV validation error: %s", e)
         return {'valid': False, 'error': f'Validation failed: {str(e)}'}
 
 def is_valid_language_code(lang_code):
@@ -12,14 +12,19 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
+import json
 import logging
 from datetime import timedelta
 
+import dj_database_url
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 # Google Translate settings
 GOOGLE_TRANSLATE_API_KEY = os.getenv('GOOGLE_TRANSLATE_API_KEY')
+# Point at a local stub (manage.py fake_translate_server) for benchmarks
+GOOGLE_TRANSLATE_URL = os.getenv('GOOGLE_TRANSLATE_URL', 'https://translation.googleapis.com/language/translate/v2')
 
 if not GOOGLE_TRANSLATE_API_KEY:
     logging.warning("Google Translate API key not set")
@@ -59,6 +64,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.RequestMetricsMiddleware',  # First, so timings cover the whole stack
+    'api.middleware.CompressionMiddleware',
+    'api.middleware.QueryBudgetMiddleware',
+    'api.middleware.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',  # Add CORS middleware before CommonMiddleware
@@ -111,7 +120,6 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 
 if os.getenv('DATABASE_URL'):
     # Use DATABASE_URL if provided (common in cloud deployments)
-    import dj_database_url
     DATABASES = {
         'default': dj_database_url.parse(os.getenv('DATABASE_URL'))
     }
@@ -128,6 +136,51 @@ else:
         }
     }
 
+# Connection reuse
+# - DB_CONN_MAX_AGE: seconds a connection is kept open between requests (0 = one per request)
+# - DB_CONN_HEALTH_CHECKS: check a reused connection before the first query of each request
+# - DB_POOL: '' (persistent connections only), 'psycopg' (Django's built-in pool; needs
+#   psycopg[pool] installed, uses DB_POOL_MIN_SIZE / DB_POOL_MAX_SIZE / DB_POOL_TIMEOUT) or
+#   'pgbouncer' (behind PgBouncer in transaction mode: server-side cursors are disabled)
+DB_POOL = os.getenv('DB_POOL', '').lower()
+DATABASES['default'].update({
+    'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', '60')),
+    'CONN_HEALTH_CHECKS': os.getenv('DB_CONN_HEALTH_CHECKS', 'True').lower() in ('true', '1', 'yes', 'on'),
+})
+if DB_POOL == 'psycopg':
+    # The pool owns connection lifetime; Django requires CONN_MAX_AGE = 0 with it
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default'].setdefault('OPTIONS', {})['pool'] = {
+        'min_size': int(os.getenv('DB_POOL_MIN_SIZE', '2')),
+        'max_size': int(os.getenv('DB_POOL_MAX_SIZE', '10')),
+        'timeout': float(os.getenv('DB_POOL_TIMEOUT', '10')),
+    }
+elif DB_POOL == 'pgbouncer':
+    # Named cursors do not survive transaction pooling (used by QuerySet.iterator())
+    DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
+
+# Read replicas (api/db_router.py)
+# - DB_REPLICA_URLS: comma-separated database URLs, registered as replica_0, replica_1, ...
+# - DB_REPLICA_STICKY_SECONDS: after a user writes, their reads stay on the primary this long
+# - DB_REPLICA_MAX_LAG_SECONDS: replicas further behind than this are skipped
+# - DB_REPLICA_LAG_CHECK_SECONDS: how often each worker measures replica lag
+DATABASE_REPLICAS = []
+for _index, _url in enumerate(url.strip() for url in os.getenv('DB_REPLICA_URLS', '').split(',') if url.strip()):
+    _replica = dj_database_url.parse(_url)
+    for _key in ('CONN_MAX_AGE', 'CONN_HEALTH_CHECKS', 'DISABLE_SERVER_SIDE_CURSORS'):
+        if _key in DATABASES['default']:
+            _replica[_key] = DATABASES['default'][_key]
+    if DB_POOL == 'psycopg':
+        _replica.setdefault('OPTIONS', {})['pool'] = DATABASES['default']['OPTIONS']['pool']
+    # Tests run against the primary only
+    _replica['TEST'] = {'MIRROR': 'default'}
+    DATABASES[f'replica_{_index}'] = _replica
+    DATABASE_REPLICAS.append(f'replica_{_index}')
+DATABASE_ROUTERS = ['api.db_router.ReplicaRouter']
+DB_REPLICA_STICKY_SECONDS = int(os.getenv('DB_REPLICA_STICKY_SECONDS', '5'))
+DB_REPLICA_MAX_LAG_SECONDS = float(os.getenv('DB_REPLICA_MAX_LAG_SECONDS', '30'))
+DB_REPLICA_LAG_CHECK_SECONDS = float(os.getenv('DB_REPLICA_LAG_CHECK_SECONDS', '5'))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -180,12 +233,117 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'api.CustomUser'
 
+# API_JSON_BACKEND: orjson (default; falls back to the stdlib if orjson is missing) or stdlib
+API_JSON_BACKEND = os.getenv('API_JSON_BACKEND', 'orjson').lower()
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.CachedJWTAuthentication',
+        'api.authentication.APIKeyAuthentication',
     ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'api.renderers.ORJSONRenderer' if API_JSON_BACKEND == 'orjson' else 'rest_framework.renderers.JSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'api.renderers.ORJSONParser' if API_JSON_BACKEND == 'orjson' else 'rest_framework.parsers.JSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
+}
+
+# Response compression (api.middleware.CompressionMiddleware); brotli is used when installed
+RESPONSE_COMPRESSION_ENABLED = os.getenv('RESPONSE_COMPRESSION_ENABLED', 'True').lower() in ('true', '1', 'yes', 'on')
+RESPONSE_COMPRESSION_MIN_BYTES = int(os.getenv('RESPONSE_COMPRESSION_MIN_BYTES', '1024'))
+RESPONSE_COMPRESSION_TYPES = os.getenv('RESPONSE_COMPRESSION_TYPES', 'application/json,text/csv,text/plain').split(',')
+RESPONSE_COMPRESSION_GZIP_LEVEL = int(os.getenv('RESPONSE_COMPRESSION_GZIP_LEVEL', '6'))
+RESPONSE_COMPRESSION_BROTLI_QUALITY = int(os.getenv('RESPONSE_COMPRESSION_BROTLI_QUALITY', '4'))
+
+# Admin changelist settings
+# Above this many rows (planner estimate) the admin shows estimated counts instead of COUNT(*)
+ADMIN_ESTIMATED_COUNT_THRESHOLD = int(os.getenv('ADMIN_ESTIMATED_COUNT_THRESHOLD', '100000'))
+# How long cached admin filter choices (languages, months) are reused
+ADMIN_FILTER_CACHE_SECONDS = int(os.getenv('ADMIN_FILTER_CACHE_SECONDS', '600'))
+
+# Cache maintenance defaults (admin actions and evict_cold_translations)
+MAINTENANCE_EVICT_AFTER_DAYS = int(os.getenv('MAINTENANCE_EVICT_AFTER_DAYS', '180'))
+MAINTENANCE_EVICT_MAX_USAGE_COUNT = int(os.getenv('MAINTENANCE_EVICT_MAX_USAGE_COUNT', '0'))
+
+# Translation cache retention (apply_retention command); 0 disables a policy
+TRANSLATION_RETENTION = {
+    'TTL_DAYS': int(os.getenv('RETENTION_TTL_DAYS', '0')),
+    'MIN_USAGE_COUNT': int(os.getenv('RETENTION_MIN_USAGE_COUNT', '0')),
+    'MIN_USAGE_GRACE_DAYS': int(os.getenv('RETENTION_MIN_USAGE_GRACE_DAYS', '30')),
+    'MAX_ROWS_PER_LANGUAGE_PAIR': int(os.getenv('RETENTION_MAX_ROWS_PER_LANGUAGE_PAIR', '0')),
+    'MIN_SCORE': float(os.getenv('RETENTION_MIN_SCORE', '0')),
+    'SCORE_HALF_LIFE_DAYS': float(os.getenv('RETENTION_SCORE_HALF_LIFE_DAYS', '30')),
+    'BATCH_SIZE': int(os.getenv('RETENTION_BATCH_SIZE', '1000')),
+    'BATCH_PAUSE_SECONDS': float(os.getenv('RETENTION_BATCH_PAUSE_SECONDS', '0.1')),
 }
 
+# Offline dictionary bundles (build_bundles command, /api/translations/bundles)
+BUNDLE_DIR = os.getenv('BUNDLE_DIR', str(BASE_DIR / 'bundles'))
+BUNDLE_KEEP_VERSIONS = int(os.getenv('BUNDLE_KEEP_VERSIONS', '2'))
+
+# Translation change feed (/api/translations/changes)
+# SQLite only: changes younger than this are held back until concurrent transactions have
+# committed. PostgreSQL holds changes back by transaction id instead (see TranslationChange).
+CHANGE_FEED_SETTLE_SECONDS = float(os.getenv('CHANGE_FEED_SETTLE_SECONDS', '2'))
+# prune_translation_changes deletes older changes; clients further behind resync from a bundle
+CHANGE_LOG_RETENTION_DAYS = int(os.getenv('CHANGE_LOG_RETENTION_DAYS', '30'))
+
+# Answer translate requests from cached rows translated in the opposite direction
+REVERSE_LOOKUP_ENABLED = os.getenv('REVERSE_LOOKUP_ENABLED', 'True').lower() in ('true', '1', 'yes', 'on')
+
+# Template-aware caching: mask URLs, emails, numbers and TRANSLATION_MASK_PATTERNS (a JSON list
+# of regular expressions, e.g. '["ORD-[0-9]+"]') with {0}, {1}... before the cache lookup
+TRANSLATION_MASKING_ENABLED = os.getenv('TRANSLATION_MASKING_ENABLED', 'True').lower() in ('true', '1', 'yes', 'on')
+TRANSLATION_MASK_PATTERNS = json.loads(os.getenv('TRANSLATION_MASK_PATTERNS', '[]'))
+
+# Character-cost metering (api.utils.metering): per-worker counts flushed to UsageRollup every
+# METERING_FLUSH_SECONDS. Daily quotas apply to upstream calls (0 = unlimited; per-user fields override).
+METERING_ENABLED = os.getenv('METERING_ENABLED', 'True').lower() in ('true', '1', 'yes', 'on')
+METERING_FLUSH_SECONDS = float(os.getenv('METERING_FLUSH_SECONDS', '10'))
+METERING_USAGE_CACHE_SECONDS = float(os.getenv('METERING_USAGE_CACHE_SECONDS', '10'))
+METERING_DAILY_CHARACTER_QUOTA = int(os.getenv('METERING_DAILY_CHARACTER_QUOTA', '0'))
+METERING_DAILY_REQUEST_QUOTA = int(os.getenv('METERING_DAILY_REQUEST_QUOTA', '0'))
+# Used by manage.py usage_report to price characters (Google Translate v2 list price)
+METERING_PRICE_PER_MILLION_CHARACTERS = float(os.getenv('METERING_PRICE_PER_MILLION_CHARACTERS', '20'))
+
+# Local language identification when source_language is omitted (api.utils.langid); build the
+# model with manage.py train_language_model. Guesses below the confidence are not used; the
+# confidence counts each word once, so 0.8 is a clear majority of the words.
+LANGUAGE_ID_ENABLED = os.getenv('LANGUAGE_ID_ENABLED', 'True').lower() in ('true', '1', 'yes', 'on')
+LANGUAGE_MODEL_PATH = os.getenv('LANGUAGE_MODEL_PATH', str(BASE_DIR / 'language_model.json.gz'))
+LANGUAGE_ID_MIN_CONFIDENCE = float(os.getenv('LANGUAGE_ID_MIN_CONFIDENCE', '0.8'))
+
+# Glossary enforcement on upstream calls (GlossaryTerm, see api.utils.glossary); each worker
+# rechecks a language pair's terms at most every GLOSSARY_REFRESH_SECONDS
+GLOSSARY_ENABLED = os.getenv('GLOSSARY_ENABLED', 'True').lower() in ('true', '1', 'yes', 'on')
+GLOSSARY_REFRESH_SECONDS = float(os.getenv('GLOSSARY_REFRESH_SECONDS', '30'))
+
+# Translation memory: reuse cached rows whose source text matches after normalization
+# or by trigram similarity >= TRANSLATION_MEMORY_THRESHOLD (per-worker index, see api.utils.memory)
+TRANSLATION_MEMORY_ENABLED = os.getenv('TRANSLATION_MEMORY_ENABLED', 'True').lower() in ('true', '1', 'yes', 'on')
+TRANSLATION_MEMORY_THRESHOLD = float(os.getenv('TRANSLATION_MEMORY_THRESHOLD', '0.8'))
+TRANSLATION_MEMORY_MAX_ENTRIES = int(os.getenv('TRANSLATION_MEMORY_MAX_ENTRIES', '500000'))
+TRANSLATION_MEMORY_REFRESH_SECONDS = float(os.getenv('TRANSLATION_MEMORY_REFRESH_SECONDS', '5'))
+TRANSLATION_MEMORY_REBUILD_SECONDS = float(os.getenv('TRANSLATION_MEMORY_REBUILD_SECONDS', '900'))
+
+# Multi-target translation (/api/translate/multi): targets per request and concurrent upstream calls
+TRANSLATE_MAX_TARGETS = int(os.getenv('TRANSLATE_MAX_TARGETS', '10'))
+TRANSLATE_FANOUT_WORKERS = int(os.getenv('TRANSLATE_FANOUT_WORKERS', '5'))
+
+# Autocomplete (/api/translate/autocomplete)
+# AUTOCOMPLETE_BACKEND: memory (per-worker prefix index, database until it is built) or database
+AUTOCOMPLETE_BACKEND = os.getenv('AUTOCOMPLETE_BACKEND', 'memory').lower()
+# Above this many Translation rows the in-memory index is not built (memory per worker)
+AUTOCOMPLETE_MAX_ENTRIES = int(os.getenv('AUTOCOMPLETE_MAX_ENTRIES', '500000'))
+AUTOCOMPLETE_MAX_RESULTS = int(os.getenv('AUTOCOMPLETE_MAX_RESULTS', '20'))
+AUTOCOMPLETE_MIN_PREFIX = int(os.getenv('AUTOCOMPLETE_MIN_PREFIX', '2'))
+AUTOCOMPLETE_REFRESH_SECONDS = float(os.getenv('AUTOCOMPLETE_REFRESH_SECONDS', '5'))
+AUTOCOMPLETE_REBUILD_SECONDS = float(os.getenv('AUTOCOMPLETE_REBUILD_SECONDS', '900'))
+
 # JWT Settings
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=int(os.getenv('JWT_ACCESS_TOKEN_LIFETIME_MINUTES', '60'))),
@@ -200,17 +358,81 @@ SIMPLE_JWT = {
     'TOKEN_TYPE_CLAIM': 'token_type',
     'USER_ID_FIELD': 'id',
     'USER_ID_CLAIM': 'user_id',
+    'TOKEN_REFRESH_SERIALIZER': 'api.serializers.FilteredTokenRefreshSerializer',
 }
 
+# Per-worker cache of users resolved from JWTs (seconds; 0 disables)
+JWT_USER_CACHE_TTL = int(os.getenv('JWT_USER_CACHE_TTL', '30'))
+JWT_USER_CACHE_MAX_ENTRIES = int(os.getenv('JWT_USER_CACHE_MAX_ENTRIES', '10000'))
+
+# API-key authentication for machine clients
+API_KEY_HEADER = os.getenv('API_KEY_HEADER', 'X-API-Key')
+API_KEY_CACHE_TTL = int(os.getenv('API_KEY_CACHE_TTL', '60'))
+API_KEY_CACHE_MAX_ENTRIES = int(os.getenv('API_KEY_CACHE_MAX_ENTRIES', '10000'))
+
+# Per-worker background threads (revocation filter rebuilds, autocomplete and
+# translation memory builds, usage metering flushes); api/tests.py turns them off.
+# When off, the in-memory indexes are never built (autocomplete queries the database,
+# translation-memory matches are skipped) and usage counts are only flushed when the
+# worker exits.
+BACKGROUND_TASKS_ENABLED = os.getenv('BACKGROUND_TASKS_ENABLED', 'True').lower() in ('true', '1', 'yes', 'on')
+
+# Per-worker Bloom filter of revoked refresh-token JTIs (see api/utils/revocation.py); rebuilt every
+# REBUILD_SECONDS, with room for twice the unexpired revocations when that exceeds CAPACITY
+TOKEN_REVOCATION_SYNC_SECONDS = float(os.getenv('TOKEN_REVOCATION_SYNC_SECONDS', '5'))
+TOKEN_REVOCATION_REBUILD_SECONDS = float(os.getenv('TOKEN_REVOCATION_REBUILD_SECONDS', '3600'))
+TOKEN_REVOCATION_CAPACITY = int(os.getenv('TOKEN_REVOCATION_CAPACITY', '1000000'))
+TOKEN_REVOCATION_ERROR_RATE = float(os.getenv('TOKEN_REVOCATION_ERROR_RATE', '0.001'))
+
+# Request metrics (api/utils/metrics.py): Server-Timing headers and the /metrics endpoint
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True').lower() in ('true', '1', 'yes', 'on')
+# Server-Timing exposes per-request query counts and timings to clients: on in DEBUG only by default
+SERVER_TIMING_ENABLED = os.getenv('SERVER_TIMING_ENABLED', str(DEBUG)).lower() in ('true', '1', 'yes', 'on')
+# Directory shared by all gunicorn workers; empty keeps metrics per process
+METRICS_DIR = os.getenv('METRICS_DIR', '')
+METRICS_FLUSH_SECONDS = float(os.getenv('METRICS_FLUSH_SECONDS', '5'))
+# /metrics requires "Authorization: Bearer <token>"; without a token it is disabled
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+# Per-request query budgets (api/utils/querybudget.py)
+# QUERY_BUDGET_MODE: log (warn when a view exceeds its budget), raise, or off
+QUERY_BUDGET_MODE = os.getenv('QUERY_BUDGET_MODE', 'log').lower()
+# Budget for views that do not declare one; 0 means unlimited
+QUERY_BUDGET_DEFAULT = int(os.getenv('QUERY_BUDGET_DEFAULT', '0'))
+# A statement repeated this many times in one request is reported as a likely N+1
+QUERY_BUDGET_REPEAT_THRESHOLD = int(os.getenv('QUERY_BUDGET_REPEAT_THRESHOLD', '3'))
+
 # Logging configuration
-LOG_LEVEL = os.getenv('DJANGO_LOG_LEVEL', 'DEBUG').upper()
+# Records are formatted and written by a background thread (api.utils.log.AsyncStreamHandler).
+# DJANGO_LOG_FORMAT: json (default) or text
+# DJANGO_LOG_SAMPLE_RATES: per-logger cap on records/second below WARNING,
+#   e.g. "api.views.translation=50,api.admin=20"
+LOG_LEVEL = os.getenv('DJANGO_LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = os.getenv('DJANGO_LOG_FORMAT', 'json').lower()
+LOG_SAMPLE_RATES = os.getenv('DJANGO_LOG_SAMPLE_RATES', 'api.views.translation=50,api.admin=20')
 
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
+    'formatters': {
+        'json': {
+            '()': 'api.utils.log.JSONFormatter',
+        },
+        'text': {
+            'format': '%(asctime)s %(levelname)s %(name)s %(message)s',
+        },
+    },
+    'filters': {
+        'sampling': {
+            '()': 'api.utils.log.RateSamplingFilter',
+            'rates': LOG_SAMPLE_RATES,
+        },
+    },
     'handlers': {
         'console': {
-            'class': 'logging.StreamHandler',
+            '()': 'api.utils.log.AsyncStreamHandler',
+            'formatter': LOG_FORMAT,
+            'filters': ['sampling'],
         },
     },
     'root': {
@@ -219,9 +441,7 @@ LOGGING = {
     },
     'loggers': {
         'api': {
-            'handlers': ['console'],
             'level': LOG_LEVEL,
-            'propagate': True,
         },
     },
 }
@@ -17,6 +17,7 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include, re_path
 from django.views.generic import RedirectView
+from api.views.metrics import metrics_view
 import logging
 
 logger = logging.getLogger(__name__)
@@ -24,6 +25,7 @@ logger = logging.getLogger(__name__)
 urlpatterns = [
     path('admin-ark/', admin.site.urls),  # Admin with trailing slash
     path('api/', include('api.urls')),  # API with trailing slash for proper URL handling
+    path('metrics', metrics_view, name='metrics'),  # GET: Prometheus scrape endpoint
 ]
 
 # Debug logging